@@ -0,0 +1,71 @@
+ACTIONS = ('scale_up', 'scale_down', 'restart', 'heal', 'monitor')  # RL action index -> orchestration action
+ACTION_TABLE = dict(enumerate(ACTIONS))
+ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}  # orchestration action -> canonical RL action
+DEFAULT_ACTION = 'monitor'
+
+
+class AppSpec:
+    """Orchestration spec for one runtime event; the bridge's final decision is one too.
+
+    A slotted, immutable-by-convention record: there is no item assignment, and
+    validators and the safety guard derive changed copies with replace().
+    runtime_context is a reference to the caller's runtime data, never a copy.
+    Read-only mapping access (spec['action'], spec.get('rl_action'), 'target' in
+    spec) keeps code written against the old dict specs working.
+    executed_action is the RL action index of the action that actually runs,
+    which differs from rl_action when the spec was downgraded.
+    """
+
+    __slots__ = ('action', 'target', 'runtime_context', 'rl_action', 'safety_rule')
+    FIELDS = __slots__ + ('executed_action',)
+
+    def __init__(self, action, target='service', runtime_context=None, rl_action=None, safety_rule=None):
+        self.action = action
+        self.target = target
+        self.runtime_context = runtime_context
+        self.rl_action = rl_action
+        self.safety_rule = safety_rule
+
+    @classmethod
+    def from_action(cls, rl_action, runtime_context):
+        return cls(ACTION_TABLE.get(rl_action, DEFAULT_ACTION), 'service', runtime_context, rl_action)
+
+    @property
+    def executed_action(self):
+        return ACTION_INDEX.get(self.action, ACTION_INDEX[DEFAULT_ACTION])
+
+    def replace(self, **changes):
+        spec = AppSpec(self.action, self.target, self.runtime_context, self.rl_action, self.safety_rule)
+        for name, value in changes.items():
+            setattr(spec, name, value)
+        return spec
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def __eq__(self, other):
+        if not isinstance(other, AppSpec):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'AppSpec(' + ', '.join(f'{name}={getattr(self, name)!r}' for name in self.FIELDS) + ')'
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def to_trace(self):
+        # Trace form: the runtime context is logged once, under the trace's runtime_state
+        return {'action': self.action, 'target': self.target, 'rl_action': self.rl_action,
+                'executed_action': self.executed_action, 'safety_rule': self.safety_rule}
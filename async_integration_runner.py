@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+class HTTPRuntimeClient:
+    """Minimal asyncio JSON-over-HTTP client for the runtime APIs (see FakeRuntimeServer for the routes)."""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+
+    async def _request(self, method, path, body=None):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            data = json.dumps(body).encode() if body is not None else b''
+            writer.write(f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode() + data)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            response = await reader.read()
+        finally:
+            writer.close()
+        payload = json.loads(response.split(b'\r\n\r\n', 1)[1] or b'null')
+        if status != 200:
+            raise RuntimeError(f"{method} {path} failed with HTTP {status}: {payload}")
+        return payload
+
+    async def list_services(self):
+        return (await self._request('GET', '/services'))['services']
+
+    async def get_service_metrics(self, service):
+        return await self._request('GET', f'/services/{service}/metrics')
+
+    async def execute(self, service, decision):
+        return await self._request('POST', f'/services/{service}/actions',
+                                   {'action': decision['action'], 'target': service})
+
+
+def outcome_from_states(before, after):
+    # Success / failure rule of the integration template: did the service's health improve?
+    return {
+        'success': after['health'] > before['health'],
+        'failure': after['health'] < before['health'] * 0.9,
+        'next_state': after,
+    }
+
+
+class AsyncIntegrationRunner:
+    """Concurrent, fixed-rate runtime integration loop around an RLOOrchestratorBridge.
+
+    Each cycle starts one pipeline per service (collect -> decide -> execute ->
+    collect outcome -> learn), so one service's decision and feedback overlap
+    with the others' collection and a cycle takes as long as the slowest
+    service, not the sum. Every runtime call has its own `timeout`; a service
+    whose call fails or times out is skipped for that cycle. Bridge calls run
+    on one worker thread, so the bridge is never used concurrently and the event
+    loop is not blocked by it. Cycles start every `interval` seconds; a cycle
+    that overruns makes the runner skip the missed start times rather than
+    bunching cycles together.
+    """
+
+    def __init__(self, bridge, client, services=None, interval=30.0, timeout=5.0, environment=None):
+        self.bridge = bridge
+        self.client = client
+        self.services = list(services) if services is not None else None
+        self.interval = interval
+        self.timeout = timeout
+        self.environment = environment
+        self.stats = Counter()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rl-bridge')
+
+    async def _call(self, what, coro):
+        try:
+            return await asyncio.wait_for(coro, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats[f'{what}_timeouts'] += 1
+            raise
+
+    async def _bridge(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def collect(self, service):
+        runtime_data = dict(await self._call('collect', self.client.get_service_metrics(service)))
+        runtime_data['service'] = service
+        if self.environment is not None:
+            runtime_data['environment'] = self.environment
+        return runtime_data
+
+    async def _service_pipeline(self, service):
+        try:
+            runtime_data = await self.collect(service)
+            decision = await self._bridge(self.bridge.process_runtime_event, runtime_data)
+            await self._call('execute', self.client.execute(service, decision))
+            next_data = await self.collect(service)
+            outcome = outcome_from_states(runtime_data, next_data)
+            await self._bridge(self.bridge.record_outcome, runtime_data, decision['executed_action'], outcome)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logging.warning(f"Integration cycle for service {service} failed: {e!r}")
+            return None
+        self.stats['decisions'] += 1
+        return service, decision, outcome
+
+    async def run_cycle(self):
+        # One concurrent pass over all services; returns the (service, decision, outcome) of those that completed
+        services = self.services
+        if services is None:
+            services = await self._call('collect', self.client.list_services())
+        results = await asyncio.gather(*(self._service_pipeline(service) for service in services))
+        self.stats['cycles'] += 1
+        return [result for result in results if result is not None]
+
+    async def run(self, cycles=None):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tick = 0
+        completed = 0
+        while cycles is None or completed < cycles:
+            cycle_start = time.perf_counter()
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logging.error(f"Integration error: {e!r}")
+            self.stats['cycle_seconds'] += time.perf_counter() - cycle_start
+            completed += 1
+            tick += 1
+            now = loop.time()
+            if now > start + tick * self.interval:
+                missed = int((now - start) // self.interval) - tick + 1
+                self.stats['missed_ticks'] += missed
+                logging.warning(f"Integration cycle overran its {self.interval}s slot; skipping {missed} tick(s)")
+                tick += missed
+            if cycles is None or completed < cycles:
+                await asyncio.sleep(start + tick * self.interval - now)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    from fake_runtime_server import FakeRuntimeServer
+    from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
+
+    async def main():
+        configure_trace_logging()
+        server = await FakeRuntimeServer(delays={'web': 0.05, 'db': 0.2, 'cache': 0.1}).start()
+        bridge = RLOOrchestratorBridge()
+        runner = AsyncIntegrationRunner(bridge, HTTPRuntimeClient(server.url), interval=1.0, timeout=1.0)
+        await runner.run(cycles=5)
+        runner.close()
+        bridge.close()
+        await server.stop()
+        print(f"Async integration run completed: {dict(runner.stats)}")
+
+    asyncio.run(main())
@@ -0,0 +1,320 @@
+"""Offline micro-benchmarks for every stage of the decision pipeline.
+
+Runs against synthetic events in a scratch directory (nothing is written to the
+working tree), prints one line per (stage, size) and writes the results as JSON.
+With --baseline, exits non-zero when a stage got slower than the baseline by
+more than --threshold.
+
+    python benchmarks.py --output bench.json
+    python benchmarks.py --quick --baseline bench.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+
+EVENT_STAGES = ('validate', 'adapt', 'get_state_key', 'safety_guard', 'log_trace', 'log_trace_async', 'process_event',
+                'process_batch')
+Q_STAGES = ('process_state', 'record_memory', 'record_journal', 'record_eager', 'cold_start')
+TRACE_STAGES = ('load_traces',)
+STAGES = EVENT_STAGES + Q_STAGES + TRACE_STAGES
+QUICK = {'sizes': '1000,100000', 'trace_sizes': '1000,100000', 'iterations': 5000, 'budget': 1.0}
+EVENT_CHUNK = 100  # calls per timing sample for the microsecond-scale stages
+
+
+def generate_events(n, seed=0):
+    # Synthetic runtime events with roughly production-like value ranges, including ~2% invalid ones
+    rng = random.Random(seed)
+    events = []
+    for _ in range(n):
+        event = {
+            'latency': rng.uniform(5, 900),
+            'health': rng.random(),
+            'failures': rng.randint(0, 5),
+            'services': [f'svc-{i}' for i in range(rng.randint(1, 8))],
+            'environment': rng.choice(('prod', 'prod', 'dev', 'test')),
+        }
+        if rng.random() < 0.02:
+            event[rng.choice(('latency', 'health', 'failures'))] = -1
+        events.append(event)
+    return events
+
+
+def synthetic_states(n):
+    # n distinct RL states in the adapter's dict shape
+    return [{'latency_level': i % 3, 'health_level': i / n, 'failure_count': (i // 3) % 6, 'service_count': (i // 18) % 8 + 1}
+            for i in range(n)]
+
+
+def summarize(stage, size, samples_ns, **extra):
+    samples = np.asarray(samples_ns, dtype=np.float64) / 1e3
+    result = {
+        'stage': stage,
+        'size': size,
+        'n': int(len(samples)),
+        'mean_us': float(samples.mean()),
+        'p50_us': float(np.percentile(samples, 50)),
+        'p99_us': float(np.percentile(samples, 99)),
+        'ops_per_s': float(1e6 / samples.mean()) if samples.mean() else float('inf'),
+    }
+    result.update(extra)
+    return result
+
+
+def time_calls(fn, calls, budget, chunk=1):
+    # Per-call time, measured over chunks of `chunk` consecutive calls so sub-microsecond
+    # stages are not dominated by timer overhead; stops early once `budget` seconds are spent
+    samples = []
+    deadline = time.perf_counter() + budget
+    for i in range(0, len(calls), chunk):
+        batch = calls[i:i + chunk]
+        start = time.perf_counter_ns()
+        for args in batch:
+            fn(*args)
+        samples.append((time.perf_counter_ns() - start) / len(batch))
+        if time.perf_counter() > deadline:
+            break
+    return samples
+
+
+def populated_layer(size, storage, persistence, action_space_size=10, seed=0):
+    from rl_decision_layer import RLDecisionLayer
+    layer = RLDecisionLayer(action_space_size=action_space_size, storage=storage, persistence=persistence,
+                            summary_file=f'q_{storage}_{size}_{persistence}.json', snapshot_every=10 ** 9,
+                            snapshot_interval=10 ** 9)
+    rng = np.random.default_rng(seed)
+    states = synthetic_states(size)
+    if storage == 'dict':
+        for state in states:
+            layer.q_table[layer.get_state_key(state)] = rng.random(action_space_size)
+    else:
+        for state in states:
+            layer.q_table.row(state)
+        layer.q_table.matrix[:size] = rng.random((size, action_space_size))
+    return layer, states
+
+
+def bench_events(args, stages):
+    from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
+    from rl_decision_layer import RLDecisionLayer
+    from app_spec import AppSpec
+    from trace_writer import AsyncTraceWriter
+
+    configure_trace_logging()  # in the scratch directory; log_trace times the default logging sink
+    events = generate_events(args.iterations, args.seed)
+    bridge = RLOOrchestratorBridge(rl_layer=RLDecisionLayer(storage=args.storage, persistence='memory',
+                                                            summary_file='events.json'))
+    rl_states = [bridge.state_adapter.adapt(event) for event in events]
+    results = []
+
+    def specs():
+        return [(AppSpec.from_action(i % 5, event),) for i, event in enumerate(events)]
+
+    def traces():
+        return [({'runtime_state': event, 'rl_state': rl_state, 'rl_action': i % 5, 'proposed_action': 'monitor',
+                  'app_spec': AppSpec.from_action(i % 5, event), 'spec_valid': True,
+                  'safety_decision': AppSpec.from_action(4, event), 'reward': None},)
+                for i, (event, rl_state) in enumerate(zip(events, rl_states))]
+
+    if 'validate' in stages:
+        results.append(summarize('validate', None, time_calls(
+            bridge.contract_validator.validate, [(event,) for event in events], args.budget, EVENT_CHUNK)))
+    if 'adapt' in stages:
+        results.append(summarize('adapt', None, time_calls(
+            bridge.state_adapter.adapt, [(event,) for event in events], args.budget, EVENT_CHUNK)))
+    if 'get_state_key' in stages:
+        results.append(summarize('get_state_key', None, time_calls(
+            bridge.rl_layer.get_state_key, [(rl_state,) for rl_state in rl_states], args.budget, EVENT_CHUNK)))
+    if 'safety_guard' in stages:
+        results.append(summarize('safety_guard', None, time_calls(
+            bridge.safety_guard.guard, specs(), args.budget, EVENT_CHUNK)))
+    if 'log_trace' in stages:
+        results.append(summarize('log_trace', None, time_calls(
+            bridge._log_trace, traces(), args.budget, EVENT_CHUNK)))
+    if 'log_trace_async' in stages:
+        writer = AsyncTraceWriter('bench_traces.jsonl', max_queue=len(events) + 1, policy='block')
+        bridge.trace_sink = writer
+        results.append(summarize('log_trace_async', None, time_calls(
+            bridge._log_trace, traces(), args.budget, EVENT_CHUNK)))
+        writer.close()
+        bridge.trace_sink = None
+    if 'process_event' in stages:
+        results.append(summarize('process_event', None, time_calls(
+            bridge.process_runtime_event, [(event,) for event in events], args.budget, EVENT_CHUNK)))
+    if 'process_batch' in stages:
+        # Per-event time of process_runtime_events over EVENT_CHUNK-event batches
+        batches = [(events[i:i + EVENT_CHUNK],) for i in range(0, len(events), EVENT_CHUNK)]
+        samples = time_calls(bridge.process_runtime_events, batches, args.budget)
+        results.append(summarize('process_batch', None, [sample / EVENT_CHUNK for sample in samples]))
+    return results
+
+
+def bench_q_table(args, stages, size):
+    results = []
+    rng = random.Random(args.seed)
+    calls = args.iterations
+    for stage, persistence in (('process_state', 'memory'), ('record_memory', 'memory'),
+                               ('record_journal', 'journal'), ('record_eager', 'eager')):
+        if stage not in stages or (stage == 'record_eager' and size > args.eager_max):
+            continue
+        layer, states = populated_layer(size, args.storage, persistence, seed=args.seed)
+        picks = [states[rng.randrange(size)] for _ in range(calls)]
+        if stage == 'process_state':
+            samples = time_calls(layer.process_state, [(state,) for state in picks], args.budget, EVENT_CHUNK)
+        else:
+            nexts = [states[rng.randrange(size)] for _ in range(calls)]
+            samples = time_calls(layer.record_action_result,
+                                 [(state, rng.randrange(5), rng.uniform(-1, 1), next_state)
+                                  for state, next_state in zip(picks, nexts)], args.budget,
+                                 1 if persistence == 'eager' else EVENT_CHUNK)
+        if layer.journal is not None:
+            layer.journal.close()
+        results.append(summarize(stage, size, samples, storage=args.storage))
+    if 'cold_start' in stages:
+        results.append(bench_cold_start(args, size))
+    return results
+
+
+def bench_cold_start(args, size):
+    # Constructing a learner over a saved table of `size` states, as a restarted or scaled-out worker does
+    from rl_decision_layer import RLDecisionLayer
+    layer, _ = populated_layer(size, args.storage, 'memory', seed=args.seed)
+    layer.save_summary()
+    samples = []
+    for _ in range(args.trace_repeats):
+        start = time.perf_counter_ns()
+        RLDecisionLayer(storage=args.storage, persistence='memory', summary_file=layer.summary_file)
+        samples.append(time.perf_counter_ns() - start)
+    return summarize('cold_start', size, samples, storage=args.storage)
+
+
+def write_trace_log(path, lines, seed=0):
+    # A decision_traces.log in the bridge's logging format: decision lines, each followed by a reward line
+    from app_spec import AppSpec
+    rng = random.Random(seed)
+    events = generate_events(min(lines, 1000), seed)
+    with open(path, 'w') as f:
+        for i in range(0, lines, 2):
+            event = events[(i // 2) % len(events)]
+            action = rng.randrange(5)
+            trace = {'runtime_state': event, 'rl_state': {}, 'rl_action': action, 'proposed_action': 'monitor',
+                     'app_spec': AppSpec.from_action(action, event).to_trace(), 'spec_valid': True,
+                     'safety_decision': AppSpec.from_action(4, event).to_trace(), 'reward': None}
+            f.write(f'2026-01-01 00:00:00,000 - {json.dumps(trace)}\n')
+            if i + 1 < lines:
+                f.write(f'2026-01-01 00:00:00,001 - Reward recorded: {rng.choice((1, -1))}, Change: 0.1\n')
+
+
+def bench_traces(args, size):
+    # Cold load of a trace log of `size` lines, as the dashboard's load_traces does on first run
+    from trace_reader import IncrementalTraceReader
+    path = f'traces_{size}.log'
+    write_trace_log(path, size, args.seed)
+    samples = []
+    for _ in range(args.trace_repeats):
+        reader = IncrementalTraceReader(path)
+        start = time.perf_counter_ns()
+        reader.poll()
+        samples.append(time.perf_counter_ns() - start)
+        reader.close()
+    result = summarize('load_traces', size, samples)
+    result['per_line_us'] = result['mean_us'] / size
+    return result
+
+
+def compare(results, baseline, threshold, metric):
+    # (stage, size, baseline, current, ratio) for every stage slower than baseline * (1 + threshold)
+    base = {(r['stage'], r['size']): r[metric] for r in baseline['results']}
+    regressions = []
+    for result in results:
+        key = (result['stage'], result['size'])
+        if key in base and base[key] > 0:
+            ratio = result[metric] / base[key]
+            if ratio > 1 + threshold:
+                regressions.append((*key, base[key], result[metric], ratio))
+    return regressions
+
+
+def parse_sizes(text):
+    return [int(float(size)) for size in text.split(',') if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated subset of: ' + ', '.join(STAGES))
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Q-table sizes (states)')
+    parser.add_argument('--trace-sizes', default='1000,100000,1000000', help='trace log sizes (lines)')
+    parser.add_argument('--iterations', type=int, default=20000, help='calls per stage')
+    parser.add_argument('--budget', type=float, default=3.0, help='max seconds per stage')
+    parser.add_argument('--trace-repeats', type=int, default=3)
+    parser.add_argument('--eager-max', type=int, default=100000, help='largest Q-table for eager persistence')
+    parser.add_argument('--storage', default='dense', choices=('dict', 'dense'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help='small sizes and iteration counts, for CI')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown vs baseline (0.25 = 25%%)')
+    parser.add_argument('--metric', default='p50_us', choices=('mean_us', 'p50_us', 'p99_us'))
+    args = parser.parse_args(argv)
+    if args.quick:
+        for name, value in QUICK.items():
+            if getattr(args, name) == parser.get_default(name):
+                setattr(args, name, value)
+    stages = set(args.stages.split(','))
+    unknown = stages - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # Everything the pipeline writes (summaries, journals, trace logs) goes to a scratch directory
+    results = []
+    with tempfile.TemporaryDirectory(prefix='rl-bench-') as scratch:
+        cwd = os.getcwd()
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        os.chdir(scratch)
+        try:
+            if stages & set(EVENT_STAGES):
+                results.extend(bench_events(args, stages))
+            if stages & set(Q_STAGES):
+                for size in parse_sizes(args.sizes):
+                    results.extend(bench_q_table(args, stages, size))
+            if 'load_traces' in stages:
+                for size in parse_sizes(args.trace_sizes):
+                    results.append(bench_traces(args, size))
+        finally:
+            os.chdir(cwd)
+
+    for result in results:
+        size = '' if result['size'] is None else f"{result['size']:>9}"
+        print(f"{result['stage']:<16} {size:>9}  n={result['n']:<7} mean={result['mean_us']:>12.2f}us  "
+              f"p50={result['p50_us']:>12.2f}us  p99={result['p99_us']:>12.2f}us")
+    report = {
+        'meta': {'timestamp': time.time(), 'python': platform.python_version(), 'numpy': np.__version__,
+                 'machine': platform.machine(), 'storage': args.storage, 'iterations': args.iterations},
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.metric)
+        for stage, size, base, current, ratio in regressions:
+            print(f"REGRESSION {stage} size={size}: {args.metric} {base:.2f}us -> {current:.2f}us ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No stage regressed by more than {args.threshold:.0%} ({args.metric})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
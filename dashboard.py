@@ -1,21 +1,27 @@
 import streamlit as st
-import json
+import io
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime
+from collections import Counter
+import os
 import time
+from downsampling import minmax_downsample
+from q_table_snapshot import QTableSnapshot, snapshot_paths
+from trace_reader import IncrementalTraceReader
+from trace_store import SQLiteTraceStore
+
+POINT_BUDGET = 500  # max points per time-series chart
 
 st.set_page_config(page_title="RL Orchestration Dashboard", page_icon="🤖", layout="wide")
 
 st.title("🚀 RL Orchestration Dashboard")
 st.markdown("**Real-time monitoring of your Reinforcement Learning orchestration system**")
 
-# Auto-refresh
+# Auto-refresh: each section below is a fragment that re-runs on its own timer, and figures
+# are cached by data version, so a refresh only redraws what actually changed
 auto_refresh = st.sidebar.checkbox("Auto-refresh (every 5s)", value=True)
-if auto_refresh:
-    time.sleep(5)
-    st.rerun()
+refresh_every = 5 if auto_refresh else None
 
 # Sidebar controls
 st.sidebar.header("🎛️ Controls")
@@ -23,107 +29,193 @@ num_traces = st.sidebar.slider("Number of recent traces to show", 5, 50, 10)
 show_rewards = st.sidebar.checkbox("Show reward trends", value=True)
 show_q_heatmap = st.sidebar.checkbox("Show Q-table heatmap", value=True)
 
-# Load Q-table
-@st.cache_data(ttl=10)
-def load_q_table():
-    try:
-        with open('fusion_rl_summary.json', 'r') as f:
-            data = json.load(f)
-        q_table = data.get('q_table', {})
-        last_updated = data.get('last_updated', 'Never')
-        return q_table, last_updated
-    except FileNotFoundError:
-        return {}, 'Never'
-
-# Load decision traces
-@st.cache_data(ttl=10)
+def file_version(*paths):
+    # Cheap change detector: (mtime, size) of each file, None when missing
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+# Load Q-table: the compact snapshot is memory-mapped, so a cache miss only reads a small manifest;
+# the full JSON summary is parsed only when there is no snapshot or it lags the JSON by more than
+# SNAPSHOT_MAX_LAG (a running eager layer refreshes it every snapshot_interval, 60 s by default)
+Q_SUMMARY_FILE = 'fusion_rl_summary.json'
+Q_SNAPSHOT_FILE = snapshot_paths(Q_SUMMARY_FILE)[0]
+SNAPSHOT_MAX_LAG = 60.0
+
+@st.cache_resource(max_entries=2)
+def load_q_snapshot(version):
+    return QTableSnapshot.load(Q_SUMMARY_FILE, max_lag=SNAPSHOT_MAX_LAG)
+
+def q_table_snapshot():
+    return load_q_snapshot(file_version(Q_SNAPSHOT_FILE, Q_SUMMARY_FILE))
+
+# Load decision traces incrementally: readers live across reruns and only parse appended lines
+@st.cache_resource
+def get_trace_readers():
+    return [IncrementalTraceReader('decision_traces.log', point_budget=POINT_BUDGET),
+            IncrementalTraceReader('decision_traces.jsonl', point_budget=POINT_BUDGET)]
+
+@st.cache_resource
+def get_trace_store():
+    return SQLiteTraceStore('decision_traces.db')
+
 def load_traces():
     traces = []
-    try:
-        with open('decision_traces.log', 'r') as f:
-            lines = f.readlines()
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            if '{' in line:
-                parts = line.split(' - ', 1)
-                if len(parts) > 1:
-                    timestamp = parts[0]
-                    json_part = parts[1].strip()
-                    try:
-                        trace = json.loads(json_part)
-                        trace['timestamp'] = timestamp
-                        
-                        # Check next lines for reward
-                        j = i + 1
-                        while j < len(lines) and 'Reward recorded:' in lines[j]:
-                            reward_line = lines[j]
-                            if 'Reward recorded:' in reward_line:
-                                reward_part = reward_line.split('Reward recorded: ')[1].split(',')[0].strip()
-                                try:
-                                    trace['reward'] = float(reward_part)
-                                except:
-                                    pass
-                            j += 1
-                        i = j - 1  # Skip the reward lines
-                        
-                        traces.append(trace)
-                    except:
-                        pass
-            i += 1
-    except FileNotFoundError:
-        pass
+    for reader in trace_readers:
+        reader.poll()
+        traces.extend(reader.traces())
     return traces
 
-q_table, last_updated = load_q_table()
-traces = load_traces()
+def trace_version():
+    return tuple(reader.version for reader in trace_readers)
+
+def series_points(name, cumulative=False):
+    # Concatenate one decimated series across readers (JSONL history continues the log file's)
+    xs, ys = [], []
+    x_offset = y_offset = 0
+    for reader in trace_readers:
+        series = getattr(reader, name)
+        x, y = series.points()
+        xs.append(x + x_offset)
+        ys.append(y + y_offset)
+        x_offset += len(series)
+        if cumulative:
+            y_offset += reader.total_reward
+    x, y = np.concatenate(xs), np.concatenate(ys)
+    keep, y = minmax_downsample(y, POINT_BUDGET)
+    return x[keep], y
+
+# Rendered figures are cached as PNG bytes keyed by (data version, figure name);
+# `_draw` is not hashed and only runs on a cache miss
+@st.cache_data(max_entries=64)
+def render_figure(version, name, _draw):
+    fig = _draw()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+def line_figure(x, y, title, color=None, xlabel=None, ylabel=None, ylim=None):
+    fig, ax = plt.subplots()
+    ax.plot(x, y, color=color, marker='o' if len(y) <= 50 else None)
+    ax.set_title(title)
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    if ylim:
+        ax.set_ylim(*ylim)
+    return fig
+
+def bar_figure(counts, title, color, xlabel, rotation):
+    fig, ax = plt.subplots()
+    counts.plot(kind='bar', ax=ax, color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("Count")
+    plt.setp(ax.get_xticklabels(), rotation=rotation)
+    return fig
+
+trace_readers = get_trace_readers()
 
 # Main metrics
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    st.metric("States Learned", len(q_table))
-with col2:
-    st.metric("Total Decisions", len(traces))
-with col3:
-    success_rate = len([t for t in traces if t.get('reward') == 1]) / len(traces) * 100 if traces else 0
-    st.metric("Success Rate", f"{success_rate:.1f}%")
-with col4:
-    st.metric("Last Updated", last_updated)
-
-# RL Q-Table Section
-st.header("🧠 RL Q-Table")
-if q_table:
-    df_q = pd.DataFrame.from_dict(q_table, orient='index')
-    df_q.columns = [f'Action {i}' for i in range(len(df_q.columns))]
+@st.fragment(run_every=refresh_every)
+def metrics_section():
+    snapshot = q_table_snapshot()
+    load_traces()
+    total_decisions = sum(reader.decisions for reader in trace_readers)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("States Learned", len(snapshot) if snapshot is not None else 0)
+    with col2:
+        st.metric("Total Decisions", total_decisions)
+    with col3:
+        success_rate = sum(reader.successes for reader in trace_readers) / total_decisions * 100 if total_decisions else 0
+        st.metric("Success Rate", f"{success_rate:.1f}%")
+    with col4:
+        st.metric("Last Updated", snapshot.last_updated if snapshot is not None else "Never")
 
+# RL Q-Table Section: every view is bounded (one page, top K, or a grid of aggregated levels)
+def q_rows_frame(snapshot, rows):
+    df_q = pd.DataFrame(np.asarray(snapshot.q[rows]), index=snapshot.labels(rows),
+                        columns=[f'Action {i}' for i in range(snapshot.q.shape[1])])
+    df_q.insert(0, 'Visits', np.asarray(snapshot.visits[rows]))
+    df_q['Best Action'] = np.asarray(snapshot.q[rows]).argmax(axis=1) if len(rows) else []
+    return df_q
+
+def heatmap_figure(values, xlabels, ylabels, title, xlabel, ylabel):
+    fig, ax = plt.subplots(figsize=(6, 4))
+    im = ax.imshow(values, cmap='viridis', aspect='auto')
+    ax.set_xticks(range(len(xlabels)))
+    ax.set_xticklabels(xlabels, rotation=45)
+    ax.set_yticks(range(len(ylabels)))
+    ax.set_yticklabels(ylabels)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    plt.colorbar(im, ax=ax)
+    return fig
+
+@st.fragment(run_every=refresh_every)
+def q_table_section():
+    st.header("🧠 RL Q-Table")
+    snapshot = q_table_snapshot()
+    if snapshot is None or not len(snapshot):
+        st.info("No Q-table data yet. Run some decisions first!")
+        return
+
+    features = snapshot.feature_names
+    view = st.radio("View", ["Page", "Top K", "Aggregate"], horizontal=True, key='q_view')
     col1, col2 = st.columns([2, 1])
     with col1:
-        st.dataframe(df_q.style.highlight_max(axis=1, color='lightgreen'), height=300)
+        if view == "Page":
+            page_size = st.selectbox("States per page", [25, 50, 100, 200], index=1, key='q_page_size')
+            pages = max(1, -(-len(snapshot) // page_size))
+            page = st.number_input(f"Page (of {pages})", 1, pages, 1, key='q_page') - 1
+            st.dataframe(q_rows_frame(snapshot, snapshot.page(page, page_size)), height=300)
+        elif view == "Top K":
+            by = st.selectbox("Rank by", ["visits", "spread"], key='q_top_by',
+                              format_func=lambda b: "Visit count" if b == 'visits' else "Value spread (max - min)")
+            k = st.slider("K", 5, 200, 20, key='q_top_k')
+            st.dataframe(q_rows_frame(snapshot, snapshot.top_k(k, by)), height=300)
+        else:
+            feature = st.selectbox("Aggregate by", features, key='q_agg_feature')
+            labels, means, counts = snapshot.aggregate(feature)
+            df_agg = pd.DataFrame(means, index=labels, columns=[f'Action {i}' for i in range(means.shape[1])])
+            df_agg.insert(0, 'States', counts)
+            df_agg['Best Action'] = means.argmax(axis=1)
+            st.dataframe(df_agg, height=300)
 
     with col2:
         if show_q_heatmap:
-            fig, ax = plt.subplots(figsize=(6, 4))
-            im = ax.imshow(df_q.values, cmap='viridis', aspect='auto')
-            ax.set_xticks(range(len(df_q.columns)))
-            ax.set_xticklabels(df_q.columns, rotation=45)
-            ax.set_yticks(range(len(df_q.index)))
-            ax.set_yticklabels([f'State {i}' for i in range(len(df_q.index))])
-            ax.set_title("Q-Table Heatmap")
-            plt.colorbar(im, ax=ax)
-            st.pyplot(fig)
-
-    # Best actions per state
-    st.subheader("Best Actions per State")
-    best_actions = df_q.idxmax(axis=1)
-    st.write(best_actions)
-
-else:
-    st.info("No Q-table data yet. Run some decisions first!")
+            x_feature = st.selectbox("Heatmap x", features, key='q_heat_x')
+            y_feature = st.selectbox("Heatmap y", ["actions"] + features, key='q_heat_y')
+            version = (file_version(Q_SNAPSHOT_FILE, Q_SUMMARY_FILE), x_feature, y_feature)
+            if y_feature == "actions":
+                def draw_heatmap():
+                    labels, means, _ = snapshot.aggregate(x_feature)
+                    return heatmap_figure(means.T, labels, [f'Action {i}' for i in range(means.shape[1])],
+                                          "Mean Q-value", x_feature, "action")
+            else:
+                def draw_heatmap():
+                    x_labels, y_labels, grid = snapshot.pivot(x_feature, y_feature)
+                    return heatmap_figure(grid, x_labels, y_labels, "Mean state value (max Q)", x_feature, y_feature)
+            st.image(render_figure(version, 'q_heatmap', draw_heatmap))
 
 # Decision Traces Section
-st.header("📋 Decision Traces")
-if traces:
+@st.fragment(run_every=refresh_every)
+def traces_section():
+    st.header("📋 Decision Traces")
+    traces = load_traces()
+    if not traces:
+        st.info("No decision traces yet. Run the orchestrator!")
+        return
+
     df_traces = pd.DataFrame(traces[-num_traces:])
 
     # Filters
@@ -143,102 +235,137 @@ if traces:
     # Reward analysis
     if show_rewards:
         st.subheader("💰 Reward Analysis")
-        rewards = df_traces['reward'].dropna()
+        rewards = df_traces['reward'].dropna() if 'reward' in df_traces else pd.Series(dtype=float)
         if not rewards.empty:
+            version = (trace_version(), num_traces, tuple(action_filter), tuple(safety_filter))
             col1, col2 = st.columns(2)
             with col1:
-                fig, ax = plt.subplots()
-                rewards.plot(ax=ax, marker='o')
-                ax.set_title("Rewards Over Time")
-                ax.set_xlabel("Decision #")
-                ax.set_ylabel("Reward")
-                st.pyplot(fig)
+                def draw_rewards():
+                    fig, ax = plt.subplots()
+                    rewards.plot(ax=ax, marker='o')
+                    ax.set_title("Rewards Over Time")
+                    ax.set_xlabel("Decision #")
+                    ax.set_ylabel("Reward")
+                    return fig
+                st.image(render_figure(version, 'rewards', draw_rewards))
 
             with col2:
-                reward_counts = rewards.value_counts()
-                fig, ax = plt.subplots()
-                reward_counts.plot(kind='pie', ax=ax, autopct='%1.1f%%')
-                ax.set_title("Reward Distribution")
-                st.pyplot(fig)
-
-else:
-    st.info("No decision traces yet. Run the orchestrator!")
+                def draw_reward_distribution():
+                    fig, ax = plt.subplots()
+                    rewards.value_counts().plot(kind='pie', ax=ax, autopct='%1.1f%%')
+                    ax.set_title("Reward Distribution")
+                    return fig
+                st.image(render_figure(version, 'reward_distribution', draw_reward_distribution))
 
 # Action Distribution
-st.header("🎯 Action Distribution")
-actions = [t.get('rl_action') for t in traces if 'rl_action' in t]
-if actions:
-    action_counts = pd.Series(actions).value_counts()
+@st.fragment(run_every=refresh_every)
+def action_distribution_section():
+    st.header("🎯 Action Distribution")
+    load_traces()
+    version = trace_version()
+    action_totals = sum((reader.action_counts for reader in trace_readers), Counter())
+    if not action_totals:
+        return
     col1, col2 = st.columns(2)
 
     with col1:
-        fig, ax = plt.subplots()
-        action_counts.plot(kind='bar', ax=ax, color='skyblue')
-        ax.set_title("RL Actions Chosen")
-        ax.set_xlabel("Action ID")
-        ax.set_ylabel("Count")
-        plt.xticks(rotation=0)
-        st.pyplot(fig)
+        action_counts = pd.Series(action_totals).sort_values(ascending=False)
+        st.image(render_figure(version, 'rl_actions', lambda: bar_figure(
+            action_counts, "RL Actions Chosen", 'skyblue', "Action ID", 0)))
 
     with col2:
-        safety_actions = [t.get('safety_decision', {}).get('action') for t in traces if isinstance(t.get('safety_decision'), dict)]
-        if safety_actions:
-            safety_counts = pd.Series(safety_actions).value_counts()
-            fig, ax = plt.subplots()
-            safety_counts.plot(kind='bar', ax=ax, color='lightcoral')
-            ax.set_title("Safety-Modified Actions")
-            ax.set_xlabel("Action")
-            ax.set_ylabel("Count")
-            plt.xticks(rotation=45)
-            st.pyplot(fig)
-
-# System Health
-st.header("🏥 System Health Indicators")
-if traces:
-    recent_traces = traces[-20:]  # Last 20 decisions
-
-    health_scores = [t.get('runtime_state', {}).get('health', 0) for t in recent_traces]
-    latency_scores = [t.get('runtime_state', {}).get('latency', 0) for t in recent_traces]
-    failure_counts = [t.get('runtime_state', {}).get('failures', 0) for t in recent_traces]
+        safety_totals = sum((reader.safety_counts for reader in trace_readers), Counter())
+        if safety_totals:
+            safety_counts = pd.Series(safety_totals).sort_values(ascending=False)
+            st.image(render_figure(version, 'safety_actions', lambda: bar_figure(
+                safety_counts, "Safety-Modified Actions", 'lightcoral', "Action", 45)))
+
+# System Health (full history, min/max-decimated to POINT_BUDGET points)
+@st.fragment(run_every=refresh_every)
+def system_health_section():
+    st.header("🏥 System Health Indicators")
+    load_traces()
+    if not any(reader.decisions for reader in trace_readers):
+        return
+    version = trace_version()
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        fig, ax = plt.subplots()
-        ax.plot(health_scores, marker='o', color='green')
-        ax.set_title("Recent Health Scores")
-        ax.set_ylim(0, 1)
-        st.pyplot(fig)
-
+        st.image(render_figure(version, 'health', lambda: line_figure(
+            *series_points('health_series'), "Health Scores", color='green', ylim=(0, 1))))
     with col2:
-        fig, ax = plt.subplots()
-        ax.plot(latency_scores, marker='o', color='orange')
-        ax.set_title("Recent Latency")
-        st.pyplot(fig)
-
+        st.image(render_figure(version, 'latency', lambda: line_figure(
+            *series_points('latency_series'), "Latency", color='orange')))
     with col3:
-        fig, ax = plt.subplots()
-        ax.plot(failure_counts, marker='o', color='red')
-        ax.set_title("Recent Failures")
-        st.pyplot(fig)
+        st.image(render_figure(version, 'failures', lambda: line_figure(
+            *series_points('failure_series'), "Failures", color='red')))
 
 # Learning Progress
-st.header("📈 Learning Progress")
-if len(traces) > 1:
-    cumulative_rewards = []
-    total = 0
-    for t in traces:
-        reward = t.get('reward')
-        if reward is not None:
-            total += reward
-            cumulative_rewards.append(total)
-
-    if cumulative_rewards:
-        fig, ax = plt.subplots()
-        ax.plot(cumulative_rewards, marker='o')
-        ax.set_title("Cumulative Rewards (Learning Progress)")
-        ax.set_xlabel("Decisions")
-        ax.set_ylabel("Total Reward")
-        st.pyplot(fig)
+@st.fragment(run_every=refresh_every)
+def learning_progress_section():
+    st.header("📈 Learning Progress")
+    load_traces()
+    if not any(len(reader.reward_series) for reader in trace_readers):
+        return
+    st.image(render_figure(trace_version(), 'cumulative_rewards', lambda: line_figure(
+        *series_points('reward_series', cumulative=True), "Cumulative Rewards (Learning Progress)",
+        xlabel="Decisions", ylabel="Total Reward")))
+
+# Trace History (optional SQLite store)
+@st.fragment(run_every=refresh_every)
+def trace_history_section():
+    st.header("🗄️ Trace History")
+    store = get_trace_store()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        history_env = st.selectbox("Environment", ['all', 'prod', 'dev', 'test'])
+    with col2:
+        history_days = st.selectbox("Range", [1, 7, 30], index=1, format_func=lambda d: f"Last {d} day(s)")
+    with col3:
+        bucket_minutes = st.selectbox("Bucket (minutes)", [1, 15, 60, 1440], index=2)
+    environment = None if history_env == 'all' else history_env
+    since = time.time() - history_days * 86400
+    # Minute-granular key so the relative range does not invalidate the cache on every run
+    version = (file_version('decision_traces.db', 'decision_traces.db-wal'), history_env, history_days,
+               bucket_minutes, int(since // 60))
+
+    rollup = store.rollup(bucket_minutes=bucket_minutes, environment=environment, since=since)
+    if not rollup:
+        st.info("No stored traces in this range.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        def draw_rollup():
+            df_rollup = pd.DataFrame(rollup)
+            keep, _ = minmax_downsample(df_rollup['decisions'].to_numpy(), POINT_BUDGET)
+            df_rollup = df_rollup.iloc[keep]
+            df_rollup['bucket'] = pd.to_datetime(df_rollup['bucket'], unit='s')
+            fig, ax = plt.subplots()
+            df_rollup.plot(x='bucket', y=['decisions', 'downgrades'], ax=ax)
+            ax.set_title("Decisions and Downgrades")
+            return fig
+        st.image(render_figure(version, 'rollup', draw_rollup))
+    with col2:
+        def draw_downgrades():
+            downgrade_rates = pd.Series({action: store.downgrade_rate(action, environment=environment, since=since)
+                                         for action in ['scale_up', 'scale_down', 'restart', 'heal']})
+            fig, ax = plt.subplots()
+            downgrade_rates.plot(kind='bar', ax=ax, color='lightcoral')
+            ax.set_title("Downgrade Rate by Proposed Action")
+            ax.set_ylim(0, 1)
+            plt.setp(ax.get_xticklabels(), rotation=45)
+            return fig
+        st.image(render_figure(version, 'downgrade_rates', draw_downgrades))
+
+metrics_section()
+q_table_section()
+traces_section()
+action_distribution_section()
+system_health_section()
+learning_progress_section()
+if os.path.exists('decision_traces.db'):
+    trace_history_section()
 
 st.markdown("---")
-st.caption("Advanced RL Orchestration Monitoring Dashboard")
\ No newline at end of file
+st.caption("Advanced RL Orchestration Monitoring Dashboard")
@@ -0,0 +1,215 @@
+import ast
+import numpy as np
+
+
+def canonical_key(state):
+    # Dict states are keyed by their sorted items so field order never matters;
+    # anything else (ints, tuples) is already a hashable key
+    if isinstance(state, dict):
+        return tuple(sorted(state.items()))
+    return state
+
+
+def key_to_str(key):
+    # Same string RLDecisionLayer.get_state_key produces, so snapshots stay interchangeable
+    if isinstance(key, tuple) and key and all(isinstance(item, tuple) for item in key):
+        return str(list(key))
+    return str(key)
+
+
+def key_from_str(key_str):
+    try:
+        key = ast.literal_eval(key_str)
+    except (ValueError, SyntaxError):
+        return key_str
+    if isinstance(key, list):
+        return tuple(tuple(item) if isinstance(item, list) else item for item in key)
+    return key
+
+
+class SnapshotKeys:
+    """Row -> canonical key list whose leading rows come from a Q-table snapshot, decoded on access."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.base = len(snapshot)
+        self.extra = []
+
+    def __len__(self):
+        return self.base + len(self.extra)
+
+    def __getitem__(self, row):
+        if row < self.base:
+            return key_from_str(self.snapshot.key_str(row))
+        return self.extra[row - self.base]
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def append(self, key):
+        self.extra.append(key)
+
+
+class DenseQTable:
+    """Q-values for all states in one growable 2-D float64 matrix.
+
+    Each state is interned once into an integer row; afterwards a lookup is a
+    single dict probe and every Q operation is a row operation on the matrix.
+    """
+
+    def __init__(self, action_space_size, initial_capacity=1024):
+        self.action_space_size = action_space_size
+        self.matrix = np.zeros((max(1, initial_capacity), action_space_size), dtype=np.float64)
+        self.visits = np.zeros(max(1, initial_capacity), dtype=np.int64)  # learning updates per row
+        self.keys = []  # row -> canonical key
+        self.index = {}  # canonical key -> row
+        self._snapshot = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        # Backed by a QTableSnapshot opened with mmap_mode='c': start-up maps the files instead of
+        # reading them, pages load on first touch, and snapshot keys resolve through its hash index
+        # when first looked up. The first new state copies the matrix into memory (see _grow).
+        table = cls(snapshot.q.shape[1], initial_capacity=1)
+        if not len(snapshot):
+            return table
+        table.matrix = snapshot.q
+        table.visits = snapshot.visits
+        table.keys = SnapshotKeys(snapshot)
+        table._snapshot = snapshot
+        return table
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, state):
+        return self._find(canonical_key(state)) is not None
+
+    def _find(self, key):
+        row = self.index.get(key)
+        if row is None and self._snapshot is not None:
+            row = self._snapshot.find(key_to_str(key))
+            if row is not None:
+                self.index[key] = row
+        return row
+
+    def row(self, state):
+        key = canonical_key(state)
+        row = self.index.get(key)
+        if row is None:
+            row = self._intern(key)
+        return row
+
+    def rows(self, states):
+        # row() over a batch, with the canonicalization and index probe inlined
+        index = self.index
+        rows = []
+        for state in states:
+            key = tuple(sorted(state.items())) if isinstance(state, dict) else state
+            row = index.get(key)
+            rows.append(self._intern(key) if row is None else row)
+        return np.array(rows, dtype=np.int64)
+
+    def row_for_key(self, key):
+        row = self.index.get(key)
+        if row is None:
+            row = self._intern(key)
+        return row
+
+    def _intern(self, key):
+        row = self._find(key)
+        if row is not None:
+            return row
+        row = len(self.keys)
+        if row == self.matrix.shape[0]:
+            self._grow(2 * row)
+        self.keys.append(key)
+        self.index[key] = row
+        return row
+
+    def _grow(self, capacity):
+        # Amortized doubling: copying is O(n) but happens O(log n) times
+        matrix = np.zeros((capacity, self.action_space_size), dtype=np.float64)
+        matrix[:len(self.keys)] = self.matrix[:len(self.keys)]
+        self.matrix = matrix
+        visits = np.zeros(capacity, dtype=np.int64)
+        visits[:len(self.keys)] = self.visits[:len(self.keys)]
+        self.visits = visits
+
+    def values(self, row):
+        return self.matrix[row]
+
+    def gather(self, rows):
+        return self.matrix[rows]
+
+    def set(self, row, action, value):
+        self.matrix[row, action] = value
+
+    def key_str(self, row):
+        if self._snapshot is not None and row < self.keys.base:
+            return self._snapshot.key_str(row)  # stored in key_to_str form already
+        return key_to_str(self.keys[row])
+
+    def td_update(self, row, action, reward, next_row, learning_rate, discount_factor):
+        # One Q-learning step on a single cell; returns (old, new)
+        q = self.matrix
+        old_value = q[row, action]
+        new_value = old_value + learning_rate * (reward + discount_factor * q[next_row].max() - old_value)
+        q[row, action] = new_value
+        self.visits[row] += 1
+        return old_value, new_value
+
+    def td_update_batch(self, rows, actions, rewards, next_rows, learning_rate, discount_factor, dones=None):
+        # Batched Q-learning step. Targets use the pre-batch table; when a (row, action) cell
+        # appears k times its updates are folded in order, giving exactly what k sequential
+        # td_update calls would: (1-lr)^k * old + sum(lr * (1-lr)^(k-1-i) * target_i).
+        # Returns (cells, old, new) for the distinct flat cell indices touched.
+        rows = np.asarray(rows, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        next_max = self.matrix[next_rows].max(axis=1)
+        if dones is not None:
+            next_max = np.where(dones, 0.0, next_max)
+        targets = np.asarray(rewards, dtype=np.float64) + discount_factor * next_max
+
+        flat = rows * self.action_space_size + actions
+        order = np.argsort(flat, kind='stable')
+        cells, start, counts = np.unique(flat[order], return_index=True, return_counts=True)
+        group = np.repeat(np.arange(len(cells)), counts)
+        remaining = counts[group] - 1 - (np.arange(len(flat)) - start[group])
+        folded = np.zeros(len(cells))
+        np.add.at(folded, group, learning_rate * (1 - learning_rate) ** remaining * targets[order])
+
+        q = self.matrix.reshape(-1)
+        old_values = q[cells]
+        new_values = (1 - learning_rate) ** counts * old_values + folded
+        q[cells] = new_values
+        np.add.at(self.visits, rows, 1)
+        return cells, old_values, new_values
+
+    def active(self):
+        # View of the populated rows only
+        return self.matrix[:len(self.keys)]
+
+    def snapshot_arrays(self):
+        # (keys, Q-matrix, visit counts) for the populated rows; keys are canonical keys,
+        # or key strings when the table is backed by a snapshot (write_q_snapshot takes both)
+        n = len(self.keys)
+        keys = self.keys if self._snapshot is None else [self.key_str(row) for row in range(n)]
+        return keys, self.matrix[:n], self.visits[:n]
+
+    def items(self):
+        matrix = self.active()
+        for row in range(len(self.keys)):
+            yield self.key_str(row), matrix[row]
+
+    def to_dict(self):
+        return {key: values.copy() for key, values in self.items()}
+
+    def to_lists(self):
+        return {key: values.tolist() for key, values in self.items()}
+
+    def load_dict(self, q_table):
+        for key_str, values in q_table.items():
+            row = self.row_for_key(key_from_str(key_str))
+            self.matrix[row] = values
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def minmax_downsample(values, budget=500):
+    # Min/max decimation of an in-memory series: split into budget // 2 chunks and keep
+    # each chunk's extremes (in x order), so spikes survive. Returns (x, y) arrays.
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n <= budget:
+        return np.arange(n), y
+    chunks = max(1, budget // 2)
+    edges = np.linspace(0, n, chunks + 1).astype(np.int64)
+    x = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop <= start:
+            continue
+        chunk = y[start:stop]
+        lo, hi = start + int(np.argmin(chunk)), start + int(np.argmax(chunk))
+        x.extend(sorted({lo, hi}))
+    x = np.array(x)
+    return x, y[x]
+
+
+class MinMaxSeries:
+    """Streaming min/max decimation of an unbounded series into a fixed point budget.
+
+    Values fall into buckets of `bucket_size` consecutive samples, each keeping
+    its min and max (and where they occurred). When the bucket count reaches
+    about budget // 2, neighbouring buckets are merged pairwise and the bucket size
+    doubles, so memory and plotting cost stay bounded however long the series.
+    """
+
+    def __init__(self, budget=500):
+        # Even bucket count, so a pairwise merge always leaves aligned buckets
+        self.max_buckets = max(2, budget // 4 * 2)
+        self.bucket_size = 1
+        self.count = 0
+        self.buckets = []  # [lo_x, lo, hi_x, hi]
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        x = self.count
+        self.count += 1
+        if x % self.bucket_size == 0:
+            if len(self.buckets) == self.max_buckets:
+                self._merge()
+            self.buckets.append([x, value, x, value])
+            return
+        bucket = self.buckets[-1]
+        if value < bucket[1]:
+            bucket[0], bucket[1] = x, value
+        if value > bucket[3]:
+            bucket[2], bucket[3] = x, value
+
+    def _merge(self):
+        merged = []
+        for i in range(0, len(self.buckets), 2):
+            pair = self.buckets[i:i + 2]
+            lo = min(pair, key=lambda b: b[1])
+            hi = max(pair, key=lambda b: b[3])
+            merged.append([lo[0], lo[1], hi[2], hi[3]])
+        self.buckets = merged
+        self.bucket_size *= 2
+
+    def points(self):
+        # (x, y) arrays with each bucket's extremes in the order they occurred
+        x, y = [], []
+        for lo_x, lo, hi_x, hi in self.buckets:
+            if lo_x == hi_x:
+                x.append(lo_x)
+                y.append(lo)
+            elif lo_x < hi_x:
+                x.extend((lo_x, hi_x))
+                y.extend((lo, hi))
+            else:
+                x.extend((hi_x, lo_x))
+                y.extend((hi, lo))
+        return np.array(x), np.array(y, dtype=np.float64)
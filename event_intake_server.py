@@ -0,0 +1,267 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter, deque
+from sharded_bridge import routing_key
+
+
+class CoalescingQueue:
+    """Bounded queue holding at most one pending item per key.
+
+    put() on a key that already has a pending item replaces that item in place
+    (it keeps its turn), so a burst for one service costs one slot and only the
+    newest state is handed out. A key is never handed to two workers at once:
+    while its item is in progress, a newer one waits until done(key). When
+    `max_pending` keys are waiting, put() rejects new keys instead of blocking.
+    """
+
+    def __init__(self, max_pending=1024):
+        self.max_pending = max_pending
+        self.pending = {}  # key -> (item, monotonic time of its newest put)
+        self.ready = deque()  # pending keys not in progress, oldest first
+        self.in_progress = set()
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, key, item):
+        # Returns 'queued', 'coalesced' or 'rejected'
+        with self._cond:
+            if self.closed:
+                return 'rejected'
+            if key in self.pending:
+                self.pending[key] = (item, time.monotonic())
+                return 'coalesced'
+            if len(self.pending) >= self.max_pending:
+                return 'rejected'
+            self.pending[key] = (item, time.monotonic())
+            if key not in self.in_progress:
+                self.ready.append(key)
+                self._cond.notify()
+            return 'queued'
+
+    def get(self):
+        # (key, item, enqueued_at) of the oldest ready key; None once closed and drained
+        with self._cond:
+            while not self.ready:
+                if self.closed and not self.pending:
+                    return None
+                self._cond.wait()
+            key = self.ready.popleft()
+            item, enqueued_at = self.pending.pop(key)
+            self.in_progress.add(key)
+            return key, item, enqueued_at
+
+    def done(self, key):
+        with self._cond:
+            self.in_progress.discard(key)
+            if key in self.pending:
+                self.ready.append(key)
+                self._cond.notify()
+            elif self.closed and not self.pending:
+                self._cond.notify_all()
+
+    def close(self, drain=True):
+        # Stop accepting; with drain=False the pending items are discarded (and returned)
+        with self._cond:
+            self.closed = True
+            dropped = []
+            if not drain:
+                dropped = [item for item, _ in self.pending.values()]
+                self.pending.clear()
+                self.ready.clear()
+            self._cond.notify_all()
+            return dropped
+
+
+class EventIntakeServer:
+    """Local intake for runtime events: bounded, coalescing queue in front of a bridge.
+
+    Clients connect on a Unix socket (`address` is a path) or localhost TCP
+    (`address` is a (host, port) pair) and send one JSON runtime event per line;
+    each line is answered with {"status": "queued" | "coalesced" | "rejected",
+    "pending": n}. Events are keyed by service (sharded_bridge.routing_key) and
+    coalesced, so at most `max_pending` services wait at any time, each with
+    its newest state only; a full queue answers "rejected" at once, which is
+    the client's signal to back off. `workers` threads drain the queue into
+    bridge.process_runtime_event and pass each decision to
+    on_decision(key, runtime_data, decision), e.g. to execute it. Bridge calls
+    are serialized unless `concurrent_bridge` is set (ShardedOrchestratorBridge
+    is safe to call from several threads), so extra workers overlap the
+    on_decision work. Events that waited longer than `max_age` seconds are
+    dropped as expired. A {"op": "stats"} line is answered with the counters.
+    """
+
+    def __init__(self, bridge, address=('127.0.0.1', 8765), workers=4, max_pending=1024, max_age=None,
+                 on_decision=None, concurrent_bridge=False):
+        self.bridge = bridge
+        self.address = address
+        self.workers = workers
+        self.max_age = max_age
+        self.on_decision = on_decision
+        self.queue = CoalescingQueue(max_pending)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._bridge_lock = None if concurrent_bridge else threading.Lock()
+        self._threads = []
+        self.server = None
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def submit(self, runtime_data):
+        # In-process equivalent of sending one line; returns the status
+        if not isinstance(runtime_data, dict):
+            self._count('invalid')
+            return 'invalid'
+        # str(): a list- or dict-valued "service" would otherwise be an unhashable key
+        status = self.queue.put(str(routing_key(runtime_data)), runtime_data)
+        self._count(status)
+        return status
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['pending'] = len(self.queue)
+        return stats
+
+    def _decide(self, runtime_data):
+        if self._bridge_lock is None:
+            return self.bridge.process_runtime_event(runtime_data)
+        with self._bridge_lock:
+            return self.bridge.process_runtime_event(runtime_data)
+
+    def _work(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            key, runtime_data, enqueued_at = entry
+            try:
+                waited = time.monotonic() - enqueued_at
+                if self.max_age is not None and waited > self.max_age:
+                    self._count('expired')
+                    continue
+                decision = self._decide(runtime_data)
+                if self.on_decision is not None:
+                    self.on_decision(key, runtime_data, decision)
+                with self._stats_lock:
+                    self.stats['decided'] += 1
+                    self.stats['wait_seconds'] += waited
+                    self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], waited)
+            except Exception as e:
+                self._count('errors')
+                logging.error(f"Intake decision for {key} failed: {e!r}")
+            finally:
+                self.queue.done(key)
+
+    def _handle_line(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return {'status': 'invalid', 'error': 'invalid JSON'}
+        if isinstance(message, dict) and message.get('op') == 'stats':
+            return {'status': 'ok', 'stats': self.snapshot()}
+        return {'status': self.submit(message), 'pending': len(self.queue)}
+
+    def start(self):
+        intake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write((json.dumps(intake._handle_line(line)) + '\n').encode())
+
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.remove(self.address)  # stale socket from a previous run
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+        server_class = type('IntakeSocketServer', (server_class,), {'daemon_threads': True, 'allow_reuse_address': True})
+        self.server = server_class(self.address, Handler)
+        if not isinstance(self.address, str):
+            self.address = self.server.server_address[:2]  # the bound port when 0 was asked for
+        self._threads = [threading.Thread(target=self._work, name=f'intake-worker-{i}', daemon=True)
+                         for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self.server.serve_forever, name='intake-server', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def close(self, drain=True):
+        # Stop accepting events (later ones are rejected), then connections; the workers finish (or drop) the pending ones
+        self._count('discarded', len(self.queue.close(drain)))
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+        for thread in self._threads:
+            thread.join()
+
+
+class IntakeClient:
+    """Blocking client for EventIntakeServer: one JSON line out, one reply line back."""
+
+    def __init__(self, address=('127.0.0.1', 8765), timeout=5.0):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address if isinstance(address, str) else tuple(address))
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, message):
+        self.file.write((json.dumps(message) + '\n').encode())
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def send(self, runtime_data):
+        return self.request(runtime_data)
+
+    def stats(self):
+        return self.request({'op': 'stats'})['stats']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local, coalescing runtime-event intake for the RL bridge.")
+    parser.add_argument('--socket', help='Unix socket path (default: TCP on --host/--port)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-pending', type=int, default=1024)
+    parser.add_argument('--max-age', type=float, default=None, help='drop events that waited longer (seconds)')
+    args = parser.parse_args()
+
+    from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
+    configure_trace_logging()
+    intake = EventIntakeServer(RLOOrchestratorBridge(), args.socket or (args.host, args.port), workers=args.workers,
+                               max_pending=args.max_pending, max_age=args.max_age).start()
+    print(f"Event intake listening on {intake.address}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    intake.close()
+    intake.bridge.close()
+    print(f"Event intake stopped: {intake.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+
+TRANSITION_DTYPE = np.dtype([
+    ('state', np.int64),
+    ('action', np.int32),
+    ('reward', np.float64),
+    ('next_state', np.int64),
+    ('done', np.bool_),
+])
+
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of (state row, action, reward, next state row, done).
+
+    Storage is preallocated once, so memory is bounded by `capacity` and the
+    oldest transitions are overwritten first. With `prioritized=True`, samples
+    are drawn proportionally to priority ** alpha (new transitions get the
+    current max priority so each is replayed at least once soon). The weights
+    live in a sum-tree, so adding, re-prioritizing and sampling cost
+    O(log capacity) per transition instead of a pass over the whole buffer.
+    """
+
+    def __init__(self, capacity, prioritized=False, alpha=0.6, min_priority=1e-3):
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.min_priority = min_priority
+        self.transitions = np.zeros(capacity, dtype=TRANSITION_DTYPE)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+        self.max_priority = 1.0
+        self.position = 0
+        self.size = 0
+        if prioritized:
+            # Implicit binary tree: node k's children are 2k and 2k + 1, leaf i is node leaves + i
+            self.leaves = 1 << max(0, capacity - 1).bit_length()
+            self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done=False):
+        i = self.position
+        self.transitions[i] = (state, action, reward, next_state, done)
+        self.priorities[i] = self.max_priority
+        if self.prioritized:
+            self._set_weights(np.array([i]), np.array([self.max_priority]))
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _set_weights(self, indices, priorities):
+        # Write leaves, then recompute the sums on each level above the changed ones
+        nodes = indices + self.leaves
+        self.tree[nodes] = priorities ** self.alpha
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def sample(self, batch_size):
+        # Returns (buffer indices, transitions); sampling is with replacement
+        if self.prioritized:
+            # Descend from the root for all draws at once: go right when the draw exceeds the left sum
+            targets = np.random.rand(batch_size) * self.tree[1]
+            nodes = np.ones(batch_size, dtype=np.int64)
+            while nodes[0] < self.leaves:
+                left = self.tree[2 * nodes]
+                right = targets >= left
+                targets = np.where(right, targets - left, targets)
+                nodes = 2 * nodes + right
+            indices = np.minimum(nodes - self.leaves, self.size - 1)  # float rounding can step past the last leaf
+        else:
+            indices = np.random.randint(self.size, size=batch_size)
+        return indices, self.transitions[indices]
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.maximum(np.abs(td_errors), self.min_priority)
+        self.priorities[indices] = priorities
+        if self.prioritized:
+            # Later entries win for repeated indices, as with the fancy assignment above
+            unique, last = np.unique(indices[::-1], return_index=True)
+            self._set_weights(unique, priorities[::-1][last])
+        self.max_priority = max(self.max_priority, float(priorities.max()))
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import random
+from http import HTTPStatus
+
+
+class FakeRuntimeServer:
+    """Local HTTP stand-in for the Shivam runtime APIs, for exercising the async runner.
+
+    Routes (JSON over HTTP/1.1, one request per connection):
+      GET  /services                  -> {"services": [...]}
+      GET  /services/<name>/metrics   -> {"latency", "health", "failures", "services"}
+      POST /services/<name>/actions   -> applies the decision, {"accepted": true}
+    `delays` maps a service to how long its metrics call takes, to simulate slow services.
+    """
+
+    def __init__(self, services=('web', 'db', 'cache'), delays=None, host='127.0.0.1', port=0, seed=None):
+        self.host = host
+        self.port = port
+        self.delays = dict(delays or {})
+        self.random = random.Random(seed)
+        self.state = {
+            name: {'latency': 150.0, 'health': 0.85, 'failures': 1, 'services': [f'{name}-{i}' for i in range(2)]}
+            for name in services
+        }
+        self.executed = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, _ = (await reader.readline()).decode().split(' ', 2)
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode().partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            body = json.loads(await reader.readexactly(length)) if length else None
+            status, payload = await self._route(method, path, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {'error': 'bad request'}
+        data = json.dumps(payload).encode()
+        writer.write(f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        parts = path.strip('/').split('/')
+        if method == 'GET' and parts == ['services']:
+            return 200, {'services': list(self.state)}
+        if len(parts) != 3 or parts[0] != 'services' or parts[1] not in self.state:
+            return 404, {'error': 'not found'}
+        name = parts[1]
+        if method == 'GET' and parts[2] == 'metrics':
+            await asyncio.sleep(self.delays.get(name, 0))
+            self._drift(self.state[name])
+            return 200, dict(self.state[name])
+        if method == 'POST' and parts[2] == 'actions':
+            self._apply(self.state[name], (body or {}).get('action'))
+            self.executed.append((name, (body or {}).get('action')))
+            return 200, {'accepted': True}
+        return 404, {'error': 'not found'}
+
+    def _drift(self, state):
+        state['latency'] = max(1.0, state['latency'] + self.random.uniform(-30, 30))
+        state['health'] = max(0.0, min(1.0, state['health'] + self.random.uniform(-0.05, 0.05)))
+        state['failures'] = max(0, state['failures'] + self.random.choice((-1, 0, 0, 1)))
+
+    def _apply(self, state, action):
+        # Same effects the integration template simulates
+        if action == 'scale_up':
+            state['latency'] *= 0.8
+            state['health'] = min(1.0, state['health'] + 0.1)
+            state['services'].append(f"{state['services'][0].rsplit('-', 1)[0]}-{len(state['services'])}")
+        elif action == 'scale_down' and len(state['services']) > 1:
+            state['services'].pop()
+        elif action == 'restart':
+            state['failures'] = max(0, state['failures'] - 1)
+            state['health'] = min(1.0, state['health'] + 0.05)
+        elif action == 'heal':
+            state['failures'] = max(0, state['failures'] - 1)
+
+
+if __name__ == "__main__":
+    async def main():
+        server = await FakeRuntimeServer(delays={'db': 0.2}).start()
+        print(f"Fake runtime serving on {server.url}")
+        await server.server.serve_forever()
+
+    asyncio.run(main())
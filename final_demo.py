@@ -1,4 +1,4 @@
-from rl_orchestrator_bridge import RLOOrchestratorBridge
+from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
 import time
 import json
 
@@ -9,20 +9,21 @@ def simulate_runtime_event(bridge, event_data, outcome):
     
     # Simulate outcome
     time.sleep(0.1)  # Simulate time
-    bridge.record_outcome(event_data, decision.get('rl_action', 0), outcome)
+    bridge.record_outcome(event_data, decision.get('executed_action', 0), outcome)
     print(f"Outcome recorded: {outcome}")
     
     # Verified artifacts: Log detailed trace
     with open('demo_artifacts.json', 'a') as f:
         json.dump({
             'event': event_data,
-            'decision': decision,
+            'decision': decision.to_dict(),
             'outcome': outcome,
             'timestamp': time.time()
         }, f, indent=4)
         f.write('\n')
 
 def main():
+    configure_trace_logging()
     bridge = RLOOrchestratorBridge()
     
     # Clear previous artifacts
@@ -73,6 +74,7 @@ def main():
         'prev_health': 0.95
     }
     simulate_runtime_event(bridge, event3, outcome3)
+    bridge.close()
     
     print("Demo completed. Check decision_traces.log, fusion_rl_summary.json, and demo_artifacts.json for verified artifacts.")
 
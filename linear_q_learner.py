@@ -0,0 +1,241 @@
+import io
+import json
+import os
+import numpy as np
+from itertools import combinations_with_replacement
+
+# RawStateAdapter's fields (raw runtime metrics) and the range each is scaled from; values outside are clipped
+DEFAULT_RANGES = {
+    'latency': (0, 1000),
+    'health': (0, 1),
+    'failures': (0, 10),
+    'service_count': (0, 10),
+}
+
+
+class _Features:
+    def __init__(self, ranges=None):
+        self.ranges = dict(ranges or DEFAULT_RANGES)
+        self.fields = list(self.ranges)
+        self.lo = np.array([lo for lo, _ in self.ranges.values()], dtype=np.float64)
+        self.span = np.array([hi - lo for lo, hi in self.ranges.values()], dtype=np.float64)
+
+    def _values(self, state):
+        # The configured fields of a dict state; a missing one is an error rather than a silent 0
+        try:
+            return [state[field] for field in self.fields]
+        except KeyError as e:
+            raise KeyError(f"State has no {e.args[0]!r} field (features read {self.fields}); "
+                           f"use RawStateAdapter or pass matching ranges") from None
+
+    def inputs(self, rl_states):
+        # (n, fields) matrix in [0, 1]; dict states are read by field name, tuples / rows by position
+        if isinstance(rl_states, np.ndarray):
+            raw = rl_states.astype(np.float64).reshape(len(rl_states), -1)
+        else:
+            raw = np.array([self._values(state) if isinstance(state, dict) else state
+                            for state in rl_states], dtype=np.float64).reshape(len(rl_states), -1)
+        return np.clip((raw - self.lo) / self.span, 0.0, 1.0)
+
+    def transform(self, rl_states):
+        return self.expand(self.inputs(rl_states))
+
+    def transform_one(self, rl_state):
+        # Single-state transform() without the batch bookkeeping, for per-event decisions
+        raw = self._values(rl_state) if isinstance(rl_state, dict) else rl_state
+        x = (np.asarray(raw, dtype=np.float64) - self.lo) / self.span
+        return self.expand(np.clip(x, 0.0, 1.0, out=x)[None, :])[0]
+
+
+class PolynomialFeatures(_Features):
+    """Every monomial of the scaled inputs up to `degree`, bias included."""
+
+    def __init__(self, ranges=None, degree=2):
+        super().__init__(ranges)
+        self.degree = degree
+        # Each term is a product of `degree` entries of [1, x...]; padding with the leading 1 gives lower degrees
+        terms = combinations_with_replacement(range(len(self.fields) + 1), degree)
+        self.terms = np.array(list(terms), dtype=np.int64).reshape(-1, degree)
+        self.size = len(self.terms)
+
+    def expand(self, x):
+        x = np.concatenate([np.ones((len(x), 1)), x], axis=1)
+        return x[:, self.terms].prod(axis=2)
+
+    def config(self):
+        return {'type': 'polynomial', 'ranges': self.ranges, 'degree': self.degree}
+
+
+class TileFeatures(_Features):
+    """Tile coding: each input gets `tilings` offset grids of `tiles` tiles, plus a bias feature.
+
+    Inputs are tiled independently, so the feature count is linear in the number
+    of inputs; exactly one (binary) tile per grid is active.
+    """
+
+    def __init__(self, ranges=None, tiles=8, tilings=4):
+        super().__init__(ranges)
+        self.tiles = tiles
+        self.tilings = tilings
+        self.width = tiles + 1  # offset grids overhang the range by one tile
+        self.offsets = np.arange(tilings) / tilings
+        self.size = 1 + len(self.fields) * tilings * self.width
+        # Feature index of tile 0 in each (input, tiling) grid; index 0 is the bias
+        self.base = 1 + (np.arange(len(self.fields))[:, None] * tilings + np.arange(tilings)[None, :]) * self.width
+
+    def expand(self, x):
+        n = len(x)
+        # Inputs are in [0, 1], so truncation is floor
+        active = self.base + (x[:, :, None] * self.tiles + self.offsets).astype(np.int64)
+        phi = np.zeros((n, self.size))
+        phi[:, 0] = 1.0
+        phi[np.arange(n)[:, None], active.reshape(n, -1)] = 1.0
+        return phi
+
+    def config(self):
+        return {'type': 'tiles', 'ranges': self.ranges, 'tiles': self.tiles, 'tilings': self.tilings}
+
+
+def features_from_config(config):
+    config = dict(config)
+    kind = config.pop('type')
+    config['ranges'] = {field: tuple(bounds) for field, bounds in config['ranges'].items()}
+    if kind == 'polynomial':
+        return PolynomialFeatures(**config)
+    if kind == 'tiles':
+        return TileFeatures(**config)
+    raise ValueError(f"Unknown feature type: {kind}")
+
+
+class LinearQLearner:
+    """Drop-in alternative to RLDecisionLayer with a linear Q-function.
+
+    Q(s, a) = weights[a] . phi(s), where phi is a fixed-size feature vector
+    (PolynomialFeatures or TileFeatures) over the numeric fields of the state,
+    so memory does not grow with the number of distinct states and unseen
+    states get values from similar ones. Pair it with RawStateAdapter, so the
+    features see the continuous runtime metrics rather than binned levels:
+    RLOOrchestratorBridge(rl_layer=LinearQLearner(), state_adapter=RawStateAdapter()).
+    A decision is one (actions x features) matrix-vector product. Updates are
+    semi-gradient Q-learning steps normalized by |phi|^2, so `learning_rate` is
+    the share of the TD error corrected, as in the tabular learner, whatever the
+    feature scale. A batch applies the sum of its per-transition steps, all
+    computed from the pre-batch weights, so each transition learns at the full
+    rate as it would alone; large batches of similar states (simulator
+    training) need a proportionally smaller rate. Weights are saved to `model_file`
+    every `snapshot_every` updates and on checkpoint(); persistence='memory'
+    only saves on checkpoint().
+    """
+
+    def __init__(self, action_space_size=10, features=None, learning_rate=0.1, discount_factor=0.9, epsilon=0.1,
+                 model_file='linear_q_model.npz', persistence='periodic', snapshot_every=1000):
+        if persistence not in ('periodic', 'memory'):
+            raise ValueError(f"Unknown persistence mode: {persistence}")
+        self.action_space_size = action_space_size
+        self.features = features  # None: the saved model's features, else PolynomialFeatures()
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.epsilon = epsilon
+        self.model_file = model_file
+        self.persistence = persistence
+        self.snapshot_every = snapshot_every
+        self.weights = None
+        self.updates = 0
+        self.pending = 0
+        self.metrics = None
+        self.load()
+        if self.features is None:
+            self.features = PolynomialFeatures()
+        if self.weights is None:
+            self.weights = np.zeros((action_space_size, self.features.size))
+
+    def load(self):
+        if not os.path.exists(self.model_file):
+            return
+        with np.load(self.model_file) as data:
+            config = json.loads(str(data['config']))
+            weights = data['weights']
+            updates = int(data['updates'])
+        if self.features is None:
+            self.features = features_from_config(config)
+        elif config != json.loads(json.dumps(self.features.config())):
+            raise ValueError(f"{self.model_file} was trained with different features")
+        if weights.shape != (self.action_space_size, self.features.size):
+            raise ValueError(f"{self.model_file} has weights of shape {weights.shape}")
+        self.weights = weights
+        self.updates = updates
+
+    def save(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, weights=self.weights, config=json.dumps(self.features.config()), updates=self.updates)
+        tmp_path = self.model_file + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, self.model_file)
+        self.pending = 0
+
+    def checkpoint(self):
+        if self.pending or not os.path.exists(self.model_file):
+            self.save()
+
+    def q_values(self, rl_states):
+        return self.features.transform(rl_states) @ self.weights.T
+
+    def process_state(self, rl_state, action_mask=None):
+        allowed = None if action_mask is None else np.flatnonzero(action_mask)
+        if allowed is not None and len(allowed) == 0:
+            allowed = None
+        if np.random.rand() < self.epsilon:
+            if allowed is None:
+                return int(np.random.randint(self.action_space_size))
+            return int(allowed[np.random.randint(len(allowed))])
+        q_values = self.weights @ self.features.transform_one(rl_state)
+        if allowed is None:
+            return int(np.argmax(q_values))
+        return int(allowed[np.argmax(q_values[allowed])])
+
+    def process_states(self, rl_states, action_masks=None):
+        # Same semantics as RLDecisionLayer.process_states
+        n = len(rl_states)
+        if action_masks is not None:
+            action_masks = np.asarray(action_masks, dtype=bool)
+            action_masks = action_masks | ~action_masks.any(axis=1, keepdims=True)
+            actions = np.where(action_masks, np.random.rand(n, self.action_space_size), -1.0).argmax(axis=1)
+        else:
+            actions = np.random.randint(self.action_space_size, size=n)
+        exploit = np.flatnonzero(np.random.rand(n) >= self.epsilon)
+        if len(exploit):
+            states = rl_states[exploit] if isinstance(rl_states, np.ndarray) else [rl_states[i] for i in exploit]
+            q_rows = self.q_values(states)
+            if action_masks is not None:
+                q_rows = np.where(action_masks[exploit], q_rows, -np.inf)
+            actions[exploit] = np.argmax(q_rows, axis=1)
+        return actions.tolist()
+
+    def record_action_result(self, rl_state, action, reward, next_rl_state):
+        return self.record_action_results([rl_state], [action], [reward], [next_rl_state])[0]
+
+    def record_action_results(self, rl_states, actions, rewards, next_rl_states):
+        # Returns the change of Q(s, a) for each transition, like RLDecisionLayer
+        n = len(rl_states)
+        if not n:
+            return []
+        actions = np.asarray(actions, dtype=np.int64)
+        phi = self.features.transform(rl_states)
+        next_max = (self.features.transform(next_rl_states) @ self.weights.T).max(axis=1)
+        old_values = np.einsum('ij,ij->i', phi, self.weights[actions])
+        td_errors = np.asarray(rewards, dtype=np.float64) + self.discount_factor * next_max - old_values
+        gradient = np.zeros_like(self.weights)
+        np.add.at(gradient, actions, (td_errors / np.einsum('ij,ij->i', phi, phi))[:, None] * phi)
+        self.weights += self.learning_rate * gradient
+        new_values = np.einsum('ij,ij->i', phi, self.weights[actions])
+
+        self.updates += n
+        self.pending += n
+        if self.persistence != 'memory' and self.pending >= self.snapshot_every:
+            self.save()
+        return (new_values - old_values).tolist()
+
+    def get_q_table_summary(self):
+        # No table to list; the weights and feature layout describe the whole Q-function
+        return {'weights': self.weights.tolist(), 'features': self.features.config(), 'updates': self.updates}
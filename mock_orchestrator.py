@@ -1,10 +1,8 @@
-from rl_orchestrator_bridge import RLOOrchestratorBridge
+from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
 import time
 import logging
 import numpy as np
 
-logging.basicConfig(filename='orchestrator.log', level=logging.INFO, format='%(asctime)s - %(message)s')
-
 class MockOrchestrator:
     def __init__(self):
         self.bridge = RLOOrchestratorBridge()
@@ -35,7 +33,7 @@ class MockOrchestrator:
         
         # Simulate outcome
         outcome = self.simulate_outcome(decision)
-        self.bridge.record_outcome(runtime_data, decision.get('rl_action', 0), outcome)
+        self.bridge.record_outcome(runtime_data, decision.get('executed_action', 0), outcome)
         
         logging.info(f"Decision applied: {decision}, Outcome: {outcome}")
     
@@ -73,8 +71,10 @@ class MockOrchestrator:
         }
 
 if __name__ == "__main__":
+    configure_trace_logging()
     orchestrator = MockOrchestrator()
     for _ in range(10):  # Simulate 10 cycles
         orchestrator.process_and_act()
         time.sleep(0.5)
-    print("Mock orchestrator run completed. Check orchestrator.log and fusion_rl_summary.json")
\ No newline at end of file
+    orchestrator.bridge.close()
+    print("Mock orchestrator run completed. Check decision_traces.log and fusion_rl_summary.json")
\ No newline at end of file
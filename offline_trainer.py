@@ -0,0 +1,302 @@
+import argparse
+import json
+from collections import deque
+import numpy as np
+from app_spec import ACTION_INDEX, DEFAULT_ACTION
+from rl_decision_layer import RLDecisionLayer
+from rl_orchestrator_bridge import calculate_reward
+from runtime_state_adapter import RuntimeStateAdapter
+from safety_guard import SafetyGuard
+from state_discretizer import StateDiscretizer
+
+_DROPPED = object()  # a decision whose reward never arrived
+
+
+def executed_action(decision):
+    # Traces written since the slotted AppSpec carry executed_action; older ones only the action name
+    if decision.get('executed_action') is not None:
+        return int(decision['executed_action'])
+    return ACTION_INDEX.get(decision.get('action'), ACTION_INDEX[DEFAULT_ACTION])
+
+
+def iter_trace_records(path):
+    """Yields ('decision', trace) and ('reward', value) from a decision-trace file, one line at a time.
+
+    Understands the logging format ("<asctime> - {json}" plus "Reward recorded: ..."
+    lines) and AsyncTraceWriter JSONL, like IncrementalTraceReader.
+    """
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith('{'):
+                message = line.split(' - ', 1)[-1]
+                if message.startswith('Reward recorded: '):
+                    try:
+                        yield 'reward', float(message[len('Reward recorded: '):].split(',')[0])
+                    except ValueError:
+                        pass
+                    continue
+                if not message.startswith('{'):
+                    continue
+                line = message
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('type') == 'reward':
+                yield 'reward', float(record.get('reward', 0))
+            elif 'runtime_state' in record and 'safety_decision' in record:
+                yield 'decision', record
+
+
+def iter_trace_transitions(path, chain=True, max_pending=10000):
+    """Yields (runtime_state, action, reward, next_runtime_state) from a decision-trace file.
+
+    Each reward line is paired with the oldest decision still waiting for one;
+    a decision with no reward after `max_pending` newer decisions is dropped.
+    The log does not record next states, so with `chain` the next decision's
+    runtime state is used (one bridge logs one runtime's event stream);
+    without it, or for the last decision, next_runtime_state is None (terminal).
+    """
+    pending = deque()  # [runtime_state, action, reward, next_state], in log order
+    waiting = deque()  # the subset of pending still waiting for a reward
+    previous = None
+    for kind, value in iter_trace_records(path):
+        if kind == 'decision':
+            entry = [value['runtime_state'], executed_action(value['safety_decision']), None, None]
+            if chain and previous is not None:
+                previous[3] = entry[0]
+            previous = entry
+            pending.append(entry)
+            waiting.append(entry)
+            if len(waiting) > max_pending:
+                waiting.popleft()[2] = _DROPPED
+        elif waiting:
+            waiting.popleft()[2] = value
+        while pending:
+            head = pending[0]
+            if head[2] is _DROPPED:
+                pending.popleft()
+            elif head[2] is not None and (head[3] is not None or not chain):
+                pending.popleft()
+                yield tuple(head)
+            else:
+                break
+    for entry in pending:
+        if entry[2] is not None and entry[2] is not _DROPPED:
+            yield tuple(entry)
+
+
+def iter_json_objects(path, chunk_size=1 << 16):
+    # Streams a file of concatenated (e.g. pretty-printed, appended) JSON objects with raw_decode
+    decoder = json.JSONDecoder()
+    buffer = ''
+    with open(path, 'r') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position == len(buffer):
+                    break
+                try:
+                    obj, position = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if not chunk:
+                        raise
+                    break  # incomplete object, wait for the next chunk
+                yield obj
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+
+def iter_artifact_transitions(path):
+    """Yields (runtime_state, action, reward, next_runtime_state) from demo_artifacts.json-style records."""
+    for record in iter_json_objects(path):
+        if not all(field in record for field in ('event', 'decision', 'outcome')):
+            continue
+        outcome = record['outcome']
+        yield (record['event'], executed_action(record['decision']), calculate_reward(outcome),
+               outcome.get('next_state', record['event']))
+
+
+class OfflineTrainer:
+    """Fitted-Q training and off-policy evaluation over recorded transitions.
+
+    States are interned into the rows of `rl_layer`'s dense Q-table
+    (by default a dense, memory-persisted layer loaded from the current
+    summary), so training warm-starts from the current table and the
+    result is saved through the layer. Transitions are kept as flat
+    arrays: one row/action/reward/next-row/environment entry each.
+    """
+
+    def __init__(self, rl_layer=None, state_adapter=None, guard=None, summary_file='fusion_rl_summary.json'):
+        self.rl_layer = rl_layer if rl_layer is not None else RLDecisionLayer(
+            storage='dense', persistence='memory', summary_file=summary_file)
+        # Fitting rewrites the whole active matrix at once, which only DenseQTable exposes
+        if self.rl_layer.storage != 'dense':
+            raise ValueError(f"OfflineTrainer requires storage='dense', not {self.rl_layer.storage!r}")
+        self.state_adapter = state_adapter if state_adapter is not None else RuntimeStateAdapter()
+        self.guard = guard if guard is not None else SafetyGuard()
+        self.environments = []
+        self._env_index = {}
+        self._columns = {name: [] for name in ('rows', 'actions', 'rewards', 'next_rows', 'dones', 'envs')}
+        self.rows = self.actions = self.rewards = self.next_rows = self.dones = self.envs = None
+        self.current_q = None
+
+    def load(self, transitions, chunk_size=65536):
+        # Consume (runtime_state, action, reward, next_runtime_state or None) tuples in chunks
+        table = self.rl_layer.q_table
+        chunk = []
+        for transition in transitions:
+            chunk.append(transition)
+            if len(chunk) >= chunk_size:
+                self._add_chunk(chunk, table)
+                chunk = []
+        if chunk:
+            self._add_chunk(chunk, table)
+        for name, parts in self._columns.items():
+            setattr(self, name, np.concatenate(parts) if parts else np.zeros(0, dtype=np.float64 if name == 'rewards' else np.int64))
+        self.dones = self.dones.astype(bool)
+        # The table as it was before training, for evaluation; covers every state seen in the data
+        self.current_q = table.active().copy()
+        return len(self.rows)
+
+    def _add_chunk(self, chunk, table):
+        states = self.state_adapter.adapt_batch([runtime_state for runtime_state, _, _, _ in chunk])
+        next_states = self.state_adapter.adapt_batch([runtime_state if next_state is None else next_state
+                                                      for runtime_state, _, _, next_state in chunk])
+        columns = self._columns
+        columns['rows'].append(np.array([table.row(state) for state in states], dtype=np.int64))
+        columns['next_rows'].append(np.array([table.row(state) for state in next_states], dtype=np.int64))
+        columns['actions'].append(np.array([action for _, action, _, _ in chunk], dtype=np.int64))
+        columns['rewards'].append(np.array([reward for _, _, reward, _ in chunk], dtype=np.float64))
+        columns['dones'].append(np.array([next_state is None for _, _, _, next_state in chunk], dtype=np.int64))
+        columns['envs'].append(np.array([self._environment(runtime_state) for runtime_state, _, _, _ in chunk],
+                                        dtype=np.int64))
+
+    def _environment(self, runtime_state):
+        env = runtime_state.get('environment', self.guard.default_environment)
+        if env not in self._env_index:
+            self._env_index[env] = len(self.environments)
+            self.environments.append(env)
+        return self._env_index[env]
+
+    def fit(self, sweeps=100, tol=1e-6, discount_factor=None):
+        """Fitted-Q iteration: each sweep sets every observed (state, action) cell to the mean
+        of r + gamma * max Q(next state) over its transitions, all cells at once.
+        Stops after `sweeps` or when no cell moves more than `tol`; returns the per-sweep max change.
+        """
+        gamma = self.rl_layer.discount_factor if discount_factor is None else discount_factor
+        table = self.rl_layer.q_table
+        width = self.rl_layer.action_space_size
+        q = table.active().copy()
+        cells, inverse, counts = np.unique(self.rows * width + self.actions, return_inverse=True, return_counts=True)
+        live = (~self.dones).astype(np.float64)
+        history = []
+        for _ in range(sweeps):
+            targets = self.rewards + gamma * live * q[self.next_rows].max(axis=1)
+            fitted = np.bincount(inverse, weights=targets, minlength=len(cells)) / counts
+            flat = q.reshape(-1)
+            change = float(np.abs(fitted - flat[cells]).max()) if len(cells) else 0.0
+            flat[cells] = fitted
+            history.append(change)
+            if change <= tol:
+                break
+        table.active()[:] = q
+        np.add.at(table.visits, self.rows, 1)
+        return history
+
+    def _action_masks(self):
+        width = self.rl_layer.action_space_size
+        return np.array([self.guard.action_mask(env, width) for env in self.environments]).reshape(-1, width)
+
+    def greedy_actions(self, q_values):
+        # The policy the bridge would run with mask_actions=True and no exploration, per transition
+        masks = self._action_masks()[self.envs]
+        masks |= ~masks.any(axis=1, keepdims=True)
+        return np.where(masks, q_values[self.rows], -np.inf).argmax(axis=1)
+
+    def evaluate(self, q_values, model_q=None):
+        """Off-policy estimates for the greedy policy of `q_values` from the logged transitions.
+
+        agreement: share of logged actions the policy would have taken;
+        ips_reward / wis_reward: (weighted) importance-sampling estimates of its mean one-step
+        reward, with the behaviour policy estimated from logged action frequencies per state;
+        effective_sample_size: of the importance weights;
+        dm_value: direct-method value, the mean of `model_q` (default: the trained table) at the
+        policy's action over the logged states.
+        """
+        model_q = self.rl_layer.q_table.active() if model_q is None else model_q
+        n = len(self.rows)
+        if not n:
+            return {}
+        width = self.rl_layer.action_space_size
+        policy = self.greedy_actions(q_values)
+        match = policy == self.actions
+        flat = self.rows * width + self.actions
+        behaviour = np.bincount(flat, minlength=len(q_values) * width)[flat] / np.bincount(
+            self.rows, minlength=len(q_values))[self.rows]
+        weights = match / behaviour
+        weight_sum = weights.sum()
+        return {
+            'agreement': float(match.mean()),
+            'ips_reward': float((weights * self.rewards).mean()),
+            'wis_reward': float((weights * self.rewards).sum() / weight_sum) if weight_sum else None,
+            'effective_sample_size': float(weight_sum ** 2 / (weights ** 2).sum()) if weight_sum else 0.0,
+            'dm_value': float(model_q[self.rows, policy].mean()),
+        }
+
+    def report(self):
+        # Logged behaviour vs. the table before and after training
+        model_q = self.rl_layer.q_table.active()
+        return {
+            'transitions': int(len(self.rows)),
+            'states': int(len(np.unique(self.rows))),
+            'logged': {'mean_reward': float(self.rewards.mean()) if len(self.rows) else None,
+                       'dm_value': float(model_q[self.rows, self.actions].mean()) if len(self.rows) else None},
+            'current': self.evaluate(self.current_q, model_q),
+            'trained': self.evaluate(model_q, model_q),
+        }
+
+    def save(self, summary_file):
+        # Write the trained table as a new summary + compact snapshot; the source summary is untouched
+        self.rl_layer.summary_file = summary_file
+        self.rl_layer.save_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a Q-table offline from recorded decision traces.")
+    parser.add_argument('--traces', nargs='*', default=['decision_traces.log'], help="decision-trace logs / JSONL")
+    parser.add_argument('--artifacts', nargs='*', default=['demo_artifacts.json'], help="demo_artifacts.json-style files")
+    parser.add_argument('--summary-file', default='fusion_rl_summary.json', help="current table (warm start, evaluation)")
+    parser.add_argument('--output', default='offline_rl_summary.json')
+    parser.add_argument('--sweeps', type=int, default=100)
+    parser.add_argument('--tol', type=float, default=1e-6)
+    parser.add_argument('--no-chain', action='store_true', help="treat trace-log transitions as terminal")
+    parser.add_argument('--discretized', action='store_true', help="key states by StateDiscretizer(output='id')")
+    args = parser.parse_args()
+
+    state_adapter = RuntimeStateAdapter(StateDiscretizer(output='id')) if args.discretized else None
+    trainer = OfflineTrainer(state_adapter=state_adapter, summary_file=args.summary_file)
+
+    def transitions():
+        for path in args.traces:
+            yield from iter_trace_transitions(path, chain=not args.no_chain)
+        for path in args.artifacts:
+            yield from iter_artifact_transitions(path)
+
+    trainer.load(transitions())
+    history = trainer.fit(args.sweeps, args.tol)
+    trainer.save(args.output)
+    report = trainer.report()
+    report['sweeps'] = len(history)
+    report['final_change'] = history[-1] if history else 0.0
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-event pipeline stages of RLOOrchestratorBridge.process_runtime_event, in order
+EVENT_STAGES = ('validate', 'adapt', 'decide', 'create_spec', 'validate_spec', 'safety_guard', 'log_trace')
+# record_outcome (whole Q-update) and the Q-table persistence inside it (journal append or JSON save)
+STAGES = EVENT_STAGES + ('learn', 'persist', 'snapshot')
+COUNTERS = ('decisions', 'downgrades', 'noop_fallbacks', 'outcomes')
+
+# Exported bucket bounds are 2**k ns for k in MIN_BUCKET..MAX_BUCKET (256 ns .. ~17 s), then +Inf
+MIN_BUCKET = 8
+MAX_BUCKET = 34
+
+
+class Histogram:
+    """Fixed power-of-two buckets of nanosecond durations.
+
+    Bucket k counts durations below 2**k ns, so the bucket index is just the
+    duration's bit_length() -- cheaper than a search over arbitrary bounds.
+    """
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * 65  # any non-negative 64-bit duration
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[value.bit_length()] += 1
+        self.total += value
+
+    def observe_many(self, value, n):
+        # n observations of the same value, e.g. the per-event share of a batched stage
+        self.counts[value.bit_length()] += n
+        self.total += value * n
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def buckets(self):
+        # (upper bound in ns, cumulative count) per exported bucket, without +Inf
+        counts = list(self.counts)
+        cumulative = sum(counts[:MIN_BUCKET])
+        buckets = []
+        for k in range(MIN_BUCKET, MAX_BUCKET + 1):
+            cumulative += counts[k]
+            buckets.append((2 ** k, cumulative))
+        return buckets
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-quantile (None when empty or beyond the last bound)
+        count = self.count
+        if not count:
+            return None
+        for bound, cumulative in self.buckets():
+            if cumulative >= q * count:
+                return bound
+        return None
+
+
+class PipelineMetrics:
+    """Stage latency histograms, event counters and gauges for one bridge.
+
+    Pass an instance as RLOOrchestratorBridge(metrics=...). The bridge reads the
+    clock around each pipeline stage and hands the readings over in one call
+    per event, so recording costs one bucket lookup per stage; without metrics
+    no timing is recorded at all. Gauges are callables evaluated at export
+    time (the bridge registers 'q_table_states'). Exporters read the counts
+    without locking, so an export may be a few events behind.
+    """
+
+    def __init__(self, prefix='rl_bridge'):
+        self.prefix = prefix
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges = {}
+        self._event_histograms = tuple(self.stages[stage] for stage in EVENT_STAGES)
+
+    def observe(self, stage, duration_ns):
+        self.stages[stage].observe(duration_ns)
+
+    def observe_event(self, times, fallback, downgraded):
+        # times: the len(EVENT_STAGES) + 1 clock readings taken between the stages of one event
+        previous = times[0]
+        for histogram, now in zip(self._event_histograms, times[1:]):  # Histogram.observe, inlined
+            value = now - previous
+            histogram.counts[value.bit_length()] += 1
+            histogram.total += value
+            previous = now
+        counters = self.counters
+        counters['decisions'] += 1
+        if fallback:
+            counters['noop_fallbacks'] += 1
+        if downgraded:
+            counters['downgrades'] += 1
+
+    def observe_batch(self, times, n, fallbacks, downgrades):
+        # Batched events: each stage's batch time is recorded as n events of its per-event average
+        if not n:
+            return
+        previous = times[0]
+        for histogram, now in zip(self._event_histograms, times[1:]):
+            histogram.observe_many((now - previous) // n, n)
+            previous = now
+        self.counters['decisions'] += n
+        self.counters['noop_fallbacks'] += fallbacks
+        self.counters['downgrades'] += downgrades
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def snapshot(self):
+        stages = {}
+        for stage, histogram in self.stages.items():
+            count = histogram.count
+            if count:
+                stages[stage] = {'count': count, 'mean_us': histogram.total / count / 1000,
+                                 'p50_us': _us(histogram.quantile(0.5)), 'p99_us': _us(histogram.quantile(0.99))}
+        return {'stages': stages, 'counters': dict(self.counters), 'gauges': self._read_gauges()}
+
+    def _read_gauges(self):
+        values = {}
+        for name, read in self.gauges.items():
+            try:
+                values[name] = read()
+            except Exception as e:
+                logging.error(f"Metrics gauge {name} failed: {e}")
+        return values
+
+
+def _us(ns):
+    return None if ns is None else ns / 1000
+
+
+def prometheus_text(metrics):
+    # Prometheus text exposition format (version 0.0.4)
+    prefix = metrics.prefix
+    name = f'{prefix}_stage_seconds'
+    lines = [f'# HELP {name} Time spent in each decision pipeline stage.', f'# TYPE {name} histogram']
+    for stage, histogram in metrics.stages.items():
+        total = histogram.total
+        for bound, cumulative in histogram.buckets():
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound / 1e9:.9g}"}} {cumulative}')
+        count = histogram.count
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total / 1e9:.9f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+    for counter, value in metrics.counters.items():
+        lines += [f'# TYPE {prefix}_{counter}_total counter', f'{prefix}_{counter}_total {value}']
+    for gauge, value in metrics._read_gauges().items():
+        lines += [f'# TYPE {prefix}_{gauge} gauge', f'{prefix}_{gauge} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+class HTTPMetricsExporter:
+    """Serves `render(metrics)` (Prometheus text by default) on GET /metrics from a background thread."""
+
+    def __init__(self, metrics, host='127.0.0.1', port=9108, render=prometheus_text):
+        self.metrics = metrics
+        self.render = render
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.render(exporter.metrics).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FileMetricsExporter:
+    """Rewrites `path` with `render(metrics)` every `interval` seconds, atomically, e.g. for node_exporter's textfile collector."""
+
+    def __init__(self, metrics, path='rl_bridge.prom', interval=15.0, render=prometheus_text):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.render = render
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render(self.metrics))
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                logging.error(f"Metrics export to {self.path} failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='metrics-file', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        # Stop the timer and write the final values
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.export()
@@ -0,0 +1,111 @@
+import json
+import os
+import stat
+import tempfile
+import time
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_json(path, data, indent=4, durable=True):
+    # Write to a temp file in the same directory and rename over the target,
+    # so readers and crash recovery only ever see a complete snapshot.
+    # durable=False skips the fsync, for writes superseded by the next update anyway
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        # mkstemp creates the file 0600; give it the mode a plain open() would (or the target's current one)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class QTableJournal:
+    """Append-only log of Q-value updates written between full snapshots.
+
+    Records hold absolute values (not deltas), so replaying a journal that was
+    already folded into the snapshot is harmless. Appends are flushed to the OS
+    but not fsynced: the journal survives a process crash, while a host crash
+    can lose the updates since the last (fsynced) snapshot.
+    """
+
+    def __init__(self, summary_file, journal_file=None, snapshot_every=1000, snapshot_interval=60.0):
+        self.summary_file = summary_file
+        self.journal_file = journal_file or os.path.splitext(summary_file)[0] + '.journal'
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self.pending = 0
+        self.last_snapshot = time.monotonic()
+        self._handle = None
+
+    def replay(self):
+        # Yield (state_key, action, value) in write order. A torn final line from a crash is skipped
+        # and cut off, so the next append starts on a line of its own
+        if not os.path.exists(self.journal_file):
+            return
+        complete = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                complete += len(line)
+                try:
+                    record = json.loads(line)
+                    yield record['s'], int(record['a']), float(record['q'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if complete < os.path.getsize(self.journal_file):
+            os.truncate(self.journal_file, complete)
+
+    def append(self, state_key, action, value):
+        # Returns True when a snapshot is due
+        if self._handle is None:
+            self._handle = open(self.journal_file, 'a')
+        self._handle.write(json.dumps({'s': state_key, 'a': int(action), 'q': float(value)}) + '\n')
+        self._handle.flush()
+        self.pending += 1
+        return self.snapshot_due()
+
+    def append_many(self, records):
+        # One write for a whole batch of (state_key, action, value) records
+        if self._handle is None:
+            self._handle = open(self.journal_file, 'a')
+        lines = [json.dumps({'s': state_key, 'a': int(action), 'q': float(value)}) + '\n' for state_key, action, value in records]
+        self._handle.write(''.join(lines))
+        self._handle.flush()
+        self.pending += len(lines)
+        return self.snapshot_due()
+
+    def snapshot_due(self):
+        if self.snapshot_every and self.pending >= self.snapshot_every:
+            return True
+        if self.snapshot_interval is not None and time.monotonic() - self.last_snapshot >= self.snapshot_interval:
+            return True
+        return False
+
+    def mark_snapshot(self):
+        # Everything journaled so far is now in the snapshot
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        open(self.journal_file, 'w').close()
+        self.pending = 0
+        self.last_snapshot = time.monotonic()
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
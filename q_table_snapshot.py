@@ -0,0 +1,302 @@
+import glob
+import json
+import os
+import numbers
+import numpy as np
+from dense_q_table import key_from_str, key_to_str
+from q_table_journal import atomic_write_json
+
+SNAPSHOT_FORMAT = 'q-snapshot-v3'
+KEEP_GENERATIONS = 2  # the previous generation stays on disk for readers that just read the old manifest
+
+_HASH_OFFSET = 0xcbf29ce484222325
+_HASH_PRIME = 0x100000001b3
+_HASH_MASK = (1 << 64) - 1
+
+
+def snapshot_paths(summary_file):
+    base = os.path.splitext(summary_file)[0]
+    return base + '.snapshot.json', base
+
+
+def key_hashes(keys):
+    # 63-bit hash of each key in a fixed-width bytes array: FNV-style multiply-xorshift rounds over
+    # the key's little-endian 8-byte words, vectorized across keys (key_hash is the scalar version)
+    keys = np.asarray(keys, dtype=bytes)
+    n, width = len(keys), keys.dtype.itemsize
+    words = np.zeros((n, -(-width // 8) * 8), dtype=np.uint8)
+    words[:, :width] = keys.view(np.uint8).reshape(n, width)
+    words = words.view('<u8')
+    word_counts = (np.char.str_len(keys) + 7) // 8
+    h = np.full(n, _HASH_OFFSET, dtype=np.uint64)
+    prime, shift = np.uint64(_HASH_PRIME), np.uint64(29)
+    for j in range(words.shape[1]):
+        mixed = (h ^ words[:, j]) * prime
+        mixed ^= mixed >> shift
+        h = np.where(word_counts > j, mixed, h)
+    return (h >> np.uint64(1)).astype(np.int64)
+
+
+def key_hash(key_str):
+    data = key_str.encode()
+    h = _HASH_OFFSET
+    for i in range(0, len(data), 8):
+        mixed = ((h ^ int.from_bytes(data[i:i + 8], 'little')) * _HASH_PRIME) & _HASH_MASK
+        h = mixed ^ (mixed >> 29)
+    return h >> 1
+
+
+def key_features(keys):
+    # Numeric feature columns parsed from state keys: dict states give one column per field,
+    # tuple states one per position, scalar states a single 'state' column.
+    # Non-numeric values become category codes; returns (names, columns, categories)
+    rows = []
+    for key in keys:
+        if isinstance(key, str):
+            key = key_from_str(key)
+        if isinstance(key, tuple) and key and all(isinstance(item, tuple) and len(item) == 2 for item in key):
+            rows.append(dict(key))
+        elif isinstance(key, tuple):
+            rows.append({f'f{i}': value for i, value in enumerate(key)})
+        else:
+            rows.append({'state': key})
+    names = []
+    for row in rows:
+        for name in row:
+            if name not in names:
+                names.append(name)
+    columns = np.full((len(rows), len(names)), np.nan)
+    categories = {}
+    for j, name in enumerate(names):
+        values = [row.get(name) for row in rows]
+        if all(value is None or isinstance(value, numbers.Real) for value in values):
+            columns[:, j] = [np.nan if value is None else value for value in values]
+        else:
+            labels = sorted({str(value) for value in values if value is not None})
+            codes = {label: code for code, label in enumerate(labels)}
+            columns[:, j] = [np.nan if value is None else codes[str(value)] for value in values]
+            categories[name] = labels
+    return names, columns, categories
+
+
+def snapshot_is_current(summary_file, max_lag=0.0):
+    # True when the snapshot exists and the JSON summary is not newer, or at most max_lag seconds newer
+    # (eager saves rewrite the JSON on every update and the snapshot every snapshot_interval)
+    manifest_path, _ = snapshot_paths(summary_file)
+    try:
+        manifest_mtime = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    try:
+        return os.stat(summary_file).st_mtime_ns <= manifest_mtime + int(max_lag * 1e9)
+    except FileNotFoundError:
+        return True
+
+
+def write_q_snapshot(summary_file, keys, q_values, visits, last_updated):
+    """Write a compact, memory-mappable snapshot next to the JSON summary.
+
+    Arrays go to per-generation .npy files and a small manifest naming them is
+    renamed into place last, so a reader always sees one consistent generation.
+    Key feature columns are not stored; readers parse them from the keys.
+    """
+    manifest_path, base = snapshot_paths(summary_file)
+    generation = 0
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                generation = json.load(f)['generation'] + 1
+        except (ValueError, KeyError):
+            pass
+    key_bytes = np.array([(key if isinstance(key, str) else key_to_str(key)).encode() for key in keys], dtype=bytes)
+    hashes = key_hashes(key_bytes)
+    order = np.argsort(hashes, kind='stable')
+    files = {}
+    arrays = {
+        'q': np.asarray(q_values, dtype=np.float64),
+        'visits': np.asarray(visits, dtype=np.int64),
+        'keys': key_bytes,
+        'hashes': hashes[order],
+        'order': order.astype(np.int64),
+    }
+    for name, array in arrays.items():
+        path = f'{base}.{generation}.{name}.npy'
+        np.save(path, array)
+        files[name] = os.path.basename(path)
+    atomic_write_json(manifest_path, {
+        'format': SNAPSHOT_FORMAT,
+        'generation': generation,
+        'rows': len(keys),
+        'actions': int(arrays['q'].shape[1]) if arrays['q'].ndim == 2 else 0,
+        'last_updated': last_updated,
+        'files': files,
+    }, indent=None)
+    for path in glob.glob(glob.escape(base) + '.*.*.npy'):
+        try:
+            stale = int(path[len(base) + 1:].split('.', 1)[0]) <= generation - KEEP_GENERATIONS
+        except ValueError:
+            continue
+        if stale:
+            os.remove(path)
+
+
+class QTableSnapshot:
+    """Read-only view of a compact Q-table snapshot, arrays memory-mapped.
+
+    Every query returns a bounded result (a page, the top K rows, or a grid of
+    at most `max_levels` levels per feature), so the cost of displaying the
+    table does not grow with the number of states.
+    """
+
+    def __init__(self, q, visits, keys, hashes, order, last_updated, generation=0):
+        self.q = q
+        self.visits = visits
+        self.keys = keys
+        self.hashes = hashes  # sorted key_hash() of every key, and the row each belongs to
+        self.order = order
+        self.last_updated = last_updated
+        self.generation = generation
+        # Key feature columns, parsed from the keys on first use
+        self._features = self._feature_names = self._categories = None
+
+    @classmethod
+    def open(cls, summary_file='fusion_rl_summary.json', mmap_mode='r'):
+        # mmap_mode='c' gives copy-on-write arrays that a Q-table can update in memory
+        manifest_path, _ = snapshot_paths(summary_file)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unknown Q-table snapshot format: {manifest.get('format')}")
+        directory = os.path.dirname(os.path.abspath(manifest_path))
+        arrays = {name: np.load(os.path.join(directory, file), mmap_mode=mmap_mode if name in ('q', 'visits') else 'r')
+                  for name, file in manifest['files'].items()}
+        return cls(arrays['q'], arrays['visits'], arrays['keys'], arrays['hashes'], arrays['order'],
+                   manifest['last_updated'], manifest['generation'])
+
+    @classmethod
+    def load(cls, summary_file='fusion_rl_summary.json', max_lag=0.0):
+        # The memory-mapped snapshot when it is current (see snapshot_is_current), else a view parsed
+        # from the JSON summary; None when neither exists
+        if snapshot_is_current(summary_file, max_lag):
+            try:
+                return cls.open(summary_file)
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+        try:
+            with open(summary_file, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls.from_dict(data.get('q_table', {}), data.get('last_updated', 'Never'))
+
+    @classmethod
+    def from_dict(cls, q_table, last_updated='Never'):
+        # In-memory view of a legacy {state key: Q-values} summary (no visit counts)
+        keys = np.array([key.encode() for key in q_table], dtype=bytes)
+        hashes = key_hashes(keys)
+        order = np.argsort(hashes, kind='stable')
+        q = np.array(list(q_table.values()), dtype=np.float64).reshape(len(keys), -1) if len(keys) else np.zeros((0, 0))
+        return cls(q, np.zeros(len(keys), dtype=np.int64), keys, hashes[order], order, last_updated)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _parse_features(self):
+        if self._features is None:
+            self._feature_names, self._features, self._categories = key_features(
+                [key.decode() for key in self.keys])
+
+    @property
+    def features(self):
+        self._parse_features()
+        return self._features
+
+    @property
+    def feature_names(self):
+        self._parse_features()
+        return self._feature_names
+
+    @property
+    def categories(self):
+        self._parse_features()
+        return self._categories
+
+    def key_str(self, row):
+        return self.keys[row].decode()
+
+    def find(self, key_str):
+        # Row of a state key, or None; touches only the index pages around the key's hash
+        value = key_hash(key_str)
+        encoded = key_str.encode()
+        i = int(np.searchsorted(self.hashes, value))
+        while i < len(self.hashes) and self.hashes[i] == value:
+            row = int(self.order[i])
+            if self.keys[row] == encoded:
+                return row
+            i += 1
+        return None
+
+    def items(self):
+        # (state key, Q-values) pairs, the shape load_dict() takes
+        for row in range(len(self)):
+            yield self.keys[row].decode(), self.q[row]
+
+    def labels(self, rows):
+        return [self.keys[row].decode() for row in rows]
+
+    def page(self, number, size=50):
+        start = number * size
+        return np.arange(start, min(start + size, len(self)))
+
+    def top_k(self, k=20, by='visits'):
+        # Row ids of the k states with the most visits or the widest Q-value spread, best first
+        if by == 'visits':
+            score = np.asarray(self.visits)
+        elif by == 'spread':
+            score = self.q.max(axis=1) - self.q.min(axis=1) if len(self) else np.zeros(0)
+        else:
+            raise ValueError(f"Unknown top-K ordering: {by}")
+        k = min(k, len(self))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-score, k - 1)[:k]
+        return top[np.argsort(-score[top], kind='stable')]
+
+    def levels(self, feature, max_levels=40):
+        # (per-row level index, level labels); features with too many distinct values are binned evenly
+        column = np.asarray(self.features[:, self.feature_names.index(feature)])
+        known = ~np.isnan(column)
+        values = np.unique(column[known])
+        if len(values) <= max_levels:
+            index = np.searchsorted(values, column)
+            names = self.categories.get(feature)
+            labels = [names[int(v)] if names else f'{v:g}' for v in values]
+        else:
+            edges = np.linspace(values[0], values[-1], max_levels + 1)
+            index = np.clip(np.searchsorted(edges, column, side='right') - 1, 0, max_levels - 1)
+            labels = [f'{lo:g}–{hi:g}' for lo, hi in zip(edges[:-1], edges[1:])]
+        index = np.where(known, index, len(labels))
+        return index, labels + ['n/a']
+
+    def aggregate(self, feature, max_levels=40):
+        # Mean Q-value per action for each level of one feature: (labels, levels x actions matrix, state counts)
+        index, labels = self.levels(feature, max_levels)
+        counts = np.bincount(index, minlength=len(labels))
+        sums = np.zeros((len(labels), self.q.shape[1]))
+        np.add.at(sums, index, self.q)
+        keep = counts > 0
+        return [label for label, k in zip(labels, keep) if k], sums[keep] / counts[keep, None], counts[keep]
+
+    def pivot(self, x_feature, y_feature, max_levels=40):
+        # Mean state value (max over actions) on a grid of two features; empty cells are NaN
+        x_index, x_labels = self.levels(x_feature, max_levels)
+        y_index, y_labels = self.levels(y_feature, max_levels)
+        cells = y_index * len(x_labels) + x_index
+        size = len(x_labels) * len(y_labels)
+        counts = np.bincount(cells, minlength=size)
+        sums = np.bincount(cells, weights=self.q.max(axis=1) if len(self) else None, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grid = (sums / counts).reshape(len(y_labels), len(x_labels))
+        keep_x, keep_y = counts.reshape(grid.shape).any(axis=0), counts.reshape(grid.shape).any(axis=1)
+        return ([label for label, k in zip(x_labels, keep_x) if k], [label for label, k in zip(y_labels, keep_y) if k],
+                grid[np.ix_(keep_y, keep_x)])
@@ -0,0 +1,152 @@
+import argparse
+import time
+import numpy as np
+from app_spec import ACTION_INDEX
+from rl_decision_layer import RLDecisionLayer
+from safety_guard import SafetyGuard
+from state_discretizer import StateDiscretizer
+
+SCALE_UP = ACTION_INDEX['scale_up']
+SCALE_DOWN = ACTION_INDEX['scale_down']
+RESTART = ACTION_INDEX['restart']
+HEAL = ACTION_INDEX['heal']
+
+
+class ReplicaSimulator:
+    """N independent MockOrchestrator runtimes stepped together as NumPy arrays.
+
+    Each step applies MockOrchestrator's dynamics to every replica at once:
+    the safety guard (SafetyGuard.guard_actions), apply_decision,
+    simulate_outcome, the bridge's reward function, then the next runtime
+    fluctuation. States are packed ids from `discretizer` (output='id'), so a
+    bridge whose RuntimeStateAdapter uses the same discretizer can load the
+    trained table. Replicas are reset to the initial state after `horizon`
+    steps (staggered), since failures and latency otherwise drift without bound.
+    """
+
+    def __init__(self, replicas=1024, environment='prod', discretizer=None, guard=None, horizon=200, seed=None,
+                 latency=100.0, health=0.9, failures=0, services=2):
+        self.replicas = replicas
+        self.environment = environment
+        self.discretizer = discretizer if discretizer is not None else StateDiscretizer(output='id')
+        self.guard = guard if guard is not None else SafetyGuard()
+        self.horizon = horizon
+        self.random = np.random.default_rng(seed)
+        self.initial = (float(latency), float(health), int(failures), int(services))
+        self.latency = np.full(replicas, self.initial[0])
+        self.health = np.full(replicas, self.initial[1])
+        self.failures = np.full(replicas, self.initial[2], dtype=np.int64)
+        self.services = np.full(replicas, self.initial[3], dtype=np.int64)
+        self.age = self.random.integers(0, horizon, size=replicas) if horizon else np.zeros(replicas, dtype=np.int64)
+        self.steps = 0
+        self._fluctuate()
+
+    def columns(self):
+        # Runtime fields as arrays, in the shape StateDiscretizer.levels_columns and the guard read
+        return {'latency': self.latency, 'health': self.health, 'failures': self.failures, 'services': self.services}
+
+    def observe(self):
+        return self.discretizer.pack_columns(self.discretizer.levels_columns(self.columns()))
+
+    def action_masks(self, action_space_size):
+        mask = self.guard.action_mask(self.environment, action_space_size)
+        return np.broadcast_to(mask, (self.replicas, action_space_size))
+
+    def _fluctuate(self):
+        # simulate_runtime_event, with latency floored at 0 (the contract validator rejects negative latency)
+        n = self.replicas
+        self.latency = np.maximum(0.0, self.latency + self.random.integers(-50, 50, size=n))
+        self.health = np.clip(self.health + self.random.uniform(-0.1, 0.1, size=n), 0, 1)
+        self.failures += self.random.integers(0, 2, size=n)
+
+    def step(self, actions):
+        """Advance every replica by one decision; returns (executed actions, rewards, next states)."""
+        executed, _ = self.guard.guard_actions(actions, self.environment, self.columns())
+        prev_health = self.health.copy()
+
+        # apply_decision
+        self.services += (executed == SCALE_UP)
+        self.services -= (executed == SCALE_DOWN) & (self.services > 1)
+        restart = executed == RESTART
+        self.health[restart] = np.minimum(1.0, self.health[restart] + 0.1)
+        heal = executed == HEAL
+        self.failures[heal] = np.maximum(0, self.failures[heal] - 1)
+
+        # simulate_outcome
+        success = self.random.random(self.replicas) < self.health * 0.8 + 0.2
+        self.health = np.where(success, np.minimum(1.0, self.health + 0.05), np.maximum(0.0, self.health - 0.1))
+        self.latency = np.where(success, np.maximum(0.0, self.latency - 20), self.latency + 50)
+
+        # RLOOrchestratorBridge._calculate_rewards
+        rewards = np.where(success, 1.0, -1.0)
+        rewards += (self.health - prev_health) * 0.5
+        rewards -= 0.5 * (self.latency > 500)
+        rewards += 0.2 * (self.latency < 100)
+        rewards -= self.failures * 0.1
+        next_states = self.observe()
+
+        self.steps += 1
+        if self.horizon:
+            self.age += 1
+            expired = self.age >= self.horizon
+            if expired.any():
+                self.reset(expired)
+        self._fluctuate()
+        return executed, rewards, next_states
+
+    def reset(self, replicas=None):
+        replicas = slice(None) if replicas is None else replicas
+        latency, health, failures, services = self.initial
+        self.latency[replicas] = latency
+        self.health[replicas] = health
+        self.failures[replicas] = failures
+        self.services[replicas] = services
+        self.age[replicas] = 0
+
+
+def train(rl_layer, simulator, steps, mask_actions=True):
+    """Run `steps` simulated decisions (about steps / replicas batched rounds) through `rl_layer`.
+
+    Each round is one process_states and one record_action_results call over
+    all replicas, crediting the executed action. Returns the training stats.
+    """
+    rounds = max(1, steps // simulator.replicas)
+    masks = simulator.action_masks(rl_layer.action_space_size) if mask_actions else None
+    total_reward = 0.0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        states = simulator.observe()
+        actions = np.asarray(rl_layer.process_states(states, masks))
+        executed, rewards, next_states = simulator.step(actions)
+        rl_layer.record_action_results(states, executed, rewards, next_states)
+        total_reward += float(rewards.sum())
+    elapsed = time.perf_counter() - start
+    done = rounds * simulator.replicas
+    return {'steps': done, 'seconds': elapsed, 'steps_per_s': done / elapsed if elapsed else 0.0,
+            'mean_reward': total_reward / done, 'states': len(rl_layer.q_table)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-train a Q-table on vectorized simulated replicas.")
+    parser.add_argument('--replicas', type=int, default=4096)
+    parser.add_argument('--steps', type=int, default=2_000_000)
+    parser.add_argument('--environment', default='prod')
+    parser.add_argument('--horizon', type=int, default=200)
+    parser.add_argument('--storage', default='dense', choices=['dense', 'dict'])
+    parser.add_argument('--summary-file', default='pretrained_rl_summary.json')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        np.random.seed(args.seed)
+    # 'memory' persistence: no I/O in the loop, one snapshot at the end
+    rl_layer = RLDecisionLayer(storage=args.storage, persistence='memory', summary_file=args.summary_file)
+    simulator = ReplicaSimulator(args.replicas, environment=args.environment, horizon=args.horizon, seed=args.seed)
+    stats = train(rl_layer, simulator, args.steps)
+    rl_layer.checkpoint()
+    print(f"{stats['steps']} steps in {stats['seconds']:.1f}s ({stats['steps_per_s']:,.0f}/s), "
+          f"mean reward {stats['mean_reward']:.3f}, {stats['states']} states -> {args.summary_file}")
+
+
+if __name__ == "__main__":
+    main()
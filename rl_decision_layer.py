@@ -1,48 +1,230 @@
 import json
 import os
+import time
 import numpy as np
 from collections import defaultdict
+from dense_q_table import DenseQTable, key_from_str
+from experience_replay import ReplayBuffer
+from q_table_journal import QTableJournal, atomic_write_json
+from q_table_snapshot import QTableSnapshot, snapshot_is_current, write_q_snapshot
 
 class RLDecisionLayer:
-    def __init__(self, state_space_size=100, action_space_size=10, learning_rate=0.1, discount_factor=0.9, epsilon=0.1):
+    def __init__(self, state_space_size=100, action_space_size=10, learning_rate=0.1, discount_factor=0.9, epsilon=0.1, storage='dict', shared_table=None,
+                 summary_file='fusion_rl_summary.json', persistence='eager', snapshot_every=1000, snapshot_interval=60.0,
+                 replay_capacity=0, replay_batch_size=32, replay_steps=1, prioritized_replay=False, json_summary=True):
         self.state_space_size = state_space_size
         self.action_space_size = action_space_size
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.epsilon = epsilon
-        self.q_table = defaultdict(lambda: np.zeros(action_space_size))
-        self.summary_file = 'fusion_rl_summary.json'
+        # 'dict' keeps one array per stringified state, 'dense' interns states into rows of one matrix,
+        # 'shared' uses a SharedQTable that several worker processes read and update in place
+        if storage == 'dense':
+            self.q_table = DenseQTable(action_space_size)
+        elif storage == 'shared':
+            if shared_table is None:
+                raise ValueError("storage='shared' requires a SharedQTable")
+            self.q_table = shared_table
+        elif storage == 'dict':
+            self.q_table = defaultdict(lambda: np.zeros(action_space_size))
+        else:
+            raise ValueError(f"Unknown Q-table storage: {storage}")
+        self.storage = storage
+        self.summary_file = summary_file
+        # 'eager' rewrites the snapshot on every update, 'journal' appends updates and snapshots periodically,
+        # 'memory' only writes when checkpoint() is called (benchmarks, simulation)
+        if persistence == 'journal':
+            self.journal = QTableJournal(summary_file, snapshot_every=snapshot_every, snapshot_interval=snapshot_interval)
+        elif persistence in ('eager', 'memory'):
+            self.journal = None
+        else:
+            raise ValueError(f"Unknown persistence mode: {persistence}")
+        self.persistence = persistence
+        # Eager saves rewrite only the JSON summary; the binary snapshot (what load_summary and the dashboard
+        # prefer) follows every snapshot_every updates or snapshot_interval seconds, and on checkpoint()
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self._unsnapshotted = 0
+        self._last_snapshot = time.monotonic()
+        # json_summary=False skips the human-readable JSON, which dominates save time for large tables;
+        # every save then writes the binary snapshot (export_json() writes the JSON on demand)
+        self.json_summary = json_summary
+        # Experience replay re-learns from past transitions after each real update (row-backed storage only)
+        if replay_capacity:
+            if storage == 'dict':
+                raise ValueError("Experience replay requires storage='dense' or 'shared'")
+            self.replay = ReplayBuffer(replay_capacity, prioritized=prioritized_replay)
+        else:
+            self.replay = None
+        self.replay_batch_size = replay_batch_size
+        self.replay_steps = replay_steps
+        self.metrics = None  # optional PipelineMetrics; persistence calls are timed when set
         self.load_summary()
 
     def load_summary(self):
-        if os.path.exists(self.summary_file):
+        # A shared table is loaded once by whichever worker attaches first
+        if self.storage == 'shared' and len(self.q_table):
+            return
+        snapshot = self._open_snapshot()
+        if snapshot is not None:
+            if self.storage == 'dense':
+                self.q_table = DenseQTable.from_snapshot(snapshot)
+            elif self.storage == 'shared':
+                self.q_table.load_dict(snapshot)
+            else:
+                # Still one array per state: only dense storage starts in time independent of table size
+                self.q_table = defaultdict(lambda: np.zeros(self.action_space_size),
+                                           ((key, np.array(values)) for key, values in snapshot.items()))
+        elif os.path.exists(self.summary_file):
             with open(self.summary_file, 'r') as f:
                 data = json.load(f)
-                self.q_table = defaultdict(lambda: np.zeros(self.action_space_size), data.get('q_table', {}))
-                for k, v in self.q_table.items():
-                    self.q_table[k] = np.array(v)
+                if self.storage != 'dict':
+                    self.q_table.load_dict(data.get('q_table', {}))
+                else:
+                    self.q_table = defaultdict(lambda: np.zeros(self.action_space_size), data.get('q_table', {}))
+                    for k, v in self.q_table.items():
+                        self.q_table[k] = np.array(v)
+        if self.journal is not None:
+            self._replay_journal()
+
+    def _open_snapshot(self):
+        # The binary snapshot, unless the JSON summary is newer (eager saves, older code, edits by hand)
+        if not snapshot_is_current(self.summary_file):
+            return None
+        try:
+            snapshot = QTableSnapshot.open(self.summary_file, mmap_mode='c')
+        except (OSError, ValueError, KeyError):
+            return None
+        if snapshot.q.ndim != 2 or (len(snapshot) and snapshot.q.shape[1] != self.action_space_size):
+            return None
+        return snapshot
 
-    def save_summary(self):
+    def _replay_journal(self):
+        # Recover updates made after the last snapshot
+        for state_key, action, value in self.journal.replay():
+            if self.storage != 'dict':
+                self.q_table.set(self.q_table.row_for_key(key_from_str(state_key)), action, value)
+            else:
+                self.q_table[state_key][action] = value
+
+    def save_summary(self, durable=True, binary=True):
+        # Eager per-update saves pass durable=False (no fsyncs) and binary=False except when
+        # _snapshot_due(): they rewrite only the JSON summary, unless json_summary=False makes the
+        # snapshot the only format. Journal snapshots and checkpoints write both, durably.
+        start = time.perf_counter_ns()
+        last_updated = str(np.datetime64('now'))
+        if self.json_summary:
+            self.export_json(self.summary_file, last_updated, durable)
+        if binary or not self.json_summary:
+            self._write_snapshot(last_updated)
+            self._unsnapshotted = 0
+            self._last_snapshot = time.monotonic()
+        if self.journal is not None:
+            self.journal.mark_snapshot()
+        if self.metrics is not None:
+            self.metrics.observe('snapshot', time.perf_counter_ns() - start)
+
+    def _write_snapshot(self, last_updated):
+        # Binary snapshot, written after the JSON so load_summary sees it as current
+        if self.storage != 'dict':
+            keys, q_values, visits = self.q_table.snapshot_arrays()
+        else:
+            keys = list(self.q_table)
+            q_values = np.array([self.q_table[k] for k in keys]).reshape(len(keys), self.action_space_size)
+            visits = np.zeros(len(keys), dtype=np.int64)  # the dict store does not count visits
+        write_q_snapshot(self.summary_file, keys, q_values, visits, last_updated)
+
+    def export_json(self, path=None, last_updated=None, durable=True):
+        # Human-readable {'q_table': {state key: Q-values}, 'last_updated'} summary
+        if self.storage != 'dict':
+            q_table = self.q_table.to_lists()
+        else:
+            q_table = {k: v.tolist() for k, v in self.q_table.items()}
         data = {
-            'q_table': {k: v.tolist() for k, v in self.q_table.items()},
-            'last_updated': str(np.datetime64('now'))
+            'q_table': q_table,
+            'last_updated': last_updated or str(np.datetime64('now'))
         }
-        with open(self.summary_file, 'w') as f:
-            json.dump(data, f, indent=4)
+        atomic_write_json(path or self.summary_file, data, durable=durable)
+
+    def _persist(self, state_key, action, value):
+        if self.persistence == 'memory':
+            return
+        start = time.perf_counter_ns()
+        if self.journal is None:
+            self.save_summary(durable=False, binary=self._snapshot_due(1))
+        elif self.journal.append(state_key, action, value):
+            self.save_summary()
+        if self.metrics is not None:
+            self.metrics.observe('persist', time.perf_counter_ns() - start)
+
+    def _snapshot_due(self, updates):
+        # Eager mode: whether this save also writes the binary snapshot
+        self._unsnapshotted += updates
+        if self.snapshot_every and self._unsnapshotted >= self.snapshot_every:
+            return True
+        return self.snapshot_interval is not None and time.monotonic() - self._last_snapshot >= self.snapshot_interval
+
+    def checkpoint(self):
+        # Force a full snapshot, e.g. before shutdown; a no-op if nothing is pending
+        if self.journal is None or self.journal.pending:
+            self.save_summary()
 
     def get_state_key(self, state):
-        # Convert state dict to a hashable key
-        return str(sorted(state.items()))
+        # Convert state dict to a hashable key; discretized tuple / packed-id states are keyed as-is
+        if isinstance(state, dict):
+            return str(sorted(state.items()))
+        return str(state)
 
-    def process_state(self, rl_state):
-        state_key = self.get_state_key(rl_state)
+    def process_state(self, rl_state, action_mask=None):
+        # action_mask (bool per action) restricts both exploration and the greedy choice to
+        # actions that can actually execute, e.g. SafetyGuard.action_mask(environment, ...)
+        if action_mask is not None:
+            return self._process_masked(rl_state, action_mask)
         if np.random.rand() < self.epsilon:
             action = int(np.random.randint(self.action_space_size))
+        elif self.storage != 'dict':
+            action = int(np.argmax(self.q_table.values(self.q_table.row(rl_state))))
         else:
-            action = int(np.argmax(self.q_table[state_key]))
+            action = int(np.argmax(self.q_table[self.get_state_key(rl_state)]))
         return action
 
+    def _process_masked(self, rl_state, action_mask):
+        allowed = np.flatnonzero(action_mask)
+        if len(allowed) == 0:
+            return self.process_state(rl_state)
+        if np.random.rand() < self.epsilon:
+            return int(allowed[np.random.randint(len(allowed))])
+        if self.storage != 'dict':
+            q_values = self.q_table.values(self.q_table.row(rl_state))
+        else:
+            q_values = self.q_table[self.get_state_key(rl_state)]
+        return int(allowed[np.argmax(q_values[allowed])])
+
+    def process_states(self, rl_states, action_masks=None):
+        # Batched process_state: one epsilon draw vector and one argmax over the gathered Q-rows;
+        # action_masks is an (n, actions) bool array, applied as in process_state
+        n = len(rl_states)
+        if action_masks is not None:
+            action_masks = np.asarray(action_masks, dtype=bool)
+            action_masks = action_masks | ~action_masks.any(axis=1, keepdims=True)  # empty mask: unrestricted
+            actions = np.where(action_masks, np.random.rand(n, self.action_space_size), -1.0).argmax(axis=1)
+        else:
+            actions = np.random.randint(self.action_space_size, size=n)
+        exploit = np.flatnonzero(np.random.rand(n) >= self.epsilon)
+        if len(exploit):
+            if self.storage != 'dict':
+                states = rl_states[exploit] if isinstance(rl_states, np.ndarray) else [rl_states[i] for i in exploit]
+                q_rows = self.q_table.gather(self._rows(states))
+            else:
+                q_rows = np.array([self.q_table[self.get_state_key(rl_states[i])] for i in exploit])
+            if action_masks is not None:
+                q_rows = np.where(action_masks[exploit], q_rows, -np.inf)
+            actions[exploit] = np.argmax(q_rows, axis=1)
+        return actions.tolist()
+
     def record_action_result(self, rl_state, action, reward, next_rl_state):
+        if self.storage != 'dict':
+            return self._record_row(rl_state, action, reward, next_rl_state)
         state_key = self.get_state_key(rl_state)
         next_state_key = self.get_state_key(next_rl_state)
         
@@ -51,8 +233,88 @@ class RLDecisionLayer:
         new_value = old_value + self.learning_rate * (reward + self.discount_factor * next_max - old_value)
         self.q_table[state_key][action] = new_value
         
-        self.save_summary()
+        self._persist(state_key, action, new_value)
         return new_value - old_value  # reward change
 
+    def _record_row(self, rl_state, action, reward, next_rl_state):
+        row = self.q_table.row(rl_state)
+        next_row = self.q_table.row(next_rl_state)
+        old_value, new_value = self.q_table.td_update(row, action, reward, next_row, self.learning_rate, self.discount_factor)
+        if self.replay is not None:
+            self.replay.add(row, action, reward, next_row)
+            self._replay()
+
+        self._persist(self.q_table.key_str(row), action, new_value)
+        return new_value - old_value
+
+    def record_action_results(self, rl_states, actions, rewards, next_rl_states):
+        # Batched record_action_result; persists at most once for the whole batch. Every storage
+        # computes the targets from the pre-batch table, then applies the steps in order (so a cell
+        # seen k times gets k steps). Returns, per transition, the batch's total change of its cell.
+        if self.storage == 'dict':
+            state_keys = [self.get_state_key(rl_state) for rl_state in rl_states]
+            targets = [reward + self.discount_factor * np.max(self.q_table[self.get_state_key(next_rl_state)])
+                       for reward, next_rl_state in zip(rewards, next_rl_states)]
+            first = {}
+            for state_key, action, target in zip(state_keys, actions, targets):
+                values = self.q_table[state_key]
+                first.setdefault((state_key, action), values[action])
+                values[action] += self.learning_rate * (target - values[action])
+            self._persist_many([(state_key, action, self.q_table[state_key][action]) for state_key, action in first])
+            return [float(self.q_table[state_key][action] - first[(state_key, action)])
+                    for state_key, action in zip(state_keys, actions)]
+
+        rows = self._rows(rl_states)
+        next_rows = self._rows(next_rl_states)
+        cells, old_values, new_values = self.q_table.td_update_batch(
+            rows, actions, rewards, next_rows, self.learning_rate, self.discount_factor)
+        if self.replay is not None:
+            for row, action, reward, next_row in zip(rows, actions, rewards, next_rows):
+                self.replay.add(row, action, reward, next_row)
+            self._replay()
+
+        width = self.action_space_size
+        if self.persistence != 'memory':
+            self._persist_many([(self.q_table.key_str(cell // width), cell % width, value)
+                                for cell, value in zip(cells.tolist(), new_values.tolist())])
+        flat = rows * width + np.asarray(actions, dtype=np.int64)
+        return (new_values - old_values)[np.searchsorted(cells, flat)].tolist()
+
+    def _rows(self, rl_states):
+        # Packed-id states may come as one int array (simulator, offline training): each distinct id is looked up once
+        if isinstance(rl_states, np.ndarray):
+            unique, inverse = np.unique(rl_states, return_inverse=True)
+            return np.array([self.q_table.row(int(state)) for state in unique.tolist()], dtype=np.int64)[inverse]
+        return self.q_table.rows(rl_states)
+
+    def _replay(self):
+        # Mini-batch updates from the replay buffer. These are not journaled: they only
+        # refine values derived from already-recorded experience and land in the next snapshot.
+        if len(self.replay) < self.replay_batch_size:
+            return
+        width = self.action_space_size
+        for _ in range(self.replay_steps):
+            indices, batch = self.replay.sample(self.replay_batch_size)
+            cells, old_values, new_values = self.q_table.td_update_batch(
+                batch['state'], batch['action'], batch['reward'], batch['next_state'],
+                self.learning_rate, self.discount_factor, batch['done'])
+            if self.replay.prioritized:
+                flat = batch['state'] * width + batch['action']
+                td_errors = (new_values - old_values)[np.searchsorted(cells, flat)] / self.learning_rate
+                self.replay.update_priorities(indices, td_errors)
+
+    def _persist_many(self, records):
+        if not records or self.persistence == 'memory':
+            return
+        start = time.perf_counter_ns()
+        if self.journal is None:
+            self.save_summary(durable=False, binary=self._snapshot_due(len(records)))
+        elif self.journal.append_many(records):
+            self.save_summary()
+        if self.metrics is not None:
+            self.metrics.observe('persist', time.perf_counter_ns() - start)
+
     def get_q_table_summary(self):
-        return dict(self.q_table)
\ No newline at end of file
+        if self.storage != 'dict':
+            return self.q_table.to_dict()
+        return dict(self.q_table)
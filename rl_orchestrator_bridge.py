@@ -1,114 +1,306 @@
 from rl_decision_layer import RLDecisionLayer
 from runtime_contract_validator import RuntimeContractValidator
 from runtime_state_adapter import RuntimeStateAdapter
+from app_spec import ACTION_INDEX, DEFAULT_ACTION, AppSpec
 from app_spec_validator import AppSpecValidator
 from safety_guard import SafetyGuard
 import json
 import logging
+import time
+import numpy as np
+
+
+
+def configure_trace_logging(filename='decision_traces.log'):
+    # Root logger setup the default trace sink writes through; entry points call this, imports never do
+    logging.basicConfig(filename=filename, level=logging.INFO, format='%(asctime)s - %(message)s')
+
+
+def _no_clock():
+    return 0
+
+
+def calculate_reward(outcome):
+    # Extended reward function based on runtime metrics
+    reward = 0
+    next_state = outcome.get('next_state', {})
+    
+    # Base reward for success/failure
+    if outcome.get('success'):
+        reward += 1
+    elif outcome.get('failure'):
+        reward -= 1
+    
+    # Bonus/penalty based on health improvement
+    health_improvement = next_state.get('health', 0) - outcome.get('prev_health', 0)
+    reward += health_improvement * 0.5  # Scale health changes
+    
+    # Penalty for high latency
+    latency = next_state.get('latency', 0)
+    if latency > 500:
+        reward -= 0.5
+    elif latency < 100:
+        reward += 0.2
+    
+    # Penalty for failures
+    failures = next_state.get('failures', 0)
+    reward -= failures * 0.1
+    
+    return reward
 
-logging.basicConfig(filename='decision_traces.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 
 class RLOOrchestratorBridge:
-    def __init__(self):
-        self.rl_layer = RLDecisionLayer()
+    def __init__(self, rl_layer=None, state_adapter=None, trace_sink=None, mask_actions=True, metrics=None):
+        # Dense storage: start-up maps the binary snapshot instead of copying every state
+        self.rl_layer = rl_layer if rl_layer is not None else RLDecisionLayer(storage='dense')
         self.contract_validator = RuntimeContractValidator()
-        self.state_adapter = RuntimeStateAdapter()
+        self.state_adapter = state_adapter if state_adapter is not None else RuntimeStateAdapter()
         self.spec_validator = AppSpecValidator()
         self.safety_guard = SafetyGuard()
+        # Optional sink with write(record), e.g. AsyncTraceWriter; defaults to the logging module
+        self.trace_sink = trace_sink
+        # Restrict the learner to actions the safety guard allows in the event's environment
+        self.mask_actions = mask_actions
+        # Optional PipelineMetrics: per-stage latency histograms and decision counters
+        self.metrics = metrics
+        self._clock = time.perf_counter_ns if metrics is not None else _no_clock
+        self._table_full_logged = False
+        if metrics is not None:
+            self.rl_layer.metrics = metrics
+            if hasattr(self.rl_layer, 'q_table'):  # tabular learners only
+                metrics.gauge('q_table_states', lambda: len(self.rl_layer.q_table))
+
+    def checkpoint(self):
+        # Snapshot the learner (binary snapshot included), e.g. periodically or before shutdown
+        self.rl_layer.checkpoint()
+
+    def close(self):
+        self.checkpoint()
 
     def process_runtime_event(self, runtime_data):
+        clock = self._clock
+        t0 = clock()
         # Step 1: Validate runtime contract
         is_valid, error_msg = self.contract_validator.validate(runtime_data)
         if not is_valid:
             logging.warning(f"Runtime data invalid: {error_msg}. Using NOOP fallback.")
             runtime_data = self.contract_validator.get_noop_fallback()  # NOOP fallback
+        t1 = clock()
 
         # Step 2: Adapt to RL state
         rl_state = self.state_adapter.adapt(runtime_data)
+        t2 = clock()
 
         # Step 3: Get RL decision
-        rl_action = self.rl_layer.process_state(rl_state)
+        try:
+            rl_action = self.rl_layer.process_state(rl_state, self._action_mask(runtime_data))
+        except MemoryError as e:
+            self._table_full(e)
+            rl_action = ACTION_INDEX[DEFAULT_ACTION]
+        t3 = clock()
 
         # Step 4: Wrap RL action into app_spec
         app_spec = self._create_app_spec_from_action(rl_action, runtime_data)
+        proposed_action = app_spec['action']  # before validation / safety downgrades
+        t4 = clock()
 
         # Step 5: Validate spec
         spec_valid = self.spec_validator.validate(app_spec)
         if not spec_valid:
             app_spec = self._downgrade_spec(app_spec)
+        t5 = clock()
 
         # Step 6: Safety guard
         final_decision = self.safety_guard.guard(app_spec)
-        final_decision['rl_action'] = rl_action  # For recording
+        t6 = clock()
 
         # Log the decision trace
         trace = {
             'runtime_state': runtime_data,
             'rl_state': rl_state,
             'rl_action': rl_action,
+            'proposed_action': proposed_action,
             'app_spec': app_spec,
             'spec_valid': spec_valid,
             'safety_decision': final_decision,
             'reward': None  # To be set later
         }
-        logging.info(json.dumps(trace))
+        self._log_trace(trace)
 
+        if self.metrics is not None:
+            self.metrics.observe_event((t0, t1, t2, t3, t4, t5, t6, clock()), not is_valid,
+                                       final_decision.action != proposed_action)
         return final_decision
 
+    def process_runtime_events(self, events):
+        # Batched process_runtime_event: same pipeline and semantics, decisions returned in input order.
+        # Spec creation and validation depend only on the RL action, so they run once per action
+        # index and are looked up per event; masks are built once per environment.
+        clock = self._clock
+        t0 = clock()
+        valid, errors = self.contract_validator.validate_batch(events)
+        runtime_batch = []
+        for runtime_data, is_valid, error_msg in zip(events, valid, errors):
+            if not is_valid:
+                logging.warning(f"Runtime data invalid: {error_msg}. Using NOOP fallback.")
+                runtime_data = self.contract_validator.get_noop_fallback()
+            runtime_batch.append(runtime_data)
+        t1 = clock()
+
+        rl_states = self.state_adapter.adapt_batch(runtime_batch)
+        t2 = clock()
+        action_masks = self._action_masks(runtime_batch) if self.mask_actions else None
+        try:
+            rl_actions = self.rl_layer.process_states(rl_states, action_masks)
+        except MemoryError as e:
+            self._table_full(e)
+            rl_actions = [ACTION_INDEX[DEFAULT_ACTION]] * len(runtime_batch)
+        t3 = clock()
+
+        # One spec per action index: proposed action, validity and the (possibly downgraded) spec
+        specs = [self._create_app_spec_from_action(i, None) for i in range(self.rl_layer.action_space_size)]
+        proposed_table = [spec.action for spec in specs]
+        t4 = clock()
+        valid_table = [self.spec_validator.validate(spec) for spec in specs]
+        specs = [spec if spec_valid else self._downgrade_spec(spec) for spec, spec_valid in zip(specs, valid_table)]
+        spec_traces = [spec.to_trace() for spec in specs]
+        t5 = clock()
+
+        guarded, rules = self.safety_guard.guard_columns([specs[a].action for a in rl_actions], runtime_batch)
+        decisions = [AppSpec(action, specs[rl_action].target, runtime_data, rl_action, rule)
+                     for action, rule, rl_action, runtime_data in zip(guarded.tolist(), rules.tolist(), rl_actions,
+                                                                     runtime_batch)]
+        t6 = clock()
+        for runtime_data, rl_state, rl_action, final_decision in zip(runtime_batch, rl_states, rl_actions, decisions):
+            self._write_trace({
+                'runtime_state': runtime_data,
+                'rl_state': rl_state,
+                'rl_action': rl_action,
+                'proposed_action': proposed_table[rl_action],
+                'app_spec': spec_traces[rl_action],
+                'spec_valid': valid_table[rl_action],
+                'safety_decision': final_decision.to_trace(),
+                'reward': None
+            })
+
+        if self.metrics is not None:
+            downgrades = sum(decision.action != proposed_table[rl_action]
+                             for decision, rl_action in zip(decisions, rl_actions))
+            self.metrics.observe_batch((t0, t1, t2, t3, t4, t5, t6, clock()), len(events),
+                                       len(events) - int(np.count_nonzero(valid)), downgrades)
+        return decisions
+
+    def _action_masks(self, runtime_batch):
+        # _action_mask per event, built once per distinct environment
+        default = self.safety_guard.default_environment
+        environments = {}
+        rows = [environments.setdefault(runtime_data.get('environment', default), len(environments))
+                for runtime_data in runtime_batch]
+        masks = np.array([self.safety_guard.action_mask(env, self.rl_layer.action_space_size) for env in environments])
+        return masks.reshape(len(environments), self.rl_layer.action_space_size)[rows]
+
+    def _table_full(self, error):
+        # A fixed-capacity Q-table (SharedQTable) ran out of rows: new states get NOOP and no learning
+        if not self._table_full_logged:
+            self._table_full_logged = True
+            logging.error(f"{error}; deciding {DEFAULT_ACTION} and skipping learning for new states")
+
+    def _action_mask(self, runtime_data):
+        if not self.mask_actions:
+            return None
+        environment = runtime_data.get('environment', self.safety_guard.default_environment)
+        return self.safety_guard.action_mask(environment, self.rl_layer.action_space_size)
+
     def _create_app_spec_from_action(self, action, runtime_data):
-        # Map action index to spec
-        action_map = {
-            0: {'action': 'scale_up', 'target': 'service'},
-            1: {'action': 'scale_down', 'target': 'service'},
-            2: {'action': 'restart', 'target': 'service'},
-            3: {'action': 'heal', 'target': 'service'},
-            4: {'action': 'monitor', 'target': 'service'},
-            # Add more as needed
-        }
-        spec = action_map.get(action, {'action': 'monitor', 'target': 'service'})
-        spec['runtime_context'] = runtime_data
-        return spec
+        # Map action index to spec via the module-level action table (app_spec.ACTIONS)
+        return AppSpec.from_action(action, runtime_data)
 
     def _downgrade_spec(self, spec):
         # Downgrade unsafe spec to safe one
-        spec['action'] = 'monitor'
-        return spec
+        return spec.replace(action='monitor')
 
     def record_outcome(self, runtime_data, action, outcome):
         rl_state = self.state_adapter.adapt(runtime_data)
         next_runtime_data = outcome.get('next_state', runtime_data)
         next_rl_state = self.state_adapter.adapt(next_runtime_data)
         reward = self._calculate_reward(outcome)
-        reward_change = self.rl_layer.record_action_result(rl_state, action, reward, next_rl_state)
+        start = self._clock()
+        try:
+            reward_change = self.rl_layer.record_action_result(rl_state, action, reward, next_rl_state)
+        except MemoryError as e:
+            self._table_full(e)
+            reward_change = 0.0
+        if self.metrics is not None:
+            self.metrics.observe('learn', self._clock() - start)
+            self.metrics.count('outcomes')
         
         # Update last log with reward
         # Note: In real implementation, might need to store traces and update
-        logging.info(f"Reward recorded: {reward}, Change: {reward_change}")
+        self._log_reward(reward, reward_change)
+
+    def record_outcomes(self, batch):
+        # Batched record_outcome over (runtime_data, action, outcome) tuples; one Q-table persist per batch
+        if not batch:
+            return
+        runtime_batch = [runtime_data for runtime_data, _, _ in batch]
+        actions = [action for _, action, _ in batch]
+        outcomes = [outcome for _, _, outcome in batch]
+        rl_states = self.state_adapter.adapt_batch(runtime_batch)
+        next_rl_states = self.state_adapter.adapt_batch(
+            [outcome.get('next_state', runtime_data) for runtime_data, outcome in zip(runtime_batch, outcomes)])
+        rewards = self._calculate_rewards(outcomes)
+        start = self._clock()
+        try:
+            reward_changes = self.rl_layer.record_action_results(rl_states, actions, rewards, next_rl_states)
+        except MemoryError as e:
+            self._table_full(e)
+            reward_changes = [0.0] * len(batch)
+        if self.metrics is not None:
+            self.metrics.stages['learn'].observe_many((self._clock() - start) // len(batch), len(batch))
+            self.metrics.count('outcomes', len(batch))
+
+        for reward, reward_change in zip(rewards, reward_changes):
+            self._log_reward(reward, reward_change)
+
+    def _log_trace(self, trace):
+        # The runtime context is logged once, under runtime_state; the specs only reference it
+        trace['app_spec'] = trace['app_spec'].to_trace()
+        trace['safety_decision'] = trace['safety_decision'].to_trace()
+        self._write_trace(trace)
+
+    def _write_trace(self, trace):
+        # A trace whose specs are already in trace form
+        if self.trace_sink is None:
+            logging.info(json.dumps(trace))
+            return
+        # The sink serializes later, so snapshot the caller's runtime data now
+        trace['runtime_state'] = {key: list(value) if isinstance(value, list) else value
+                                  for key, value in trace['runtime_state'].items()}
+        trace['type'] = 'decision'
+        self.trace_sink.write(trace)
+
+    def _log_reward(self, reward, reward_change):
+        if self.trace_sink is None:
+            logging.info(f"Reward recorded: {reward}, Change: {reward_change}")
+        else:
+            self.trace_sink.write({'type': 'reward', 'reward': float(reward), 'change': float(reward_change)})
+
+    def _calculate_rewards(self, outcomes):
+        # Vectorized _calculate_reward over a batch of outcomes
+        next_states = [outcome.get('next_state', {}) for outcome in outcomes]
+        success = np.array([bool(outcome.get('success')) for outcome in outcomes])
+        failure = np.array([bool(outcome.get('failure')) for outcome in outcomes])
+        prev_health = np.array([outcome.get('prev_health', 0) for outcome in outcomes], dtype=np.float64)
+        health = np.array([next_state.get('health', 0) for next_state in next_states], dtype=np.float64)
+        latency = np.array([next_state.get('latency', 0) for next_state in next_states], dtype=np.float64)
+        failures = np.array([next_state.get('failures', 0) for next_state in next_states], dtype=np.float64)
+
+        rewards = success.astype(np.float64) - (~success & failure)
+        rewards += (health - prev_health) * 0.5
+        rewards -= 0.5 * (latency > 500)
+        rewards += 0.2 * (latency < 100)
+        rewards -= failures * 0.1
+        return rewards.tolist()
 
     def _calculate_reward(self, outcome):
-        # Extended reward function based on runtime metrics
-        reward = 0
-        next_state = outcome.get('next_state', {})
-        
-        # Base reward for success/failure
-        if outcome.get('success'):
-            reward += 1
-        elif outcome.get('failure'):
-            reward -= 1
-        
-        # Bonus/penalty based on health improvement
-        health_improvement = next_state.get('health', 0) - outcome.get('prev_health', 0)
-        reward += health_improvement * 0.5  # Scale health changes
-        
-        # Penalty for high latency
-        latency = next_state.get('latency', 0)
-        if latency > 500:
-            reward -= 0.5
-        elif latency < 100:
-            reward += 0.2
-        
-        # Penalty for failures
-        failures = next_state.get('failures', 0)
-        reward -= failures * 0.1
-        
-        return reward
\ No newline at end of file
+        return calculate_reward(outcome)
\ No newline at end of file
@@ -1,23 +1,141 @@
+import numpy as np
+from collections import Counter
+
+_NUMBER_TYPES = frozenset((int, float))
+
+# Reason codes, in the order validate() checks them; 0 means valid
+REASONS = ('valid', 'invalid_latency', 'invalid_health', 'invalid_failures', 'invalid_services', 'missing_field')
+MESSAGES = {
+    'invalid_latency': "Invalid latency: must be non-negative number",
+    'invalid_health': "Invalid health: must be float between 0 and 1",
+    'invalid_failures': "Invalid failures: must be non-negative integer",
+    'invalid_services': "Invalid services: must be non-empty list",
+}
+
+
 class RuntimeContractValidator:
+    required_fields = ['latency', 'health', 'failures', 'services']
+
+    def __init__(self):
+        self.rejected = Counter()  # reason -> events rejected so far, across all validate* calls
+
     def validate(self, runtime_data):
+        # Fast path: the common valid shape with exact built-in types passes with a handful of
+        # comparisons; anything else (missing fields, subclasses, bad values) takes the full check
+        try:
+            latency = runtime_data['latency']
+            health = runtime_data['health']
+            failures = runtime_data['failures']
+            services = runtime_data['services']
+        except KeyError:
+            pass
+        else:
+            if (type(latency) in _NUMBER_TYPES and latency >= 0 and type(health) in _NUMBER_TYPES and 0 <= health <= 1
+                    and type(failures) is int and failures >= 0 and type(services) is list and services):
+                return True, None
+        is_valid, reason, error_msg = self._check(runtime_data)
+        if not is_valid:
+            self.rejected[reason] += 1
+        return is_valid, error_msg
+
+    def _check(self, runtime_data):
         # Check if runtime_data has required fields
-        required_fields = ['latency', 'health', 'failures', 'services']
+        required_fields = self.required_fields
         for field in required_fields:
             if field not in runtime_data:
-                return False, "Missing required field: " + field
-        
+                return False, 'missing_field', "Missing required field: " + field
+
         # Additional validation for invalid states
         if not isinstance(runtime_data['latency'], (int, float)) or runtime_data['latency'] < 0:
-            return False, "Invalid latency: must be non-negative number"
+            return False, 'invalid_latency', MESSAGES['invalid_latency']
         if not isinstance(runtime_data['health'], (int, float)) or not (0 <= runtime_data['health'] <= 1):
-            return False, "Invalid health: must be float between 0 and 1"
+            return False, 'invalid_health', MESSAGES['invalid_health']
         if not isinstance(runtime_data['failures'], int) or runtime_data['failures'] < 0:
-            return False, "Invalid failures: must be non-negative integer"
+            return False, 'invalid_failures', MESSAGES['invalid_failures']
         if not isinstance(runtime_data['services'], list) or len(runtime_data['services']) == 0:
-            return False, "Invalid services: must be non-empty list"
-        
-        return True, None
-    
+            return False, 'invalid_services', MESSAGES['invalid_services']
+
+        return True, None, None
+
+    def _reason_codes(self, latency, health, failures, services_ok, typed):
+        # First failing check per event, as an index into REASONS; NaN latency passes, as in validate()
+        checks = [~(latency < 0), (health >= 0) & (health <= 1), failures >= 0, services_ok]
+        codes = np.zeros(len(latency), dtype=np.int8)
+        for code in range(len(checks), 0, -1):
+            codes[~(checks[code - 1] & typed[code - 1])] = code
+        return codes
+
+    def _count(self, codes):
+        counts = {REASONS[code]: int(count) for code, count in enumerate(np.bincount(codes, minlength=len(REASONS)))
+                  if code and count}
+        self.rejected.update(counts)
+        return counts
+
+    def validate_batch(self, events):
+        # Same checks as validate(), but field extraction is one pass into columns
+        # and the range checks run vectorized. Returns (valid mask, error per event).
+        n = len(events)
+        errors = [None] * n
+        latency = np.zeros(n)
+        health = np.zeros(n)
+        failures = np.zeros(n)
+        typed = np.zeros((4, n), dtype=bool)  # latency, health, failures, services type checks
+        complete = np.ones(n, dtype=bool)
+        for i, event in enumerate(events):
+            for field in self.required_fields:
+                if field not in event:
+                    errors[i] = "Missing required field: " + field
+                    complete[i] = False
+                    break
+            else:
+                value = event['latency']
+                if isinstance(value, (int, float)):
+                    typed[0, i] = True
+                    latency[i] = value
+                value = event['health']
+                if isinstance(value, (int, float)):
+                    typed[1, i] = True
+                    health[i] = value
+                value = event['failures']
+                if isinstance(value, int):
+                    typed[2, i] = True
+                    failures[i] = value
+                value = event['services']
+                typed[3, i] = isinstance(value, list) and len(value) > 0
+
+        codes = self._reason_codes(latency, health, failures, typed[3], typed)
+        codes[~complete] = REASONS.index('missing_field')
+        for i in np.flatnonzero(complete & (codes != 0)):
+            errors[i] = MESSAGES[REASONS[codes[i]]]
+        self._count(codes)
+        return codes == 0, errors
+
+    def validate_columns(self, latency, health, failures, service_counts):
+        """Validate a columnar block of events in one vectorized pass.
+
+        Takes one array per field (services as per-event counts) and returns
+        (valid mask, {reason: count} for the rejected events). Failures must be
+        integers; float columns pass only where the value is integral.
+        """
+        latency = np.asarray(latency)
+        health = np.asarray(health)
+        failures = np.asarray(failures)
+        service_counts = np.asarray(service_counts)
+        n = len(latency)
+        typed = [np.full(n, latency.dtype.kind in 'biuf'), np.full(n, health.dtype.kind in 'biuf')]
+        if failures.dtype.kind in 'biu':
+            typed.append(np.ones(n, dtype=bool))
+        elif failures.dtype.kind == 'f':
+            typed.append(np.floor(failures) == failures)
+        else:
+            typed.append(np.zeros(n, dtype=bool))
+        typed.append(np.ones(n, dtype=bool))
+        # Non-numeric columns cannot be range-checked; their events already fail the type check
+        latency, health, failures = (column if column.dtype.kind in 'biuf' else np.zeros(n)
+                                     for column in (latency, health, failures))
+        codes = self._reason_codes(latency, health, failures, service_counts > 0, typed)
+        return codes == 0, self._count(codes)
+
     def get_noop_fallback(self):
         # Return a NOOP (no operation) runtime state for fallback
         return {
@@ -25,4 +143,4 @@ class RuntimeContractValidator:
             'health': 1.0,
             'failures': 0,
             'services': ['noop']
-        }
\ No newline at end of file
+        }
@@ -1,5 +1,16 @@
+import numpy as np
+
+
 class RuntimeStateAdapter:
+    latency_edges = [100, 500]
+
+    def __init__(self, discretizer=None):
+        # Optional StateDiscretizer; without one, health and failures pass through unbinned
+        self.discretizer = discretizer
+
     def adapt(self, runtime_data):
+        if self.discretizer is not None:
+            return self.discretizer.discretize(runtime_data)
         # Convert runtime_data to RL state dict
         rl_state = {
             'latency_level': self._categorize_latency(runtime_data.get('latency', 0)),
@@ -9,10 +20,41 @@ class RuntimeStateAdapter:
         }
         return rl_state
 
+    def adapt_batch(self, runtime_batch):
+        # Vectorized adapt() over many events; latency levels come from one searchsorted
+        if self.discretizer is not None:
+            return self.discretizer.discretize_batch(runtime_batch)
+        latencies = np.array([runtime_data.get('latency', 0) for runtime_data in runtime_batch], dtype=np.float64)
+        latency_levels = np.searchsorted(self.latency_edges, latencies, side='right').tolist()
+        return [
+            {
+                'latency_level': latency_level,
+                'health_level': runtime_data.get('health', 0),
+                'failure_count': runtime_data.get('failures', 0),
+                'service_count': len(runtime_data.get('services', []))
+            }
+            for latency_level, runtime_data in zip(latency_levels, runtime_batch)
+        ]
+
     def _categorize_latency(self, latency):
         if latency < 100:
             return 0
         elif latency < 500:
             return 1
         else:
-            return 2
\ No newline at end of file
+            return 2
+
+
+class RawStateAdapter:
+    """Unbinned runtime metrics as the RL state, for learners that generalize over continuous inputs (LinearQLearner)."""
+
+    def adapt(self, runtime_data):
+        return {
+            'latency': float(runtime_data.get('latency', 0)),
+            'health': float(runtime_data.get('health', 0)),
+            'failures': float(runtime_data.get('failures', 0)),
+            'service_count': len(runtime_data.get('services', [])),
+        }
+
+    def adapt_batch(self, runtime_batch):
+        return [self.adapt(runtime_data) for runtime_data in runtime_batch]
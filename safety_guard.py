@@ -1,31 +1,273 @@
+import json
 import logging
+import operator
+import os
+import time
+import numpy as np
+from app_spec import ACTION_INDEX, ACTION_TABLE, DEFAULT_ACTION
+
+# Built-in rules, used when no config file exists; safety_rules.json ships with the same content
+DEFAULT_RULES = {
+    'default_environment': 'prod',
+    'fallback_action': 'monitor',
+    # Strict environment-based action allowlists
+    'allowlists': {
+        'prod': ['monitor', 'heal', 'scale_down'],  # Conservative actions for prod
+        'dev': ['monitor', 'heal', 'scale_up', 'scale_down', 'restart'],  # More flexible for dev
+        'test': ['monitor', 'restart', 'scale_up', 'scale_down', 'heal']  # Full actions for test
+    },
+    # Threshold rules: downgrade `actions` when runtime_context[field] <op> value
+    'rules': [
+        {'name': 'no_restart_when_healthy', 'actions': ['restart'], 'field': 'health', 'op': '>', 'value': 0.8},
+        {'name': 'no_scale_up_when_very_healthy', 'actions': ['scale_up'], 'field': 'health', 'op': '>', 'value': 0.9}
+    ]
+}
+
+OPS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '==': operator.eq, '!=': operator.ne}
+
 
 class SafetyGuard:
-    def __init__(self):
-        # Strict environment-based action allowlists
-        self.allowlists = {
-            'prod': ['monitor', 'heal', 'scale_down'],  # Conservative actions for prod
-            'dev': ['monitor', 'heal', 'scale_up', 'scale_down', 'restart'],  # More flexible for dev
-            'test': ['monitor', 'restart', 'scale_up', 'scale_down', 'heal']  # Full actions for test
-        }
-    
+    """Downgrades unsafe actions according to data-driven rules.
+
+    Rules come from `config_file` (see safety_rules.json): per-environment
+    action allowlists plus threshold rules on runtime_context fields, applied
+    in order. They are compiled into bitmask tables (one bit per action, a
+    mask per environment and per rule) and threshold arrays, so guard_batch
+    evaluates each rule once over the whole batch. The file is re-checked at
+    most every `reload_interval` seconds and recompiled when it changes; an
+    invalid file is logged and the previous rules stay in force. Every
+    guarded spec carries a 'safety_rule' naming the rule that downgraded it
+    (or None); AppSpec records come back as new records, dict specs are
+    updated in place.
+    """
+
+    def __init__(self, config_file='safety_rules.json', reload_interval=1.0):
+        self.config_file = config_file
+        self.reload_interval = reload_interval
+        self._config_version = None
+        self._next_check = 0.0
+        self.compile(DEFAULT_RULES)
+        self.maybe_reload(force=True)
+
+    def compile(self, config):
+        # Everything is built and validated in locals first: a config that raises leaves the
+        # current rules untouched, and a valid one is swapped in with no failure point midway
+        allowlists = {env: list(actions) for env, actions in config['allowlists'].items()}
+        default_env = config.get('default_environment', 'prod')
+        if default_env not in allowlists:
+            raise ValueError(f"Default environment {default_env!r} has no allowlist")
+        fallback = config.get('fallback_action', 'monitor')
+        rules = config.get('rules', [])
+        actions = [fallback]
+        for names in list(allowlists.values()) + [rule['actions'] for rule in rules]:
+            actions.extend(action for action in names if action not in actions)
+        if len(actions) > 63:
+            raise ValueError("Safety rules support at most 63 distinct actions")
+        action_bits = {action: 1 << i for i, action in enumerate(actions)}
+        envs = list(allowlists)
+        env_bits = {env: 1 << i for i, env in enumerate(envs)}
+        for rule in rules:
+            if rule['op'] not in OPS:
+                raise ValueError(f"Unknown rule operator: {rule['op']}")
+            unknown = [env for env in rule.get('environments', envs) if env not in env_bits]
+            if unknown:
+                raise ValueError(f"Rule {rule['name']!r} names environments without an allowlist: {unknown}")
+
+        allow_masks = np.array([sum(action_bits[a] for a in allowlists[env]) for env in envs], dtype=np.int64)
+        rule_names = [rule['name'] for rule in rules]
+        rule_action_masks = np.array([sum(action_bits[a] for a in rule['actions']) for rule in rules], dtype=np.int64)
+        rule_env_masks = np.array([sum(env_bits[env] for env in rule.get('environments', envs)) for rule in rules],
+                                  dtype=np.int64)
+        rule_fields = [rule['field'] for rule in rules]
+        rule_ops = [rule['op'] for rule in rules]
+        rule_thresholds = np.array([rule['value'] for rule in rules], dtype=np.float64)
+        rule_defaults = np.array([rule.get('default', 0) for rule in rules], dtype=np.float64)
+        # Plain-int copy of the tables for the scalar path
+        scalar_rules = [(name, int(action_mask), int(env_mask), field, OPS[op], float(threshold), float(default))
+                        for name, action_mask, env_mask, field, op, threshold, default in zip(
+                            rule_names, rule_action_masks, rule_env_masks, rule_fields, rule_ops, rule_thresholds,
+                            rule_defaults)]
+
+        self.__dict__.update(
+            allowlists=allowlists,
+            default_environment=default_env,
+            fallback_action=fallback,
+            actions=actions,
+            action_index={action: i for i, action in enumerate(actions)},
+            env_index={env: i for i, env in enumerate(envs)},
+            envs=envs,
+            allow_masks=allow_masks,
+            rule_names=rule_names,
+            rule_action_masks=rule_action_masks,
+            rule_env_masks=rule_env_masks,
+            rule_fields=rule_fields,
+            rule_ops=rule_ops,
+            rule_thresholds=rule_thresholds,
+            rule_defaults=rule_defaults,
+            _rules=scalar_rules,
+            _allow=dict(zip(envs, allow_masks.tolist())),
+            _action_bits=action_bits,
+            _env_bits=env_bits,
+            _action_masks={},
+        )
+
+    def maybe_reload(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+        try:
+            stat = os.stat(self.config_file)
+        except FileNotFoundError:
+            return False
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._config_version:
+            return False
+        self._config_version = version
+        try:
+            with open(self.config_file, 'r') as f:
+                self.compile(json.load(f))
+        except (ValueError, KeyError, TypeError) as e:
+            logging.error(f"Invalid safety rules in {self.config_file}, keeping the previous rules: {e}")
+            return False
+        logging.info(f"Loaded safety rules from {self.config_file}")
+        return True
+
+    def action_mask(self, environment, action_space_size):
+        # Boolean mask over RL action indices that can execute in `environment`: the action's
+        # allowlist entry permits it, and it is the canonical index for its action (indices the
+        # action table does not map all collapse onto the default action's index)
+        self.maybe_reload()
+        key = (environment, action_space_size)
+        mask = self._action_masks.get(key)
+        if mask is None:
+            env = environment if environment in self._allow else self.default_environment
+            allowed = self._allow[env]
+            mask = np.zeros(action_space_size, dtype=bool)
+            for i in range(action_space_size):
+                action = ACTION_TABLE.get(i, DEFAULT_ACTION)
+                mask[i] = bool(self._action_bits.get(action, 0) & allowed) and ACTION_INDEX[action] == i
+            mask.flags.writeable = False
+            self._action_masks[key] = mask
+        return mask
+
+    def guard_actions(self, actions, environment, columns):
+        # Array form of guard() for simulated replicas sharing one environment: `actions` are RL
+        # action indices, `columns` maps runtime fields to arrays (lists as counts). Returns the
+        # executed RL action index per replica and the index of the rule that fired
+        # (-1: none, -2: allowlist, k: rule k).
+        self.maybe_reload()
+        env = environment if environment in self._allow else self.default_environment
+        actions = np.asarray(actions, dtype=np.int64)
+        size = int(actions.max()) + 1 if len(actions) else 0
+        bits_by_action = np.array([self._action_bits.get(ACTION_TABLE.get(i, DEFAULT_ACTION), 0) for i in range(size)],
+                                  dtype=np.int64)
+        bits = bits_by_action[actions]
+        executed = np.array([ACTION_INDEX[ACTION_TABLE.get(i, DEFAULT_ACTION)] for i in range(size)], dtype=np.int64)[actions]
+        fallback_bits = self._action_bits[self.fallback_action]
+        fallback = ACTION_INDEX.get(self.fallback_action, ACTION_INDEX[DEFAULT_ACTION])
+        fired = np.full(len(actions), -1, dtype=np.int64)
+
+        blocked = (bits & self._allow[env]) == 0
+        bits[blocked] = fallback_bits
+        executed[blocked] = fallback
+        fired[blocked] = -2
+        env_bit = self._env_bits[env]
+        for k, (name, action_mask, env_mask, field, op, threshold, default) in enumerate(self._rules):
+            if not env_bit & env_mask:
+                continue
+            column = columns.get(field)
+            values = np.full(len(actions), default) if column is None else np.asarray(column, dtype=np.float64)
+            hit = ((bits & action_mask) != 0) & op(values, threshold)
+            bits[hit] = fallback_bits
+            executed[hit] = fallback
+            fired[hit & (fired == -1)] = k
+        return executed, fired
+
+    def _field(self, runtime, field, default):
+        # A missing or None field takes the rule's default, on the scalar and batch paths alike
+        value = runtime.get(field)
+        if value is None:
+            return default
+        return len(value) if isinstance(value, list) else value
+
     def guard(self, app_spec):
+        self.maybe_reload()
         # Get environment from runtime_context or default to 'prod'
-        env = app_spec.get('runtime_context', {}).get('environment', 'prod')
-        allowed_actions = self.allowlists.get(env, self.allowlists['prod'])
-        
+        runtime = app_spec.get('runtime_context') or {}
+        env = runtime.get('environment', self.default_environment)
+        env_name = env
+        if env not in self._allow:
+            env = self.default_environment
+        action = app_spec.get('action')
+        fired = None
+
         # Enforce allowlist: downgrade unsafe actions
-        if app_spec.get('action') not in allowed_actions:
-            logging.warning(f"Action '{app_spec['action']}' not allowed in {env}. Downgrading to 'monitor'.")
-            app_spec['action'] = 'monitor'
-        
-        # Apply additional safety rules
-        runtime = app_spec.get('runtime_context', {})
-        if app_spec.get('action') == 'restart' and runtime.get('health', 0) > 0.8:
-            # Don't restart healthy services
-            app_spec['action'] = 'monitor'
-        if app_spec.get('action') == 'scale_up' and runtime.get('health', 0) > 0.9:
-            # Don't scale up if already very healthy
-            app_spec['action'] = 'monitor'
-        # Add more safety rules as needed
-        return app_spec
\ No newline at end of file
+        if not self._action_bits.get(action, 0) & self._allow[env]:
+            logging.warning(f"Action '{action}' not allowed in {env_name}. Downgrading to '{self.fallback_action}'.")
+            action = self.fallback_action
+            fired = f'allowlist:{env}'
+
+        # Threshold rules, in order
+        env_bit = self._env_bits[env]
+        for name, action_mask, env_mask, field, op, threshold, default in self._rules:
+            if (self._action_bits.get(action, 0) & action_mask and env_bit & env_mask
+                    and op(self._field(runtime, field, default), threshold)):
+                action = self.fallback_action
+                fired = fired or name
+        return self._apply(app_spec, action, fired)
+
+    def _apply(self, app_spec, action, fired):
+        # Plain dict specs are updated in place; AppSpec records are replaced only when something fired
+        if isinstance(app_spec, dict):
+            app_spec['action'] = action
+            app_spec['safety_rule'] = fired
+            return app_spec
+        if fired is None and app_spec.safety_rule is None:
+            return app_spec
+        return app_spec.replace(action=action, safety_rule=fired)
+
+    def guard_batch(self, app_specs):
+        # Same rules as guard(), each evaluated once over the whole batch with array ops
+        runtimes = [app_spec.get('runtime_context') or {} for app_spec in app_specs]
+        actions, rules = self.guard_columns([app_spec.get('action') for app_spec in app_specs], runtimes)
+        return [self._apply(app_spec, app_spec.get('action') if rule is None else action, rule)
+                for app_spec, action, rule in zip(app_specs, actions.tolist(), rules.tolist())]
+
+    def guard_columns(self, actions, runtimes):
+        # guard_batch without the specs: one action name and runtime context per event in,
+        # (guarded action names, safety_rule per event) out as object arrays
+        self.maybe_reload()
+        n = len(actions)
+        actions = np.array([self.action_index.get(action, -1) for action in actions], dtype=np.int64)
+        envs = np.array([self.env_index.get(runtime.get('environment', self.default_environment),
+                                            self.env_index[self.default_environment]) for runtime in runtimes],
+                        dtype=np.int64)
+        fired = np.full(n, -1, dtype=np.int64)  # -1: none, -2: allowlist, k: rule k
+
+        action_bits = np.where(actions >= 0, np.left_shift(1, np.maximum(actions, 0)), 0)
+        blocked = (action_bits & self.allow_masks[envs]) == 0
+        for env in np.unique(envs[blocked]):
+            count = int((blocked & (envs == env)).sum())
+            logging.warning(f"{count} action(s) not allowed in {self.envs[env]}. Downgrading to '{self.fallback_action}'.")
+        actions[blocked] = self.action_index[self.fallback_action]
+        fired[blocked] = -2
+
+        columns = {}
+        env_bits = np.left_shift(1, envs)
+        for k, field in enumerate(self.rule_fields):
+            key = (field, self.rule_defaults[k])
+            if key not in columns:
+                columns[key] = np.array([self._field(runtime, field, self.rule_defaults[k]) for runtime in runtimes],
+                                        dtype=np.float64)
+            hit = ((np.left_shift(1, actions) & self.rule_action_masks[k]) != 0) & ((env_bits & self.rule_env_masks[k]) != 0)
+            hit &= OPS[self.rule_ops[k]](columns[key], self.rule_thresholds[k])
+            actions[hit] = self.action_index[self.fallback_action]
+            fired[hit & (fired == -1)] = k
+
+        # Rule labels indexed by fired: rules, then None, then one allowlist label per environment
+        labels = np.array(self.rule_names + [None] + [f'allowlist:{env}' for env in self.envs], dtype=object)
+        nrules = len(self.rule_names)
+        rules = labels[np.where(fired >= 0, fired, np.where(fired == -1, nrules, nrules + 1 + envs))]
+        names = np.array(self.actions + [None], dtype=object)
+        return names[actions], rules
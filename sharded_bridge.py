@@ -0,0 +1,116 @@
+import bisect
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from shared_q_table import stable_key_hash
+
+_bridge = None  # the shard's bridge, one per worker process
+
+
+def _init_shard(summary_file, layer_kwargs):
+    global _bridge
+    from rl_decision_layer import RLDecisionLayer
+    from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
+    configure_trace_logging()
+    _bridge = RLOOrchestratorBridge(rl_layer=RLDecisionLayer(summary_file=summary_file, **layer_kwargs))
+
+
+def _call(method, *args):
+    return getattr(_bridge, method)(*args)
+
+
+def _checkpoint():
+    _bridge.rl_layer.checkpoint()
+
+
+def routing_key(runtime_data):
+    # The event's service, or its sorted services list when it has none
+    if runtime_data.get('service') is not None:
+        return runtime_data['service']
+    services = runtime_data.get('services')
+    return ','.join(sorted(map(str, services))) if isinstance(services, list) else ''
+
+
+class ConsistentHashRing:
+    """Maps keys to nodes so that adding or removing a node only moves about 1/n of the keys."""
+
+    def __init__(self, nodes, replicas=64):
+        ring = sorted((stable_key_hash(f'{node}#{i}'), node) for node in nodes for i in range(replicas))
+        self.hashes = [h for h, _ in ring]
+        self.nodes = [node for _, node in ring]
+
+    def node_for(self, key):
+        i = bisect.bisect(self.hashes, stable_key_hash(str(key))) % len(self.hashes)
+        return self.nodes[i]
+
+
+class ShardedOrchestratorBridge:
+    """Fleet-wide bridge that gives each group of services its own learner.
+
+    Services are assigned to `shards` shards on a consistent-hash ring. Every
+    shard is a long-lived single-process executor holding its own
+    RLOOrchestratorBridge and RLDecisionLayer, persisted to
+    `<shard_dir>/shard_<n>.json`, so shards decide in parallel on separate
+    cores and one noisy service only moves the Q-values of its own shard.
+    Events are routed by their 'service' field, or by their services list when
+    they have none.
+    """
+
+    def __init__(self, shards=4, shard_dir='shards', replicas=64, mp_context=None, **layer_kwargs):
+        layer_kwargs.setdefault('storage', 'dense')
+        layer_kwargs.setdefault('persistence', 'journal')
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shard_dir = shard_dir
+        self.ring = ConsistentHashRing(range(shards), replicas)
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=mp_context, initializer=_init_shard,
+                                initargs=(os.path.join(shard_dir, f'shard_{shard}.json'), layer_kwargs))
+            for shard in range(shards)
+        ]
+
+    def routing_key(self, runtime_data):
+        return routing_key(runtime_data)
+
+    def shard_for(self, runtime_data):
+        return self.ring.node_for(self.routing_key(runtime_data))
+
+    def submit_runtime_event(self, runtime_data):
+        # Future of the owning shard's decision, for callers that overlap several events
+        return self.executors[self.shard_for(runtime_data)].submit(_call, 'process_runtime_event', runtime_data)
+
+    def process_runtime_event(self, runtime_data):
+        return self.submit_runtime_event(runtime_data).result()
+
+    def process_runtime_events(self, events):
+        # Each shard gets its events as one batch; all shards work in parallel; decisions come back in input order
+        groups = defaultdict(list)
+        for i, runtime_data in enumerate(events):
+            groups[self.shard_for(runtime_data)].append(i)
+        futures = {shard: self.executors[shard].submit(_call, 'process_runtime_events', [events[i] for i in indices])
+                   for shard, indices in groups.items()}
+        decisions = [None] * len(events)
+        for shard, indices in groups.items():
+            for i, decision in zip(indices, futures[shard].result()):
+                decisions[i] = decision
+        return decisions
+
+    def record_outcome(self, runtime_data, action, outcome):
+        self.executors[self.shard_for(runtime_data)].submit(_call, 'record_outcome', runtime_data, action, outcome).result()
+
+    def record_outcomes(self, batch):
+        groups = defaultdict(list)
+        for item in batch:
+            groups[self.shard_for(item[0])].append(item)
+        futures = [self.executors[shard].submit(_call, 'record_outcomes', items) for shard, items in groups.items()]
+        for future in futures:
+            future.result()
+
+    def checkpoint(self):
+        for future in [executor.submit(_checkpoint) for executor in self.executors]:
+            future.result()
+
+    def close(self):
+        # Snapshot every shard before its worker exits
+        self.checkpoint()
+        for executor in self.executors:
+            executor.shutdown(wait=True)
@@ -0,0 +1,206 @@
+import hashlib
+import multiprocessing
+import os
+import numpy as np
+from multiprocessing import shared_memory
+from dense_q_table import canonical_key, key_from_str, key_to_str
+
+SPIN_LIMIT = 10000  # seqlock read retries before a reader waits on the row lock instead
+LOCK_TIMEOUT = 5.0
+
+
+def stable_key_hash(key_str):
+    # Process-independent 63-bit hash (str hash() is salted per interpreter); 0 marks an empty slot
+    value = int.from_bytes(hashlib.blake2b(key_str.encode(), digest_size=8).digest(), 'little') >> 1
+    return value or 1
+
+
+class SharedQTable:
+    """Fixed-capacity Q-matrix in shared memory, usable from many worker processes.
+
+    States hash into an open-addressed slot table whose slot number is also the
+    Q-matrix row. Writers take one of `stripes` locks (row % stripes) and bump a
+    per-row version around the write; readers never lock, they copy the row and
+    retry if its version was odd or changed meanwhile (a seqlock).
+
+    Create it once in the parent, then hand it to workers as a Process / pool
+    argument; it pickles to its segment name plus the stripe locks. `capacity`
+    is fixed: once every slot holds a state, row() raises MemoryError for new
+    states (RLOOrchestratorBridge then decides NOOP for them and skips learning).
+    """
+
+    def __init__(self, capacity, action_space_size, key_bytes=128, stripes=64, name=None, locks=None, create=True):
+        self.capacity = capacity
+        self.action_space_size = action_space_size
+        self.key_bytes = key_bytes
+        self.locks = locks if locks is not None else [multiprocessing.Lock() for _ in range(stripes)]
+        size = capacity * (8 + 8 + 8 + key_bytes + 8 * action_space_size)
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.shm.buf[:size] = bytes(size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._owner_pid = os.getpid() if create else None  # forked children inherit this object too
+        self._map_arrays()
+
+    def _map_arrays(self):
+        buf, capacity = self.shm.buf, self.capacity
+        offset = 0
+        self.hashes = np.ndarray((capacity,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self.versions = np.ndarray((capacity,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self.visits = np.ndarray((capacity,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self.matrix = np.ndarray((capacity, self.action_space_size), dtype=np.float64, buffer=buf, offset=offset)
+        offset += 8 * capacity * self.action_space_size
+        self.key_table = np.ndarray((capacity,), dtype=f'S{self.key_bytes}', buffer=buf, offset=offset)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getstate__(self):
+        return {
+            'capacity': self.capacity,
+            'action_space_size': self.action_space_size,
+            'key_bytes': self.key_bytes,
+            'name': self.shm.name,
+            'locks': self.locks,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(create=False, **state)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.hashes))
+
+    def _lock(self, row):
+        return self.locks[row % len(self.locks)]
+
+    def row(self, state):
+        return self.row_for_key(canonical_key(state))
+
+    def rows(self, states):
+        return np.array([self.row(state) for state in states], dtype=np.int64)
+
+    def row_for_key(self, key):
+        key_str = key_to_str(key)
+        encoded = key_str.encode()
+        if len(encoded) > self.key_bytes:
+            raise ValueError(f"State key of {len(encoded)} bytes exceeds key_bytes={self.key_bytes}: {key_str[:80]}")
+        key_hash = stable_key_hash(key_str)
+        hashes = self.hashes
+        slot = key_hash % self.capacity
+        for _ in range(self.capacity):
+            current = hashes[slot]
+            if current == 0:
+                with self._lock(slot):
+                    current = hashes[slot]
+                    if current == 0:
+                        # Publish the key before the hash so a visible hash always has its key
+                        self.key_table[slot] = encoded
+                        hashes[slot] = key_hash
+                        return slot
+            # A matching hash is only a candidate; colliding states keep probing
+            if current == key_hash and self.key_table[slot] == encoded:
+                return slot
+            slot = (slot + 1) % self.capacity
+        raise MemoryError(f"SharedQTable is full ({self.capacity} states)")
+
+    def values(self, row):
+        # Lock-free consistent read of one row
+        versions = self.versions
+        for _ in range(SPIN_LIMIT):
+            version = versions[row]
+            if version & 1:
+                continue
+            values = self.matrix[row].copy()
+            if versions[row] == version:
+                return values
+        # The row stays mid-write: read it under the writers' lock instead of spinning forever
+        lock = self._lock(row)
+        if not lock.acquire(timeout=LOCK_TIMEOUT):
+            raise TimeoutError(f"SharedQTable row {row} is held by a writer that never finished")
+        try:
+            if versions[row] & 1:
+                versions[row] += 1  # left odd by a writer that died; its single-cell write is done or absent
+            return self.matrix[row].copy()
+        finally:
+            lock.release()
+
+    def gather(self, rows):
+        return np.array([self.values(row) for row in rows]).reshape(len(rows), self.action_space_size)
+
+    def set(self, row, action, value):
+        with self._lock(row):
+            self.versions[row] += 1
+            self.matrix[row, action] = value
+            self.versions[row] += 1
+
+    def key_str(self, row):
+        return self.key_table[row].decode()
+
+    def td_update(self, row, action, reward, next_row, learning_rate, discount_factor, done=False):
+        next_max = 0.0 if done else self.values(next_row).max()
+        with self._lock(row):
+            self.versions[row] += 1
+            old_value = self.matrix[row, action]
+            new_value = old_value + learning_rate * (reward + discount_factor * next_max - old_value)
+            self.matrix[row, action] = new_value
+            self.visits[row] += 1
+            self.versions[row] += 1
+        return old_value, new_value
+
+    def td_update_batch(self, rows, actions, rewards, next_rows, learning_rate, discount_factor, dones=None):
+        # Same semantics as DenseQTable.td_update_batch (targets from the pre-batch table, steps folded
+        # in order); other processes may write the same cells, so each step runs under its row lock
+        next_max = self.gather(next_rows).max(axis=1)
+        if dones is not None:
+            next_max = np.where(dones, 0.0, next_max)
+        targets = np.asarray(rewards, dtype=np.float64) + discount_factor * next_max
+        first = {}
+        last = {}
+        for row, action, target in zip(rows, actions, targets):
+            with self._lock(row):
+                self.versions[row] += 1
+                old_value = self.matrix[row, action]
+                new_value = old_value + learning_rate * (target - old_value)
+                self.matrix[row, action] = new_value
+                self.visits[row] += 1
+                self.versions[row] += 1
+            cell = int(row) * self.action_space_size + int(action)
+            first.setdefault(cell, old_value)
+            last[cell] = new_value
+        cells = np.array(sorted(first), dtype=np.int64)
+        return cells, np.array([first[c] for c in cells]), np.array([last[c] for c in cells])
+
+    def snapshot_arrays(self):
+        rows = np.flatnonzero(self.hashes)
+        keys = [key_from_str(self.key_str(row)) for row in rows]
+        return keys, self.gather(rows), self.visits[rows]
+
+    def items(self):
+        for row in np.flatnonzero(self.hashes):
+            yield self.key_str(row), self.values(row)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def to_lists(self):
+        return {key: values.tolist() for key, values in self.items()}
+
+    def load_dict(self, q_table):
+        for key_str, values in q_table.items():
+            row = self.row_for_key(key_from_str(key_str))
+            with self._lock(row):
+                self.versions[row] += 1
+                self.matrix[row] = values
+                self.versions[row] += 1
+
+    def close(self):
+        # Drop the numpy views first; SharedMemory refuses to close with exported buffers
+        del self.hashes, self.versions, self.visits, self.matrix, self.key_table
+        self.shm.close()
+        if self._owner_pid == os.getpid():
+            self.shm.unlink()
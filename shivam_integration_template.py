@@ -5,13 +5,10 @@ This template shows exactly how to integrate your RL Orchestrator with Shivam Ru
 Replace the TODO sections with actual Shivam API calls.
 """
 
-from rl_orchestrator_bridge import RLOOrchestratorBridge
+from rl_orchestrator_bridge import RLOOrchestratorBridge, configure_trace_logging
 import time
 import logging
 
-# Initialize RL Orchestrator
-orchestrator = RLOOrchestratorBridge()
-
 def collect_shivam_runtime_data():
     """
     Extract runtime data from Shivam APIs.
@@ -111,7 +108,10 @@ def main_integration_loop():
     """
     Main integration loop - runs continuously monitoring Shivam.
     """
-    logging.basicConfig(level=logging.INFO)
+    configure_trace_logging()
+
+    # Initialize RL Orchestrator
+    orchestrator = RLOOrchestratorBridge()
 
     print("🚀 Starting Shivam RL Orchestrator Integration")
     print("Monitoring Shivam runtime and making RL-driven decisions...")
@@ -132,7 +132,7 @@ def main_integration_loop():
 
             # 4. Get outcome and provide feedback to RL
             outcome = get_execution_outcome(runtime_data, decision)
-            orchestrator.record_outcome(runtime_data, decision['rl_action'], outcome)
+            orchestrator.record_outcome(runtime_data, decision['executed_action'], outcome)
 
             print(f"📈 Learning: Success={outcome['success']}, Failure={outcome['failure']}")
             print("-" * 60)
@@ -142,6 +142,7 @@ def main_integration_loop():
 
         except KeyboardInterrupt:
             print("🛑 Integration stopped by user")
+            orchestrator.close()
             break
         except Exception as e:
             logging.error(f"Integration error: {e}")
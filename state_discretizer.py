@@ -0,0 +1,137 @@
+import bisect
+import zlib
+import numpy as np
+
+# Feature name -> how to bin it. Each feature reads `source` from the runtime data
+# ('len' counts a list) and uses exactly one of:
+#   edges:     fixed bin edges, level = number of edges <= value
+#   quantiles: number of bins; edges are learned from samples with fit()
+#   clip:      [lo, hi] integer range, level = clip(value) - lo
+#   buckets:   stable hash of the value into this many buckets
+# A NaN value (missing metric) gets level 0 on edges and clip features.
+DEFAULT_FEATURES = {
+    'latency_level': {'source': 'latency', 'edges': [100, 500]},
+    'health_level': {'source': 'health', 'edges': [0.25, 0.5, 0.75, 0.9]},
+    'failure_count': {'source': 'failures', 'clip': [0, 5]},
+    'service_count': {'source': 'services', 'transform': 'len', 'clip': [1, 8]},
+}
+
+
+class StateDiscretizer:
+    """Maps runtime data onto a bounded grid of integer levels per feature.
+
+    `output` selects what adapt-time calls return: 'dict' (feature -> level,
+    readable in traces), 'tuple' (levels in feature order) or 'id' (levels
+    packed into one int in mixed radix). `hash_buckets` additionally folds the
+    packed id into a fixed number of states.
+    """
+
+    def __init__(self, features=None, output='dict', hash_buckets=None):
+        if output not in ('dict', 'tuple', 'id'):
+            raise ValueError(f"Unknown discretizer output: {output}")
+        self.features = {name: dict(spec) for name, spec in (features or DEFAULT_FEATURES).items()}
+        self.names = list(self.features)
+        self.output = output
+        self.hash_buckets = hash_buckets
+        self._compile()
+
+    def _compile(self):
+        self.sizes = []
+        for spec in self.features.values():
+            if 'edges' in spec:
+                spec['edges'] = sorted(spec['edges'])
+                self.sizes.append(len(spec['edges']) + 1)
+            elif 'clip' in spec:
+                lo, hi = spec['clip']
+                self.sizes.append(int(hi) - int(lo) + 1)
+            elif 'buckets' in spec:
+                self.sizes.append(int(spec['buckets']))
+            elif 'quantiles' in spec:
+                # Until fit() runs every value lands in one bin
+                spec['edges'] = []
+                self.sizes.append(int(spec['quantiles']))
+            else:
+                raise ValueError(f"Feature spec needs edges, quantiles, clip or buckets: {spec}")
+        # Mixed-radix place values for packing levels into a single id
+        self.radix = np.cumprod([1] + self.sizes[:-1]).astype(np.int64)
+        self.state_count = int(np.prod(self.sizes))
+
+    def fit(self, runtime_samples):
+        # Learn edges for every 'quantiles' feature from observed runtime data
+        for name, spec in self.features.items():
+            if 'quantiles' in spec:
+                values = self._column(runtime_samples, spec)
+                bins = int(spec['quantiles'])
+                edges = np.unique(np.quantile(values, np.arange(1, bins) / bins))
+                spec['edges'] = edges.tolist()
+        return self
+
+    def _raw(self, runtime_data, spec):
+        value = runtime_data.get(spec['source'], 0)
+        if spec.get('transform') == 'len':
+            return len(value) if value else 0
+        return value
+
+    def _column(self, runtime_batch, spec):
+        # Hashed features keep their raw values so str() matches the scalar path
+        dtype = object if 'buckets' in spec else np.float64
+        return np.array([self._raw(runtime_data, spec) for runtime_data in runtime_batch], dtype=dtype)
+
+    def _level(self, value, spec):
+        if value != value and 'buckets' not in spec:
+            return 0  # NaN
+        if 'edges' in spec:
+            return bisect.bisect_right(spec['edges'], value)
+        if 'clip' in spec:
+            lo, hi = spec['clip']
+            return int(min(max(value, lo), hi) - lo)
+        return zlib.crc32(str(value).encode()) % int(spec['buckets'])
+
+    def levels(self, runtime_data):
+        return tuple(self._level(self._raw(runtime_data, spec), spec) for spec in self.features.values())
+
+    def pack(self, levels):
+        state_id = sum(level * place for level, place in zip(levels, self.radix.tolist()))
+        if self.hash_buckets:
+            state_id %= self.hash_buckets
+        return state_id
+
+    def discretize(self, runtime_data):
+        levels = self.levels(runtime_data)
+        if self.output == 'tuple':
+            return levels
+        if self.output == 'id':
+            return self.pack(levels)
+        return dict(zip(self.names, levels))
+
+    def levels_columns(self, columns):
+        # Vectorized levels: `columns` maps each feature's source to an array of raw values
+        # (the list length for 'len' features). Returns an (n, features) int64 matrix.
+        out = []
+        for spec in self.features.values():
+            values = np.asarray(columns[spec['source']])
+            if 'edges' in spec:
+                out.append(np.where(np.isnan(values), 0, np.searchsorted(spec['edges'], values, side='right')))
+            elif 'clip' in spec:
+                lo, hi = spec['clip']
+                out.append(np.clip(np.nan_to_num(values, nan=lo), lo, hi).astype(np.int64) - int(lo))
+            else:
+                out.append(np.array([self._level(value, spec) for value in values.tolist()]))
+        return np.stack(out, axis=1).astype(np.int64)
+
+    def pack_columns(self, levels):
+        state_ids = levels @ self.radix
+        if self.hash_buckets:
+            state_ids %= self.hash_buckets
+        return state_ids
+
+    def discretize_batch(self, runtime_batch):
+        columns = {}
+        for spec in self.features.values():
+            columns[spec['source']] = self._column(runtime_batch, spec)
+        levels = self.levels_columns(columns)
+        if self.output == 'id':
+            return self.pack_columns(levels).tolist()
+        if self.output == 'tuple':
+            return [tuple(row) for row in levels.tolist()]
+        return [dict(zip(self.names, row)) for row in levels.tolist()]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from rl_decision_layer import RLDecisionLayer
+from rl_orchestrator_bridge import RLOOrchestratorBridge
+from safety_guard import SafetyGuard
+
+MASK = np.array([False, True, False, True, False, False, False, False, False, False])
+
+
+@pytest.mark.parametrize('epsilon', [0.0, 0.5, 1.0])
+@pytest.mark.parametrize('storage', ['dict', 'dense'])
+def test_masked_actions_are_never_selected(tmp_path, storage, epsilon):
+    layer = RLDecisionLayer(storage=storage, persistence='memory', summary_file=str(tmp_path / 'q.json'), epsilon=epsilon)
+    states = [{'s': i} for i in range(50)]
+    for state in states:  # make the masked actions the greedy choice
+        layer.record_action_result(state, 0, 5.0, state)
+        layer.record_action_result(state, 7, 9.0, state)
+    np.random.seed(1)
+    single = [layer.process_state(state, MASK) for state in states for _ in range(10)]
+    batch = layer.process_states(states * 10, np.tile(MASK, (500, 1)))
+    assert set(single) <= {1, 3} and set(batch) <= {1, 3}
+    if epsilon == 1.0:
+        assert set(single) == set(batch) == {1, 3}  # exploration still covers every allowed action
+
+
+def test_bridge_only_proposes_actions_the_environment_allows(tmp_path):
+    layer = RLDecisionLayer(storage='dense', persistence='memory', summary_file=str(tmp_path / 'q.json'), epsilon=1.0)
+
+    class Sink:
+        def write(self, record):
+            pass
+
+    bridge = RLOOrchestratorBridge(rl_layer=layer, trace_sink=Sink())
+    guard = SafetyGuard(str(tmp_path / 'missing.json'))
+    events = [{'latency': 50 * i, 'health': 0.5, 'failures': 0, 'services': ['web'], 'environment': env}
+              for i in range(100) for env in ('prod', 'dev')]
+    decisions = [bridge.process_runtime_event(event) for event in events] + bridge.process_runtime_events(events)
+    for event, decision in zip(events * 2, decisions):
+        assert guard.action_mask(event['environment'], layer.action_space_size)[decision.rl_action]
+        assert not (decision.safety_rule or '').startswith('allowlist')
+        assert decision.executed_action == decision.rl_action
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from async_integration_runner import AsyncIntegrationRunner, HTTPRuntimeClient
+from fake_runtime_server import FakeRuntimeServer
+from rl_decision_layer import RLDecisionLayer
+from rl_orchestrator_bridge import RLOOrchestratorBridge
+
+
+def make_bridge(tmp_path):
+    return RLOOrchestratorBridge(rl_layer=RLDecisionLayer(persistence='memory', summary_file=str(tmp_path / 'q.json')))
+
+
+def run_cycle(tmp_path, delays, timeout, cycles=1):
+    async def scenario():
+        server = await FakeRuntimeServer(delays=delays, seed=0).start()
+        runner = AsyncIntegrationRunner(make_bridge(tmp_path), HTTPRuntimeClient(server.url), interval=0.01,
+                                        timeout=timeout, environment='dev')
+        try:
+            start = time.perf_counter()
+            results = await runner.run_cycle()
+            return results, runner.stats, server.executed, time.perf_counter() - start
+        finally:
+            runner.close()
+            await server.stop()
+    return asyncio.run(scenario())
+
+
+def test_cycle_decides_and_executes_for_every_service(tmp_path):
+    results, stats, executed, _ = run_cycle(tmp_path, {}, timeout=5.0)
+    assert sorted(service for service, _, _ in results) == ['cache', 'db', 'web']
+    assert sorted(service for service, _ in executed) == ['cache', 'db', 'web']
+    assert stats['decisions'] == 3 and stats['errors'] == 0
+
+
+def test_slow_services_overlap_instead_of_adding_up(tmp_path):
+    delays = {'web': 0.3, 'db': 0.3, 'cache': 0.3}
+    results, _, _, elapsed = run_cycle(tmp_path, delays, timeout=5.0)
+    assert len(results) == 3
+    assert elapsed < 2 * 0.3 * 2  # two metrics calls per service, not 3 x 2 in sequence
+
+
+def test_service_that_times_out_is_skipped(tmp_path):
+    results, stats, executed, _ = run_cycle(tmp_path, {'db': 1.0}, timeout=0.2)
+    assert sorted(service for service, _, _ in results) == ['cache', 'web']
+    assert 'db' not in [service for service, _ in executed]
+    assert stats['collect_timeouts'] == 1 and stats['errors'] == 1
+
+
+async def raw_request(server, request):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return status_line.decode().strip()
+
+
+@pytest.mark.parametrize('request_bytes, status_line', [
+    (b'GET /services/unknown/metrics HTTP/1.1\r\n\r\n', 'HTTP/1.1 404 Not Found'),
+    (b'GET /nowhere HTTP/1.1\r\n\r\n', 'HTTP/1.1 404 Not Found'),
+    (b'garbage\r\n\r\n', 'HTTP/1.1 400 Bad Request'),
+    (b'GET /services HTTP/1.1\r\n\r\n', 'HTTP/1.1 200 OK'),
+])
+def test_server_status_lines(request_bytes, status_line):
+    async def scenario():
+        server = await FakeRuntimeServer().start()
+        try:
+            return await raw_request(server, request_bytes)
+        finally:
+            await server.stop()
+    assert asyncio.run(scenario()) == status_line
+
+
+def test_client_raises_on_error_status():
+    async def scenario():
+        server = await FakeRuntimeServer().start()
+        try:
+            await HTTPRuntimeClient(server.url).get_service_metrics('unknown')
+        finally:
+            await server.stop()
+    with pytest.raises(RuntimeError, match='HTTP 404'):
+        asyncio.run(scenario())
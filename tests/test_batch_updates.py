@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from rl_decision_layer import RLDecisionLayer
+from shared_q_table import SharedQTable
+
+STATES = [{'s': 0}, {'s': 1}, {'s': 0}, {'s': 2}]
+ACTIONS = [1, 0, 1, 2]
+REWARDS = [1.0, -0.5, 2.0, 0.25]
+NEXT_STATES = [{'s': 1}, {'s': 0}, {'s': 2}, {'s': 0}]
+
+
+@pytest.mark.parametrize('storage', ['dict', 'dense', 'shared'])
+def test_batch_semantics_match_across_storage(storage, tmp_path):
+    shared = SharedQTable(32, 3) if storage == 'shared' else None
+    layer = RLDecisionLayer(action_space_size=3, storage=storage, shared_table=shared, persistence='memory',
+                            summary_file=str(tmp_path / 'q.json'), learning_rate=0.5, discount_factor=0.9)
+    layer.record_action_result({'s': 1}, 2, 4.0, {'s': 2})  # non-zero pre-batch values
+    changes = layer.record_action_results(STATES, ACTIONS, REWARDS, NEXT_STATES)
+    # Pre-batch targets: 1 + 0.9 * 2 and 2 + 0.9 * 0 for cell (s0, 1), stepped in order
+    first = 0.5 * 2.8
+    assert changes[0] == changes[2] == pytest.approx(first + 0.5 * (2.0 - first))
+    assert changes[1] == pytest.approx(0.5 * -0.5)
+    q_values = {key: np.asarray(values).tolist() for key, values in layer.q_table.items()}
+    assert q_values["[('s', 0)]"] == pytest.approx([0.0, changes[0], 0.0])
+    if shared is not None:
+        shared.close()
+
+
+def test_record_outcomes_computes_rewards_per_outcome_and_persists_once(tmp_path):
+    from rl_orchestrator_bridge import RLOOrchestratorBridge, calculate_reward
+
+    class Sink:
+        def __init__(self):
+            self.records = []
+
+        def write(self, record):
+            self.records.append(record)
+
+    layer = RLDecisionLayer(storage='dense', summary_file=str(tmp_path / 'q.json'))
+    saves = []
+    layer.save_summary = lambda *args, **kwargs: saves.append(args)
+    bridge = RLOOrchestratorBridge(rl_layer=layer, trace_sink=Sink())
+    event = {'latency': 300, 'health': 0.6, 'failures': 1, 'services': ['web']}
+    outcomes = [
+        {'success': True, 'prev_health': 0.6, 'next_state': dict(event, latency=50, health=0.9, failures=0)},
+        {'failure': True, 'prev_health': 0.6, 'next_state': dict(event, latency=800, health=0.3, failures=4)},
+        {'success': True, 'failure': True},
+        {},
+    ]
+    bridge.record_outcomes([(event, 3, outcome) for outcome in outcomes])
+    assert len(saves) == 1
+    rewards = [record['reward'] for record in bridge.trace_sink.records]
+    assert rewards == pytest.approx([calculate_reward(outcome) for outcome in outcomes])
@@ -0,0 +1,70 @@
+import time
+import numpy as np
+import pytest
+from benchmarks import generate_events
+from rl_decision_layer import RLDecisionLayer
+from rl_orchestrator_bridge import RLOOrchestratorBridge
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+def make_bridge(tmp_path, mask_actions=True):
+    layer = RLDecisionLayer(storage='dense', persistence='memory', summary_file=str(tmp_path / 'q.json'), epsilon=0.0)
+    return RLOOrchestratorBridge(rl_layer=layer, trace_sink=ListSink(), mask_actions=mask_actions)
+
+
+def mixed_events():
+    events = generate_events(300, seed=3)
+    events += [
+        {'latency': 50, 'health': 0.95, 'failures': 0, 'services': ['web'], 'environment': 'staging'},  # no allowlist
+        {'latency': 700, 'health': 0.2, 'failures': 3, 'services': ['web', 'db']},  # default environment
+        {'latency': 'fast', 'health': 0.5, 'failures': 0, 'services': ['web'], 'environment': 'dev'},
+        {'health': 0.5, 'failures': 0, 'services': ['web'], 'environment': 'dev'},
+        {'latency': 10, 'health': 0.5, 'failures': 0, 'services': [], 'environment': 'test'},
+    ]
+    return events
+
+
+@pytest.mark.parametrize('mask_actions', [True, False])
+def test_batch_decisions_match_single_path(tmp_path, mask_actions):
+    bridge = make_bridge(tmp_path, mask_actions)
+    events = mixed_events()
+    bridge.process_runtime_events(events)  # intern every state, then give the table distinct values
+    table = bridge.rl_layer.q_table
+    table.matrix[:len(table)] = np.random.default_rng(0).normal(size=(len(table), table.action_space_size))
+    bridge.trace_sink.records.clear()
+
+    batch = bridge.process_runtime_events(events)
+    batch_traces = bridge.trace_sink.records[:]
+    bridge.trace_sink.records.clear()
+    single = [bridge.process_runtime_event(event) for event in events]
+
+    assert batch == single
+    assert [decision.executed_action for decision in batch] == [decision.executed_action for decision in single]
+    assert batch_traces == bridge.trace_sink.records
+    assert sum(decision.safety_rule is not None for decision in batch) > 0
+
+
+def test_batch_path_is_cheaper_per_event(tmp_path):
+    bridge = make_bridge(tmp_path)
+    events = generate_events(2000)
+    bridge.process_runtime_events(events)
+
+    def best(fn):
+        times = []
+        for _ in range(5):
+            bridge.trace_sink.records.clear()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    batch = best(lambda: bridge.process_runtime_events(events))
+    single = best(lambda: [bridge.process_runtime_event(event) for event in events])
+    assert batch < 0.75 * single
@@ -0,0 +1,26 @@
+import numpy as np
+from dense_q_table import DenseQTable
+
+
+def test_memory_stays_bounded_under_many_distinct_states():
+    table = DenseQTable(4, initial_capacity=8)
+    n = 10000
+    rows = table.rows([{'latency_level': i % 3, 'health_level': i / n, 'service_count': i % 7} for i in range(n)])
+    assert rows.tolist() == list(range(n))
+    # The same states again, as fresh dicts in another field order: nothing new is stored
+    for _ in range(3):
+        again = [table.row({'service_count': i % 7, 'health_level': i / n, 'latency_level': i % 3}) for i in range(n)]
+        assert again == rows.tolist()
+    assert len(table) == len(table.index) == len(table.keys) == n
+    assert n <= table.matrix.shape[0] < 2 * n and table.visits.shape == table.matrix.shape[:1]
+    sizes = {name: len(value) for name, value in vars(table).items() if isinstance(value, (dict, list))}
+    assert max(sizes.values()) == n
+
+
+def test_rows_are_stable_across_growth():
+    table = DenseQTable(2, initial_capacity=1)
+    first = table.row({'s': 0})
+    table.set(first, 1, 3.0)
+    table.rows([{'s': i} for i in range(1, 100)])
+    assert table.row({'s': 0}) == first
+    assert np.asarray(table.values(first)).tolist() == [0.0, 3.0]
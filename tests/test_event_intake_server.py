@@ -0,0 +1,71 @@
+import threading
+import time
+
+from event_intake_server import CoalescingQueue, EventIntakeServer, IntakeClient
+
+
+class RecordingBridge:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.events = []
+
+    def process_runtime_event(self, runtime_data):
+        time.sleep(self.delay)
+        self.events.append(runtime_data)
+        return {'action': 'noop'}
+
+
+def test_queue_coalesces_to_the_newest_item_per_key():
+    queue = CoalescingQueue(max_pending=4)
+    assert queue.put('web', 1) == 'queued'
+    assert queue.put('db', 2) == 'queued'
+    assert queue.put('web', 3) == 'coalesced'
+    assert len(queue) == 2
+    assert queue.get()[:2] == ('web', 3)  # kept its turn
+    assert queue.get()[:2] == ('db', 2)
+
+
+def test_queue_rejects_new_keys_at_max_pending():
+    queue = CoalescingQueue(max_pending=2)
+    assert queue.put('a', 1) == 'queued'
+    assert queue.put('b', 1) == 'queued'
+    assert queue.put('c', 1) == 'rejected'
+    assert queue.put('a', 2) == 'coalesced'  # known keys still update
+    queue.close()
+    assert queue.put('d', 1) == 'rejected'
+
+
+def test_expired_events_are_dropped():
+    bridge = RecordingBridge()
+    intake = EventIntakeServer(bridge, max_age=0.05)
+    assert intake.submit({'service': 'web'}) == 'queued'
+    time.sleep(0.1)
+    intake.submit({'service': 'db'})
+    worker = threading.Thread(target=intake._work)
+    worker.start()
+    intake.queue.close()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert intake.snapshot()['expired'] == 1
+    assert bridge.events == [{'service': 'db'}]
+
+
+def test_socket_intake_answers_every_line(tmp_path):
+    bridge = RecordingBridge(delay=0.2)
+    intake = EventIntakeServer(bridge, address=('127.0.0.1', 0), workers=1, max_pending=2).start()
+    client = IntakeClient(intake.address)
+    try:
+        assert client.send({'service': 'web', 'latency': 1}) == {'status': 'queued', 'pending': 1}
+        time.sleep(0.05)  # the worker takes 'web'
+        assert client.send({'service': ['web', 'db']})['status'] == 'queued'  # unhashable service still gets a reply
+        assert client.send({'service': 'db'})['status'] == 'queued'
+        assert client.send({'service': 'api'})['status'] == 'rejected'
+        assert client.send({'service': 'db', 'latency': 2})['status'] == 'coalesced'
+        assert client.send([1, 2])['status'] == 'invalid'
+        stats = client.stats()
+        assert (stats['queued'], stats['rejected'], stats['coalesced'], stats['invalid']) == (3, 1, 1, 1)
+    finally:
+        client.close()
+        intake.close()
+    assert intake.snapshot()['decided'] == 3
+    assert bridge.events[-1] == {'service': 'db', 'latency': 2}
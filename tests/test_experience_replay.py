@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from experience_replay import ReplayBuffer
+
+
+def test_prioritized_sampling_is_proportional_to_priority():
+    buffer = ReplayBuffer(5, prioritized=True, alpha=1.0)
+    for i in range(7):  # wraps: slots 0 and 1 are overwritten
+        buffer.add(i, 0, 0.0, i)
+    buffer.update_priorities(np.array([0, 1, 2, 3, 4, 4]), np.array([1.0, 0.0, 0.0, 0.0, 5.0, 8.0]))
+    assert buffer.tree[1] == pytest.approx(buffer.priorities.sum())
+    np.random.seed(0)
+    indices, batch = buffer.sample(200000)
+    expected = buffer.priorities / buffer.priorities.sum()
+    assert np.bincount(indices, minlength=5) / len(indices) == pytest.approx(expected, abs=0.005)
+    assert batch['state'][indices == 0].tolist()[:1] == [5]
+
+
+def test_single_slot_buffer():
+    buffer = ReplayBuffer(1, prioritized=True)
+    buffer.add(3, 1, 1.0, 4)
+    indices, batch = buffer.sample(4)
+    assert indices.tolist() == [0, 0, 0, 0] and batch['state'].tolist() == [3, 3, 3, 3]
@@ -0,0 +1,36 @@
+import pytest
+from linear_q_learner import LinearQLearner, TileFeatures
+from rl_orchestrator_bridge import RLOOrchestratorBridge
+from runtime_state_adapter import RawStateAdapter, RuntimeStateAdapter
+
+
+def test_batch_transitions_learn_at_the_full_rate(tmp_path):
+    states = [{'latency': 100.0 * i, 'health': 0.5, 'failures': 1.0, 'service_count': 2} for i in range(1, 4)]
+    batched = LinearQLearner(features=TileFeatures(), discount_factor=0.0, persistence='memory', model_file=str(tmp_path / 'a.npz'))
+    changes = batched.record_action_results(states[:1] + states[2:], [1, 2], [1.0, -1.0], states[:1] + states[2:])
+    single = LinearQLearner(features=TileFeatures(), discount_factor=0.0, persistence='memory', model_file=str(tmp_path / 'b.npz'))
+    # Different actions share no weights and targets ignore the next state, so the batch equals two single updates
+    assert changes == [pytest.approx(single.record_action_result(states[0], 1, 1.0, states[0])),
+                       pytest.approx(single.record_action_result(states[2], 2, -1.0, states[2]))]
+    assert changes[0] == pytest.approx(0.1)
+
+
+def test_bridge_feeds_raw_metrics(tmp_path):
+    learner = LinearQLearner(persistence='memory', model_file=str(tmp_path / 'linear.npz'))
+    bridge = RLOOrchestratorBridge(rl_layer=learner, state_adapter=RawStateAdapter())
+    runtime = {'latency': 640.5, 'health': 0.42, 'failures': 3, 'services': ['web', 'db'], 'environment': 'dev'}
+    decision = bridge.process_runtime_event(runtime)
+    bridge.record_outcome(runtime, decision['executed_action'], {'success': True, 'next_state': runtime})
+    assert learner.updates == 1
+    assert learner.features.inputs([RawStateAdapter().adapt(runtime)]).tolist() == [[0.6405, 0.42, 0.3, 0.2]]
+
+
+def test_missing_feature_field_is_an_error(tmp_path):
+    learner = LinearQLearner(epsilon=0.0, persistence='memory', model_file=str(tmp_path / 'linear.npz'))
+    binned = RuntimeStateAdapter().adapt({'latency': 50, 'health': 0.9, 'failures': 0, 'services': ['web']})
+    with pytest.raises(KeyError, match="'latency'"):
+        learner.process_state(binned)
+    with pytest.raises(KeyError, match="'latency'"):
+        learner.process_states([binned])
+    with pytest.raises(KeyError, match="'latency'"):
+        learner.record_action_result(binned, 0, 1.0, binned)
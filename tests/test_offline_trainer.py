@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from offline_trainer import OfflineTrainer
+from rl_decision_layer import RLDecisionLayer
+from shared_q_table import SharedQTable
+
+TRANSITIONS = [
+    ({'latency': 50, 'health': 0.9, 'failures': 0}, 1, 1.0, {'latency': 900, 'health': 0.2, 'failures': 4}),
+    ({'latency': 900, 'health': 0.2, 'failures': 4}, 3, 2.0, None),
+    ({'latency': 50, 'health': 0.9, 'failures': 0}, 0, -1.0, None),
+]
+
+
+@pytest.mark.parametrize('storage', ['dict', 'dense', 'shared'])
+def test_trainer_storage_kinds(storage, tmp_path):
+    shared = SharedQTable(32, 10) if storage == 'shared' else None
+    layer = RLDecisionLayer(storage=storage, shared_table=shared, persistence='memory',
+                            summary_file=str(tmp_path / 'q.json'))
+    try:
+        if storage != 'dense':
+            with pytest.raises(ValueError, match="storage='dense'"):
+                OfflineTrainer(rl_layer=layer)
+            return
+        trainer = OfflineTrainer(rl_layer=layer)
+        assert trainer.load(TRANSITIONS) == 3
+        history = trainer.fit(sweeps=50)
+        assert history[-1] <= 1e-6
+        q = layer.q_table.active()
+        bad = layer.q_table.row(trainer.state_adapter.adapt(TRANSITIONS[1][0]))
+        assert q[bad, 3] == pytest.approx(2.0)
+        assert np.count_nonzero(q) == 3
+    finally:
+        if shared is not None:
+            shared.close()
@@ -0,0 +1,51 @@
+import os
+import stat
+import pytest
+from q_table_journal import atomic_write_json
+from rl_decision_layer import RLDecisionLayer
+
+
+def test_atomic_write_json_keeps_readable_modes(tmp_path):
+    path = str(tmp_path / 'summary.json')
+    old_umask = os.umask(0o022)
+    try:
+        atomic_write_json(path, {'q_table': {}})
+    finally:
+        os.umask(old_umask)
+    # mkstemp alone would leave 0600; the module's umask (read at import) decides here
+    expected = 0o666 & ~old_umask
+    assert stat.S_IMODE(os.stat(path).st_mode) == expected
+    os.chmod(path, 0o640)
+    atomic_write_json(path, {'q_table': {}}, durable=False)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+@pytest.mark.parametrize('storage', ['dict', 'dense'])
+def test_journal_replays_on_top_of_the_snapshot_after_a_torn_write(storage, tmp_path):
+    summary_file = str(tmp_path / 'q.json')
+
+    def layer():
+        return RLDecisionLayer(action_space_size=2, storage=storage, persistence='journal', summary_file=summary_file,
+                               snapshot_every=3, snapshot_interval=None, learning_rate=1.0, discount_factor=0.0)
+
+    first = layer()
+    for i in range(5):  # the third update snapshots, the last two stay in the journal
+        first.record_action_result({'s': i}, 1, float(i + 1), {'s': i})
+    journal_file = first.journal.journal_file
+    first.journal.close()
+    with open(journal_file, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    assert len(lines) == 2
+    with open(journal_file, 'wb') as f:  # the process died halfway through the last append
+        f.write(lines[0] + lines[1][:len(lines[1]) // 2])
+
+    recovered = layer()
+    q_values = {key: list(values) for key, values in recovered.get_q_table_summary().items()}
+    assert [q_values[f"[('s', {i})]"][1] for i in range(4)] == [1.0, 2.0, 3.0, 4.0]
+    assert q_values.get("[('s', 4)]", [0.0, 0.0])[1] == 0.0
+
+    recovered.record_action_result({'s': 9}, 0, 7.0, {'s': 9})  # must not be glued to the torn line
+    recovered.journal.close()
+    again = layer()
+    assert list(again.get_q_table_summary()["[('s', 9)]"]) == [7.0, 0.0]
+    assert list(again.get_q_table_summary()["[('s', 3)]"]) == [0.0, 4.0]
@@ -0,0 +1,102 @@
+import json
+import os
+import numpy as np
+import pytest
+from q_table_snapshot import QTableSnapshot, key_hash, key_hashes, snapshot_is_current, snapshot_paths
+from rl_decision_layer import RLDecisionLayer
+from rl_orchestrator_bridge import RLOOrchestratorBridge
+
+
+def test_eager_updates_rewrite_only_the_json_until_checkpoint(tmp_path):
+    summary_file = str(tmp_path / 'q.json')
+    layer = RLDecisionLayer(action_space_size=3, summary_file=summary_file)
+    layer.record_action_result({'latency_level': 1, 'env': 'prod'}, 1, 1.0, {'latency_level': 2, 'env': 'dev'})
+    assert os.path.exists(summary_file)
+    assert not os.path.exists(snapshot_paths(summary_file)[0])
+    layer.checkpoint()
+    assert snapshot_is_current(summary_file)
+
+    snapshot = QTableSnapshot.open(summary_file)
+    assert len(snapshot) == 2
+    assert snapshot.feature_names == ['env', 'latency_level']
+    assert snapshot.categories == {'env': ['dev', 'prod']}
+    labels, means, counts = snapshot.aggregate('latency_level')
+    assert labels == ['1', '2'] and counts.tolist() == [1, 1]
+    assert means[0].tolist() == [0.0, 0.1, 0.0]
+
+
+def test_scalar_and_vectorized_key_hashes_agree():
+    keys = ['', 'a', '12345678', '123456789', "[('latency_level', 2), ('service', 'wéb')]", '9' * 64]
+    assert key_hashes([key.encode() for key in keys]).tolist() == [key_hash(key) for key in keys]
+
+
+def test_dense_table_resolves_keys_from_the_snapshot_index(tmp_path):
+    summary_file = str(tmp_path / 'q.json')
+    layer = RLDecisionLayer(action_space_size=3, storage='dense', persistence='memory', summary_file=summary_file)
+    for i in range(50):
+        layer.record_action_result({'s': i}, i % 3, float(i), {'s': i + 1})
+    layer.checkpoint()
+    expected = {key: values.tolist() for key, values in layer.q_table.items()}
+
+    loaded = RLDecisionLayer(action_space_size=3, storage='dense', persistence='memory', summary_file=summary_file)
+    assert loaded.q_table._snapshot is not None
+    assert {'s': 49} in loaded.q_table and {'s': 99} not in loaded.q_table
+    assert loaded.q_table.values(loaded.q_table.row({'s': 49})).tolist() == expected["[('s', 49)]"]
+    loaded.record_action_result({'s': 200}, 1, 1.0, {'s': 0})  # grows past the mapped rows
+    assert len(loaded.q_table) == 52
+    assert {key: values.tolist() for key, values in loaded.q_table.items() if key != "[('s', 200)]"} == expected
+
+
+def test_eager_updates_write_the_snapshot_every_snapshot_every_updates(tmp_path):
+    summary_file = str(tmp_path / 'q.json')
+    layer = RLDecisionLayer(action_space_size=3, storage='dense', summary_file=summary_file,
+                            snapshot_every=5, snapshot_interval=None)
+    for i in range(4):
+        layer.record_action_result({'s': i}, 0, 1.0, {'s': i + 1})
+    assert not snapshot_is_current(summary_file)
+    layer.record_action_result({'s': 4}, 0, 1.0, {'s': 5})
+    assert snapshot_is_current(summary_file)
+    layer.record_action_result({'s': 5}, 0, 1.0, {'s': 6})
+    assert not snapshot_is_current(summary_file)
+    assert snapshot_is_current(summary_file, max_lag=60.0)
+
+
+class _NullSink:
+    def write(self, record):
+        pass
+
+
+def test_dashboard_loader_maps_the_snapshot_after_a_bridge_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bridge = RLOOrchestratorBridge(trace_sink=_NullSink())
+    for latency in (50, 400, 900):
+        event = {'latency': latency, 'health': 0.8, 'failures': 1, 'services': ['web'], 'environment': 'dev'}
+        decision = bridge.process_runtime_event(event)
+        bridge.record_outcome(event, decision['executed_action'], {'success': True, 'next_state': event})
+    bridge.close()
+
+    view = QTableSnapshot.load('fusion_rl_summary.json')
+    assert isinstance(view.q, np.memmap)  # not parsed from the JSON summary
+    assert int(view.visits.sum()) == 3
+    assert len(view.top_k(2)) == 2
+
+
+def test_from_dict_parses_key_features_lazily():
+    view = QTableSnapshot.from_dict({"[('a', 1)]": [1.0, 2.0], "[('a', 2)]": [3.0, 4.0]})
+    assert view._features is None
+    assert view.find("[('a', 2)]") == 1 and view.find("[('a', 3)]") is None
+    assert view.feature_names == ['a']
+
+
+def test_open_rejects_other_formats(tmp_path):
+    summary_file = str(tmp_path / 'q.json')
+    layer = RLDecisionLayer(action_space_size=3, persistence='memory', summary_file=summary_file)
+    layer.checkpoint()
+    manifest_path = snapshot_paths(summary_file)[0]
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['format'] = 'q-snapshot-v2'
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match='format'):
+        QTableSnapshot.open(summary_file)
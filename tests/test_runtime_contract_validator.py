@@ -0,0 +1,42 @@
+import numpy as np
+from runtime_contract_validator import RuntimeContractValidator
+
+BASE = {'latency': 120.5, 'health': 0.8, 'failures': 1, 'services': ['web', 'db']}
+CHANGES = [
+    {}, {'latency': 0}, {'health': 1}, {'failures': True}, {'latency': float('nan')}, {'health': float('nan')},
+    {'latency': -1}, {'latency': '10'}, {'latency': None}, {'health': 1.5}, {'health': -0.1}, {'failures': 1.0},
+    {'failures': -2}, {'services': []}, {'services': ('web',)}, {'services': 'web'}, {'latency': -1, 'health': 2},
+    {'latency': float('inf')}, {'health': np.float64(0.5)}, {'failures': np.int64(1)},
+]
+
+
+def events():
+    cases = [dict(BASE, **change) for change in CHANGES]
+    for field in BASE:
+        cases.append({key: value for key, value in BASE.items() if key != field})
+    return cases
+
+
+def test_fast_path_and_batch_report_what_the_full_check_reports():
+    cases = events()
+    scalar, batch = RuntimeContractValidator(), RuntimeContractValidator()
+    valid, errors = batch.validate_batch(cases)
+    for event, batch_valid, batch_error in zip(cases, valid.tolist(), errors):
+        full_valid, _, full_error = scalar._check(event)
+        assert scalar.validate(event) == (full_valid, full_error), event
+        assert (batch_valid, batch_error) == (full_valid, full_error), event
+    assert scalar.rejected == batch.rejected
+    assert sum(scalar.rejected.values()) == len(cases) - int(valid.sum())
+
+
+def test_columns_match_the_batch_counters():
+    # Numeric columns (failures must stay ints: a float column passes integral values, by design)
+    cases = [event for event in events() if type(event.get('latency')) in (int, float)
+             and type(event.get('health')) in (int, float) and type(event.get('failures')) is int
+             and isinstance(event.get('services'), list)]
+    validator = RuntimeContractValidator()
+    valid, counts = validator.validate_columns([e['latency'] for e in cases], [e['health'] for e in cases],
+                                               [e['failures'] for e in cases], [len(e['services']) for e in cases])
+    expected, _ = RuntimeContractValidator().validate_batch(cases)
+    assert valid.tolist() == expected.tolist()
+    assert counts == dict(validator.rejected)
@@ -0,0 +1,61 @@
+import json
+import pytest
+from app_spec import AppSpec
+from safety_guard import DEFAULT_RULES, SafetyGuard
+
+
+def write_rules(path, config):
+    path.write_text(json.dumps(config))
+
+
+def decide(guard, action, **runtime):
+    runtime.setdefault('environment', 'prod')
+    return (guard.guard({'action': action, 'runtime_context': dict(runtime)})['action'],
+            guard.guard_batch([{'action': action, 'runtime_context': dict(runtime)}])[0]['action'])
+
+
+@pytest.mark.parametrize('change', [
+    {'default_environment': 'staging', 'allowlists': dict(DEFAULT_RULES['allowlists'], staging=['monitor']),
+     'rules': DEFAULT_RULES['rules'] + [{'name': 'typo', 'actions': ['heal'], 'field': 'health', 'op': '~', 'value': 1}]},
+    {'rules': [{'name': 'bad_env', 'actions': ['heal'], 'field': 'health', 'op': '<', 'value': 1,
+                'environments': ['staging']}]},
+    {'rules': [{'name': 'bad_value', 'actions': ['heal'], 'field': 'health', 'op': '<', 'value': 'low'}]},
+    {'allowlists': {'prod': ['monitor']}, 'default_environment': 'qa'},
+])
+def test_invalid_reload_keeps_the_previous_rules(tmp_path, change):
+    path = tmp_path / 'rules.json'
+    write_rules(path, DEFAULT_RULES)
+    guard = SafetyGuard(str(path), reload_interval=0)
+    assert decide(guard, 'restart', environment='dev', health=0.95) == ('monitor', 'monitor')
+
+    write_rules(path, dict(DEFAULT_RULES, **change))
+    assert guard.maybe_reload(force=True) is False
+    assert guard.default_environment == 'prod'
+    assert decide(guard, 'restart', environment='dev', health=0.95) == ('monitor', 'monitor')
+    assert decide(guard, 'restart', environment='dev', health=0.5) == ('restart', 'restart')
+    assert decide(guard, 'heal', environment='unknown') == ('heal', 'heal')
+    assert decide(guard, 'scale_up') == ('monitor', 'monitor')
+
+
+def test_valid_reload_replaces_the_rules(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, DEFAULT_RULES)
+    guard = SafetyGuard(str(path), reload_interval=0)
+    write_rules(path, dict(DEFAULT_RULES, rules=[]) | {'allowlists': dict(DEFAULT_RULES['allowlists'], prod=['monitor'])})
+    assert guard.maybe_reload(force=True) is True
+    assert decide(guard, 'heal') == ('monitor', 'monitor')
+    assert guard.guard(AppSpec.from_action(3, {'environment': 'dev', 'health': 0.95})).safety_rule is None
+
+
+def test_scalar_and_batch_guard_agree_on_missing_and_none_fields(tmp_path):
+    guard = SafetyGuard(str(tmp_path / 'missing.json'))
+    rules = [{'name': 'low_health', 'actions': ['restart'], 'field': 'health', 'op': '<', 'value': 0.5, 'default': 1},
+             {'name': 'many_failures', 'actions': ['scale_up'], 'field': 'failures', 'op': '!=', 'value': 0}]
+    guard.compile(dict(DEFAULT_RULES, rules=rules))
+    runtimes = [{'health': None, 'failures': None}, {}, {'health': 0.2, 'failures': 3}, {'health': 0.9, 'failures': 0}]
+    for action in ('restart', 'scale_up'):
+        for runtime in runtimes:
+            scalar, batch = decide(guard, action, environment='dev', **runtime)
+            assert scalar == batch, (action, runtime)
+    assert decide(guard, 'restart', environment='dev', health=None) == ('restart', 'restart')
+    assert decide(guard, 'scale_up', environment='dev', failures=None) == ('scale_up', 'scale_up')
@@ -0,0 +1,33 @@
+import os
+from q_table_snapshot import snapshot_is_current
+from sharded_bridge import ConsistentHashRing, ShardedOrchestratorBridge
+
+
+def test_ring_routes_each_service_to_a_stable_shard():
+    services = [f'svc-{i}' for i in range(500)]
+    ring = ConsistentHashRing(range(4))
+    owners = [ring.node_for(service) for service in services]
+    assert owners == [ConsistentHashRing(range(4)).node_for(service) for service in services]  # process-independent
+    assert set(owners) == {0, 1, 2, 3}
+    grown = ConsistentHashRing(range(5))
+    moved = sum(owner != grown.node_for(service) for owner, service in zip(owners, services))
+    assert moved < len(services) * 0.35  # about 1/5 of the keys move to the new node
+
+
+def test_sharded_bridge_decides_per_shard_and_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bridge = ShardedOrchestratorBridge(shards=2, shard_dir='shards', replicas=16)
+    try:
+        events = [{'latency': 40 * i, 'health': 0.9, 'failures': 0, 'services': ['web'], 'service': f'svc-{i % 6}',
+                   'environment': 'dev'} for i in range(12)]
+        shards = [bridge.shard_for(event) for event in events]
+        assert shards[:6] == shards[6:] and len(set(shards)) == 2
+        decisions = bridge.process_runtime_events(events)
+        assert [decision.runtime_context for decision in decisions] == events
+        bridge.record_outcomes([(event, decision.executed_action, {'success': True, 'next_state': event})
+                                for event, decision in zip(events, decisions)])
+        bridge.checkpoint()
+        for shard in range(2):
+            assert snapshot_is_current(os.path.join('shards', f'shard_{shard}.json'))
+    finally:
+        bridge.close()
@@ -0,0 +1,60 @@
+import pytest
+import shared_q_table
+from rl_decision_layer import RLDecisionLayer
+from rl_orchestrator_bridge import RLOOrchestratorBridge
+from shared_q_table import SharedQTable
+
+
+@pytest.fixture
+def table():
+    table = SharedQTable(16, 3, key_bytes=32, stripes=4)
+    yield table
+    table.close()
+
+
+def test_colliding_hashes_get_separate_rows(table, monkeypatch):
+    monkeypatch.setattr(shared_q_table, 'stable_key_hash', lambda key_str: 42)
+    first = table.row({'a': 1})
+    second = table.row({'a': 2})
+    assert first != second
+    assert table.row_for_key((('a', 1),)) == first
+    assert table.key_str(second) == "[('a', 2)]"
+
+
+def test_key_longer_than_key_bytes_is_rejected(table):
+    with pytest.raises(ValueError):
+        table.row({'service': 'x' * 64})
+    assert len(table) == 0
+
+
+def test_values_of_row_left_mid_write(table, monkeypatch):
+    monkeypatch.setattr(shared_q_table, 'SPIN_LIMIT', 10)
+    row = table.row({'a': 1})
+    table.set(row, 1, 2.0)
+    table.versions[row] += 1  # a writer that died between its version bumps
+    assert table.values(row).tolist() == [0.0, 2.0, 0.0]
+    assert table.versions[row] % 2 == 0
+
+
+class _NullSink:
+    def write(self, record):
+        pass
+
+
+def test_full_table_falls_back_to_noop(tmp_path, caplog):
+    table = SharedQTable(2, 10, stripes=2)
+    try:
+        layer = RLDecisionLayer(storage='shared', shared_table=table, persistence='memory',
+                                summary_file=str(tmp_path / 'q.json'), epsilon=0.0)
+        bridge = RLOOrchestratorBridge(rl_layer=layer, trace_sink=_NullSink())
+        events = [{'latency': 50, 'health': 0.1 * i, 'failures': 0, 'services': ['web'], 'environment': 'dev'}
+                  for i in range(5)]
+        decisions = [bridge.process_runtime_event(event) for event in events]
+        decisions += bridge.process_runtime_events(events)
+        for event, decision in zip(events, decisions):
+            bridge.record_outcome(event, decision['executed_action'], {'success': True, 'next_state': event})
+        assert len(table) == 2
+        assert all(decision.action == 'monitor' for decision in decisions[2:])
+        assert len([r for r in caplog.records if 'SharedQTable is full' in r.getMessage()]) == 1
+    finally:
+        table.close()
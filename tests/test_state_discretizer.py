@@ -0,0 +1,12 @@
+import math
+from state_discretizer import StateDiscretizer
+
+
+def test_nan_gets_the_same_level_on_scalar_and_batch_paths():
+    discretizer = StateDiscretizer()
+    events = [{'latency': math.nan, 'health': math.nan, 'failures': math.nan, 'services': ['a']},
+              {'latency': 600, 'health': 0.95, 'failures': 9, 'services': ['a', 'b']}]
+    scalar = [discretizer.discretize(event) for event in events]
+    assert discretizer.discretize_batch(events) == scalar
+    assert scalar[0] == {'latency_level': 0, 'health_level': 0, 'failure_count': 0, 'service_count': 0}
+    assert scalar[1] == {'latency_level': 2, 'health_level': 4, 'failure_count': 5, 'service_count': 1}
@@ -0,0 +1,26 @@
+import atexit
+import json
+import pytest
+from trace_writer import AsyncTraceWriter
+
+
+def test_records_are_written_and_close_unregisters(tmp_path, monkeypatch):
+    unregistered = []
+    monkeypatch.setattr(atexit, 'unregister', unregistered.append)
+    writer = AsyncTraceWriter(str(tmp_path / 'traces.jsonl'), flush_interval=0.01)
+    writer.write({'rl_action': 1})
+    writer.flush()
+    writer.close()
+    assert [json.loads(line)['rl_action'] for line in open(tmp_path / 'traces.jsonl')] == [1]
+    assert unregistered == [writer.close]
+
+
+def test_unopenable_path_raises_instead_of_hanging(tmp_path):
+    writer = AsyncTraceWriter(str(tmp_path / 'missing' / 'traces.jsonl'), max_queue=1, policy='block')
+    for i in range(3):
+        writer.write({'rl_action': i})
+    with pytest.raises(OSError):
+        writer.flush()
+    with pytest.raises(OSError):
+        writer.close()
+    assert writer.dropped == 3
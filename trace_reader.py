@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from downsampling import MinMaxSeries
+
+
+class IncrementalTraceReader:
+    """Tails a decision-trace file, parsing only what was appended since the last poll.
+
+    Understands both the logging format ("<asctime> - {json}" plus
+    "Reward recorded: ..." lines) and AsyncTraceWriter JSONL. It keeps the file
+    open and remembers its inode, so after a rotation the old file's tail is
+    drained before switching to the new one; a truncated file is re-read from
+    the start. Only the last `window` decisions are kept in memory, alongside
+    running aggregates and min/max-decimated health, latency, failure and
+    cumulative reward series over the whole history. An optional `sink` (anything
+    with write_many, e.g. SQLiteTraceStore) receives every parsed record.
+    """
+
+    def __init__(self, path, window=1000, sink=None, point_budget=500):
+        self.path = path
+        self.sink = sink
+        self._pending = []
+        self.window = deque(maxlen=window)
+        self.health_series = MinMaxSeries(point_budget)
+        self.latency_series = MinMaxSeries(point_budget)
+        self.failure_series = MinMaxSeries(point_budget)
+        self.reward_series = MinMaxSeries(point_budget)  # cumulative reward
+        self.decisions = 0
+        self.rewarded = 0
+        self.successes = 0
+        self.total_reward = 0.0
+        self.action_counts = Counter()
+        self.safety_counts = Counter()
+        self.version = 0  # bumped whenever new records were parsed
+        self._file = None
+        self._inode = None
+        self._partial = b''
+        self._last = None
+        self._lock = threading.Lock()  # one reader may be shared by several dashboard sessions
+
+    @property
+    def success_rate(self):
+        return self.successes / self.decisions * 100 if self.decisions else 0
+
+    def poll(self):
+        # Parse newly appended lines; returns how many records were consumed
+        with self._lock:
+            consumed = self._poll()
+            if self._pending:
+                self.sink.write_many(self._pending)
+                self._pending = []
+            return consumed
+
+    def _poll(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and self._file is not None and stat.st_ino == self._inode and stat.st_size < self._file.tell():
+            # Truncated in place (copytruncate-style rotation)
+            self._file.seek(0)
+            self._partial = b''
+        # Finish the current file first, so a renamed-away file's tail is not lost
+        consumed = self._drain()
+        if stat is not None and (self._file is None or stat.st_ino != self._inode):
+            self._open(stat.st_ino)
+            consumed += self._drain()
+        if consumed:
+            self.version += 1
+        return consumed
+
+    def _open(self, inode):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'rb')
+        self._inode = inode
+        self._partial = b''
+
+    def _drain(self):
+        if self._file is None:
+            return 0
+        data = self._file.read()
+        if not data:
+            return 0
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()  # incomplete last line, finished by a later append
+        consumed = 0
+        for line in lines:
+            consumed += self._parse(line.decode('utf-8', 'replace'))
+        return consumed
+
+    def _parse(self, line):
+        line = line.strip()
+        if not line:
+            return 0
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return 0
+            if record.get('type') == 'reward':
+                self._add_reward(record.get('reward'))
+                return 1
+            timestamp = datetime.fromtimestamp(record.get('ts', 0)).strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
+            self._add_decision(record, timestamp)
+            return 1
+
+        parts = line.split(' - ', 1)
+        if len(parts) < 2:
+            return 0
+        timestamp, message = parts
+        if message.startswith('Reward recorded: '):
+            try:
+                self._add_reward(float(message[len('Reward recorded: '):].split(',')[0]))
+            except ValueError:
+                return 0
+            return 1
+        if message.startswith('{'):
+            try:
+                trace = json.loads(message)
+            except ValueError:
+                return 0
+            self._add_decision(trace, timestamp)
+            return 1
+        return 0
+
+    def _add_decision(self, trace, timestamp):
+        trace['timestamp'] = timestamp
+        if self.sink is not None:
+            self._pending.append(trace)
+        self.window.append(trace)
+        self._last = trace
+        self.decisions += 1
+        if 'rl_action' in trace:
+            self.action_counts[trace['rl_action']] += 1
+        safety_decision = trace.get('safety_decision')
+        if isinstance(safety_decision, dict):
+            self.safety_counts[safety_decision.get('action')] += 1
+        runtime_state = trace.get('runtime_state')
+        if isinstance(runtime_state, dict):
+            self.health_series.append(runtime_state.get('health', 0))
+            self.latency_series.append(runtime_state.get('latency', 0))
+            self.failure_series.append(runtime_state.get('failures', 0))
+
+    def _add_reward(self, reward):
+        if reward is None or self._last is None:
+            return
+        if self.sink is not None:
+            self._pending.append({'type': 'reward', 'reward': reward})
+        self._last['reward'] = reward
+        self.rewarded += 1
+        if reward == 1:
+            self.successes += 1
+        self.total_reward += reward
+        self.reward_series.append(self.total_reward)
+
+    def traces(self):
+        with self._lock:
+            return list(self.window)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
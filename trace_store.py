@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    environment TEXT,
+    rl_action INTEGER,
+    proposed_action TEXT,
+    final_action TEXT,
+    downgraded INTEGER,
+    latency REAL,
+    health REAL,
+    failures INTEGER,
+    service_count INTEGER,
+    reward REAL,
+    trace TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_ts ON decisions (ts);
+CREATE INDEX IF NOT EXISTS idx_decisions_env_ts ON decisions (environment, ts);
+CREATE INDEX IF NOT EXISTS idx_decisions_rl_action ON decisions (rl_action, ts);
+CREATE INDEX IF NOT EXISTS idx_decisions_final_action ON decisions (final_action, ts);
+CREATE TABLE IF NOT EXISTS rollup_minute (
+    minute INTEGER NOT NULL,
+    environment TEXT NOT NULL,
+    rl_action INTEGER NOT NULL,
+    proposed_action TEXT NOT NULL,
+    final_action TEXT NOT NULL,
+    decisions INTEGER NOT NULL DEFAULT 0,
+    downgrades INTEGER NOT NULL DEFAULT 0,
+    rewarded INTEGER NOT NULL DEFAULT 0,
+    reward_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (minute, environment, rl_action, proposed_action, final_action)
+);
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO rollup_minute (minute, environment, rl_action, proposed_action, final_action, decisions, downgrades, rewarded, reward_sum)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (minute, environment, rl_action, proposed_action, final_action) DO UPDATE SET
+    decisions = decisions + excluded.decisions,
+    downgrades = downgrades + excluded.downgrades,
+    rewarded = rewarded + excluded.rewarded,
+    reward_sum = reward_sum + excluded.reward_sum
+"""
+
+
+def _timestamp(record):
+    if 'ts' in record:
+        return float(record['ts'])
+    try:
+        return datetime.strptime(record.get('timestamp', ''), '%Y-%m-%d %H:%M:%S,%f').timestamp()
+    except ValueError:
+        return datetime.now().timestamp()
+
+
+class SQLiteTraceStore:
+    """Indexed local store of decision traces and rewards, with per-minute rollups.
+
+    Accepts the same records as the other trace sinks (decision traces and
+    {'type': 'reward'} records, a reward belonging to the latest decision), so it
+    can be fed by AsyncTraceWriter(store=...) or backfilled from existing
+    trace files with IncrementalTraceReader(path, sink=store).
+    """
+
+    def __init__(self, path='decision_traces.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._last = None  # (id, rollup key) of the latest decision, for reward attachment
+
+    def write(self, record):
+        self.write_many([record])
+
+    def write_many(self, records):
+        with self._lock, self.conn:
+            for record in records:
+                if record.get('type') == 'reward':
+                    self._add_reward(record.get('reward'))
+                else:
+                    self._add_decision(record)
+
+    def _add_decision(self, trace):
+        runtime = trace.get('runtime_state') or {}
+        decision = trace.get('safety_decision') or {}
+        ts = _timestamp(trace)
+        environment = runtime.get('environment', 'prod')
+        rl_action = trace.get('rl_action')
+        final_action = decision.get('action')
+        proposed_action = trace.get('proposed_action', final_action)
+        downgraded = int(proposed_action != final_action)
+        services = runtime.get('services')
+        cursor = self.conn.execute(
+            'INSERT INTO decisions (ts, environment, rl_action, proposed_action, final_action, downgraded, '
+            'latency, health, failures, service_count, reward, trace) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (ts, environment, rl_action, proposed_action, final_action, downgraded,
+             runtime.get('latency'), runtime.get('health'), runtime.get('failures'),
+             len(services) if isinstance(services, list) else None,
+             trace.get('reward'), json.dumps(trace, default=str)))
+        key = (int(ts // 60), environment, -1 if rl_action is None else rl_action, proposed_action or '', final_action or '')
+        self.conn.execute(ROLLUP_UPSERT, key + (1, downgraded, 0, 0.0))
+        self._last = (cursor.lastrowid, key)
+
+    def _add_reward(self, reward):
+        if reward is None or self._last is None:
+            return
+        decision_id, key = self._last
+        self.conn.execute('UPDATE decisions SET reward = ? WHERE id = ?', (reward, decision_id))
+        self.conn.execute(ROLLUP_UPSERT, key + (0, 0, 1, reward))
+
+    def query(self, environment=None, rl_action=None, final_action=None, since=None, until=None, limit=1000):
+        # Most recent decisions matching the filters, newest first
+        clauses, params = self._filters(environment, since, until, time_column='ts')
+        if rl_action is not None:
+            clauses.append('rl_action = ?')
+            params.append(rl_action)
+        if final_action is not None:
+            clauses.append('final_action = ?')
+            params.append(final_action)
+        sql = ('SELECT id, ts, environment, rl_action, proposed_action, final_action, downgraded, '
+               'latency, health, failures, service_count, reward FROM decisions')
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY ts DESC LIMIT ?'
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params + [limit])]
+
+    def rollup(self, bucket_minutes=1, environment=None, proposed_action=None, since=None, until=None):
+        # Time-bucketed counts from the per-minute rollup table
+        clauses, params = self._filters(environment, since, until, time_column='minute', scale=60)
+        if proposed_action is not None:
+            clauses.append('proposed_action = ?')
+            params.append(proposed_action)
+        sql = ('SELECT (minute / ?) * ? * 60 AS bucket, SUM(decisions) AS decisions, SUM(downgrades) AS downgrades, '
+               'SUM(rewarded) AS rewarded, SUM(reward_sum) AS reward_sum FROM rollup_minute')
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' GROUP BY bucket ORDER BY bucket'
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, [bucket_minutes, bucket_minutes] + params)]
+
+    def downgrade_rate(self, proposed_action, environment=None, since=None, until=None):
+        rows = self.rollup(bucket_minutes=10 ** 9, environment=environment, proposed_action=proposed_action,
+                           since=since, until=until)
+        decisions = sum(row['decisions'] for row in rows)
+        return sum(row['downgrades'] for row in rows) / decisions if decisions else 0.0
+
+    def _filters(self, environment, since, until, time_column, scale=1):
+        clauses, params = [], []
+        if environment is not None:
+            clauses.append('environment = ?')
+            params.append(environment)
+        if since is not None:
+            clauses.append(f'{time_column} >= ?')
+            params.append(since // scale if scale != 1 else since)
+        if until is not None:
+            clauses.append(f'{time_column} < ?')
+            params.append(until // scale if scale != 1 else until)
+        return clauses, params
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class AsyncTraceWriter:
+    """Decision-trace sink that keeps serialization and disk I/O off the decision path.
+
+    write() only stamps the record and enqueues it; a background thread drains
+    the bounded queue, serializes records as JSON lines and writes them in
+    batches. Each batch waits at most `flush_interval` seconds for more
+    records. When the queue is full, policy='drop' discards the record (counted
+    in `dropped`) and policy='block' waits for space. An optional `store` (e.g.
+    SQLiteTraceStore) receives every batch too, on the same background thread.
+    """
+
+    def __init__(self, path='decision_traces.jsonl', max_queue=10000, batch_size=512, flush_interval=0.5, policy='drop',
+                 store=None):
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown queue-full policy: {policy}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.store = store
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.error = None  # OSError that stopped the file writes; flush() and close() raise it
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        # Records must not be mutated after this call; the writer serializes them later
+        record['ts'] = time.time()
+        if self.policy == 'block':
+            self.queue.put(record)
+            return True
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        try:
+            f = open(self.path, 'a')
+        except OSError as e:
+            self._fail(e)
+            self._discard()
+            return
+        with f:
+            while True:
+                batch = [self.queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                records = batch[:-1] if stop else batch
+                if records and self.error is None:
+                    try:
+                        f.write(''.join(json.dumps(record, default=str) + '\n' for record in records))
+                        f.flush()
+                    except OSError as e:
+                        self._fail(e)
+                if records and self.error is not None:
+                    self.dropped += len(records)
+                elif records:
+                    if self.store is not None:
+                        try:
+                            self.store.write_many(records)
+                        except Exception as e:
+                            logging.error(f"Trace store write failed: {e}")
+                    self.written += len(records)
+                for _ in batch:
+                    self.queue.task_done()
+                if stop:
+                    return
+
+    def _fail(self, error):
+        self.error = error
+        logging.error(f"Trace writer for {self.path} failed: {error}")
+
+    def _discard(self):
+        # Keep draining after a failed open, so blocking writes, flush() and close() never hang
+        while True:
+            record = self.queue.get()
+            self.queue.task_done()
+            if record is _STOP:
+                return
+            self.dropped += 1
+
+    def flush(self):
+        # Block until everything enqueued so far is on disk
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.queue.put(_STOP)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error